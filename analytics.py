@@ -0,0 +1,386 @@
+"""Предрасчет всех показателей дашборда.
+
+AnalyticsModel строится один раз на набор данных (по отпечатку исходных
+файлов) и хранит готовые таблицы и числа для KPI и всех вкладок. Вкладки
+только читают из модели, поэтому стоимость перезапуска скрипта Streamlit
+не зависит от размера данных.
+"""
+
+import os
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from chart_data import box_summary, histogram_bins
+from crossfilter import SegmentIndex
+from preferences import PreferenceCounts, load_synonyms
+from price_sensitivity import PriceSensitivity, price_distribution
+from resampling import CONFIDENCE, percentile_interval, resample_means, resample_shares
+from schema import SchemaError, resolve_schema
+
+# Минимум значений для построения графика цены
+MIN_PRICE_ANSWERS = 3
+
+# Порог "мало данных" для ценовых колонок
+LOW_DATA_THRESHOLD = 10
+
+# Размер выборки для бутстрепа, если его нельзя определить по таблице рынка
+DEFAULT_RESPONDENTS = 100
+
+# Вариантов ответа, которые отдельно участвуют в бутстрепе KPI
+TOP_CATEGORIES = 50
+
+# Допустимые значения шкалы оценок (максимального балла)
+RATING_SCALE_RANGE = (2, 100)
+
+# Шкала оценок, если SUSHI_RATING_SCALE не задана или некорректна
+DEFAULT_RATING_SCALE = 5
+
+
+def parse_rating_scale(value):
+    """Максимальный балл шкалы оценок; ValueError, если значение некорректно"""
+    try:
+        scale = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Шкала оценок должна быть целым числом, получено {value!r}") from None
+    low, high = RATING_SCALE_RANGE
+    if not low <= scale <= high:
+        raise ValueError(f"Шкала оценок должна быть от {low} до {high}, получено {scale}")
+    return scale
+
+
+def _env_rating_scale():
+    """Шкала из SUSHI_RATING_SCALE; некорректное значение заменяется шкалой по умолчанию"""
+    try:
+        return parse_rating_scale(os.environ.get('SUSHI_RATING_SCALE', DEFAULT_RATING_SCALE))
+    except ValueError as e:
+        warnings.warn(f"SUSHI_RATING_SCALE: {e}; используется шкала {DEFAULT_RATING_SCALE}")
+        return DEFAULT_RATING_SCALE
+
+
+# Шкала оценок удовлетворенности (например, 5 или 10)
+RATING_SCALE = _env_rating_scale()
+
+
+def _category_interval(counts, labels, seed):
+    """Доля самого частого ответа, ее интервал и доля повторов, где он остается первым.
+
+    Редкие варианты объединяются в один: на совместное распределение частых
+    вариантов это не влияет, а матрица повторов остается узкой.
+    """
+    counts = np.asarray(counts, dtype=float)
+    order = np.argsort(-counts, kind='stable')
+    kept = counts[order[:TOP_CATEGORIES]]
+    rest = counts[order[TOP_CATEGORIES:]].sum()
+    shares = resample_shares(np.append(kept, rest), seed=seed)[:, :len(kept)]
+    low, high = percentile_interval(shares[:, 0])
+    return {
+        'label': labels[order[0]],
+        'share': kept[0] / counts.sum(),
+        'low': low,
+        'high': high,
+        'stability': float((shares.argmax(axis=1) == 0).mean()),
+    }
+
+
+def _pair(df, schema, role):
+    """Пара колонок 'ответ - количество' для роли без пропусков или None"""
+    columns = schema.get(role)
+    if columns is None:
+        return None
+    data = df[list(columns)].dropna()
+    # Целые количества с пропусками хранятся в float32 (optimize_dtypes);
+    # доли от них считаются в float64, как по исходной таблице
+    data = data.astype({column: 'float64' for column, dtype in data.dtypes.items() if dtype == np.float32})
+    return data if not data.empty else None
+
+
+def _price_summary(series):
+    """Данные и статистика одной ценовой колонки.
+
+    bins и box - интервалы гистограммы и квартили для графиков на больших
+    выборках (см. chart_data).
+    """
+    data = series.dropna()
+    return {
+        'data': data,
+        'count': len(data),
+        'mean': data.mean(),
+        'median': data.median(),
+        'min': data.min(),
+        'max': data.max(),
+        'enough': len(data) >= MIN_PRICE_ANSWERS,
+        'bins': histogram_bins(data, min(10, len(data))),
+        'box': box_summary(data),
+    }
+
+
+def _respondents(df_market, schema):
+    """Число опрошенных по таблице рынка: сумма ответов на вопрос о частоте посещений"""
+    columns = schema.get('frequency')
+    total = df_market[columns[1]].sum() if columns is not None else 0
+    return int(total) if total > 0 else DEFAULT_RESPONDENTS
+
+
+# Разделы модели по исходной таблице, от которой они зависят (в порядке расчета)
+SOURCE_SECTIONS = (
+    ('market', ('attendance', 'restaurants', 'pricing', 'satisfaction', 'kpis')),
+    ('profile', ('profile',)),
+)
+
+
+class AnalyticsModel:
+    """Готовые агрегаты для всех вкладок дашборда.
+
+    source_fingerprints - отпечатки исходных таблиц {'market': ..., 'profile': ...}.
+    Если передана предыдущая модель previous, разделы, чья таблица не
+    изменилась, переносятся из нее без пересчета. rating_scale - максимальный
+    балл шкалы оценок (по умолчанию RATING_SCALE). aggregates - хранилище
+    анкет (survey_store.SurveyStore) с теми же таблицами: частоты ответов,
+    счетчики и describe тогда считаются в SQL, а не по таблицам pandas.
+
+    Большую таблицу профиля можно передать как df_profile=None с потоковыми
+    агрегатами profile_summary (streaming_ingest.StreamingAggregates) и
+    функцией profile_loader, загружающей построчную таблицу: она вызывается
+    только при первом обращении к сегментам.
+    """
+
+    def __init__(self, df_market, df_profile, fingerprint=None, schema=None,
+                 source_fingerprints=None, previous=None, rating_scale=None, aggregates=None,
+                 profile_summary=None, profile_loader=None):
+        self.fingerprint = fingerprint
+        self._aggregates = aggregates
+        self._profile_summary = profile_summary
+        self._profile_loader = profile_loader
+        self.rating_scale = parse_rating_scale(RATING_SCALE if rating_scale is None else rating_scale)
+        self.source_fingerprints = dict(source_fingerprints or {})
+        # Роли колонок определяются один раз на набор данных
+        if schema is None:
+            columns = df_profile if df_profile is not None else pd.DataFrame(columns=profile_summary.columns)
+            schema = resolve_schema(df_market, columns)
+        self.schema = schema
+        self.rebuilt_sections = []
+        self._section_attributes = {}
+
+        frames = {'market': df_market, 'profile': df_profile}
+        for source, sections in SOURCE_SECTIONS:
+            reuse = self._can_reuse(previous, source)
+            for section in sections:
+                if reuse:
+                    self._copy_section(previous, section)
+                else:
+                    self._build_section(section, frames[source])
+
+    def _can_reuse(self, previous, source):
+        fingerprint = self.source_fingerprints.get(source)
+        return (previous is not None and fingerprint is not None
+                and previous.source_fingerprints.get(source) == fingerprint
+                and previous.rating_scale == self.rating_scale)
+
+    def _build_section(self, section, df):
+        known = set(self.__dict__)
+        getattr(self, f'_build_{section}')(df)
+        self._section_attributes[section] = [name for name in self.__dict__ if name not in known]
+        self.rebuilt_sections.append(section)
+
+    def _copy_section(self, previous, section):
+        names = previous._section_attributes[section]
+        for name in names:
+            setattr(self, name, getattr(previous, name))
+        self._section_attributes[section] = names
+
+    def _count(self, source, df, column):
+        if self._aggregates is not None:
+            return self._aggregates.count(source, column)
+        if df is None:
+            summary = self._profile_summary
+            return summary.rows if column is None else summary.count(column)
+        return len(df) if column is None else int(df[column].count())
+
+    def _value_counts(self, source, df, column):
+        if self._aggregates is not None:
+            return self._aggregates.value_counts(source, column)
+        if df is None:
+            return self._profile_summary.value_counts(column)
+        return df[column].value_counts()
+
+    def _describe(self, source, df, columns):
+        if self._aggregates is not None:
+            return self._aggregates.describe(source, list(columns))
+        return df[columns].describe()
+
+    def _build_kpis(self, df_market):
+        # Самый популярный ресторан
+        self.top_restaurant = ""
+        if self.popular_data is not None:
+            label_col, value_col = self.schema.pair('popular')
+            self.top_restaurant = self.popular_data.loc[self.popular_data[value_col].idxmax(), label_col]
+
+        # Средняя удовлетворенность по шкале rating_scale
+        self.avg_satisfaction = 0
+        scores = None
+        characteristics = self.schema.get('characteristics')
+        if characteristics is not None:
+            scores = pd.to_numeric(df_market[characteristics[1]], errors='coerce').dropna()
+            if len(scores) and not scores.between(0, self.rating_scale).all():
+                raise SchemaError(
+                    f"Оценки в колонке '{characteristics[1]}' выходят за шкалу 0-{self.rating_scale}: "
+                    "проверьте SUSHI_RATING_SCALE"
+                )
+            self.avg_satisfaction = scores.mean() if len(scores) else 0
+
+        # Топ цель посещения
+        self.top_purpose = ""
+        if self.purpose_data is not None:
+            label_col, value_col = self.schema.pair('purpose')
+            self.top_purpose = self.purpose_data.loc[self.purpose_data[value_col].idxmax(), label_col]
+
+        # Неопределенность карточек: бутстреп долей ответов и средней оценки
+        self.kpi_confidence = CONFIDENCE
+        self.kpi_intervals = {}
+        categories = (('leader', self.popular_data, 'popular'), ('purpose', self.purpose_data, 'purpose'))
+        for seed, (key, data, role) in enumerate(categories):
+            if data is not None:
+                label_col, value_col = self.schema.pair(role)
+                counts = data[value_col].to_numpy(dtype=float)
+                if counts.sum() > 0:
+                    self.kpi_intervals[key] = _category_interval(counts, data[label_col].to_numpy(), seed=seed)
+        # В таблице рынка только средние оценки характеристик, ответов отдельных
+        # анкет нет: интервал показывает разброс между характеристиками (n - их число)
+        if scores is not None and len(scores) > 1:
+            low, high = percentile_interval(resample_means(scores, seed=len(categories)))
+            self.kpi_intervals['score'] = {'low': low, 'high': high, 'basis': 'characteristics', 'n': len(scores)}
+
+    def _build_attendance(self, df_market):
+        self.purpose_data = _pair(df_market, self.schema, 'purpose')
+        self.frequency_data = _pair(df_market, self.schema, 'frequency')
+
+    def _build_restaurants(self, df_market):
+        self.known_data = _pair(df_market, self.schema, 'known')
+        if self.known_data is not None:
+            self.known_data = self.known_data.sort_values(self.schema.pair('known')[1], ascending=True)
+
+        self.visit_data = _pair(df_market, self.schema, 'visit')
+        if self.visit_data is not None:
+            self.visit_data = self.visit_data.sort_values(self.schema.pair('visit')[1], ascending=False)
+
+        self.popular_data = _pair(df_market, self.schema, 'popular')
+
+    def _build_pricing(self, df_market):
+        self.price_columns = self.schema.price_columns
+        self.price_stats = pd.DataFrame([
+            {"Колонка": col, "Количество ответов": self._count('market', df_market, col)}
+            for col in self.price_columns
+        ])
+
+        self.max_price = self._price_role(df_market, 'max_price')
+        self.min_price = self._price_role(df_market, 'min_price')
+        self.fair_price = self._price_role(df_market, 'fair_price')
+
+        # Сравнительный анализ всех ценовых колонок
+        self.price_describe = None
+        self.low_data_price_cols = []
+        if self.price_columns:
+            numeric_price_cols = df_market[self.price_columns].select_dtypes(include=[np.number]).columns
+            if len(numeric_price_cols) > 0:
+                self.price_describe = self._describe('market', df_market, numeric_price_cols).round(2)
+                self.low_data_price_cols = [
+                    col for col in numeric_price_cols if self.price_describe.loc['count', col] < LOW_DATA_THRESHOLD
+                ]
+
+        # Кривые Ван Вестендорпа по распределениям трех ценовых вопросов
+        self.price_sensitivity = None
+        roles = ('min_price', 'max_price', 'fair_price')
+        if all(self.schema.get(role) is not None for role in roles):
+            too_cheap, too_expensive, fair = (
+                price_distribution(*(df_market[column] for column in self.schema.get(role)))
+                for role in roles
+            )
+            try:
+                self.price_sensitivity = PriceSensitivity(
+                    too_cheap, too_expensive, fair, sample_size=_respondents(df_market, self.schema)
+                )
+            except ValueError:
+                pass
+
+    def _price_role(self, df_market, role):
+        columns = self.schema.get(role)
+        return _price_summary(df_market[columns[0]]) if columns is not None else None
+
+    def _build_satisfaction(self, df_market):
+        self.satisfaction_columns = self.schema.rating_columns
+        self.general_satisfaction_data = _pair(df_market, self.schema, 'general_satisfaction')
+        self.characteristics_data = _pair(df_market, self.schema, 'characteristics')
+        self.importance_data = _pair(df_market, self.schema, 'importance')
+
+        self.satisfaction_stats = None
+        if self.satisfaction_columns:
+            numeric_columns = df_market[self.satisfaction_columns].select_dtypes(include=[np.number]).columns
+            if len(numeric_columns):
+                self.satisfaction_stats = self._describe('market', df_market, numeric_columns).round(2)
+
+    def _build_profile(self, df_profile):
+        self.total_respondents = self._count('profile', df_profile, None)
+
+        gender_col = self.schema.profile_column('gender')
+        age_col = self.schema.profile_column('age')
+        income_col = self.schema.profile_column('income')
+        sushi_col = self.schema.profile_column('sushi')
+
+        self.gender_counts = self._value_counts('profile', df_profile, gender_col) if gender_col else None
+        self.age_counts = self._value_counts('profile', df_profile, age_col) if age_col else None
+        self.income_counts = self._value_counts('profile', df_profile, income_col) if income_col else None
+
+        # Доли от всех анкет (пропуски в знаменателе), по уже готовым частотам
+        total = self.total_respondents
+        self.female_pct = None
+        if gender_col:
+            self.female_pct = self.gender_counts.get('Женский', 0) / total * 100 if total else np.nan
+
+        self.young_pct = None
+        if age_col:
+            self.young_pct = self.age_counts.get('18-24', 0) / total * 100 if total else np.nan
+
+        self.top_income = None
+        if self.income_counts is not None and not self.income_counts.empty:
+            self.top_income = self.income_counts.index[0]
+
+        # Любимые суши/роллы: частоты считаются один раз, топ-10 для графика
+        self.preferences = None
+        self.top_sushi = None
+        if sushi_col:
+            if df_profile is None:
+                answers = self._value_counts('profile', None, sushi_col)
+                self.preferences = PreferenceCounts.from_answer_counts(answers, synonyms=load_synonyms())
+            else:
+                self.preferences = PreferenceCounts(df_profile[sushi_col], synonyms=load_synonyms())
+            self.top_sushi = self.preferences.top(10).to_dict()
+
+        # Битовые индексы сегментов для перекрестных фильтров; для большой
+        # таблицы они строятся при первом обращении (см. segments)
+        self.segment_columns = {
+            role: column for role, column in (('gender', gender_col), ('age', age_col), ('income', income_col))
+            if column
+        }
+        self._segments = None
+        self._segments_loader = self._profile_loader
+        self._segments_lock = threading.Lock()
+        if df_profile is not None:
+            self._segments = SegmentIndex(df_profile, self.segment_columns.values(), preferences=self.preferences)
+
+    @property
+    def segments(self):
+        """Битовые индексы сегментов (crossfilter.SegmentIndex)"""
+        if self._segments is None and self._segments_loader is not None:
+            with self._segments_lock:
+                if self._segments is None:
+                    df_profile = self._segments_loader()
+                    sushi_col = self.schema.profile_column('sushi')
+                    preferences = None
+                    if sushi_col:
+                        preferences = PreferenceCounts(df_profile[sushi_col], synonyms=load_synonyms())
+                    self._segments = SegmentIndex(df_profile, self.segment_columns.values(),
+                                                  preferences=preferences)
+        return self._segments
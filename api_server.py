@@ -0,0 +1,288 @@
+"""Локальный JSON API с показателями дашборда.
+
+Отдает те же числа, что и дашборд (лидер рынка, средняя оценка, цели
+посещения, цены, демография, любимые суши, сегменты), используя data_loader и
+AnalyticsModel (с SUSHI_DATA_SOURCE=sqlite - из хранилища анкет
+survey_store). Ответы помечаются ETag по отпечатку данных: клиент с
+If-None-Match получает 304 без пересчета показателей.
+
+Запуск из каталога с данными:
+
+    python api_server.py --port 8502
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from analytics import AnalyticsModel
+from data_loader import (MARKET_FILE, PROFILE_FILE, data_fingerprint, dataset_fingerprints, is_large_source,
+                         load_frame, load_sources, load_summary)
+from schema import SchemaError
+from survey_store import DATA_SOURCE, STORE_FILE, SurveyStore
+
+class ParameterError(ValueError):
+    """Некорректные параметры запроса (ответ 400)"""
+
+
+# Наибольшее число строк в топах (?top=N); большие значения урезаются
+MAX_TOP = 100
+
+
+def _top(params):
+    value = params.get('top', ['10'])[0]
+    try:
+        top = int(value)
+    except ValueError:
+        raise ParameterError(f"top должен быть целым числом, получено {value!r}") from None
+    if top < 1:
+        raise ParameterError(f"top должен быть не меньше 1, получено {top}")
+    return min(top, MAX_TOP)
+
+
+_model_lock = threading.Lock()
+_model = None
+_store = None
+
+
+def get_store():
+    """Пул соединений к хранилищу анкет (создается при первом обращении)"""
+    global _store
+    with _model_lock:
+        if _store is None:
+            _store = SurveyStore(STORE_FILE)
+        return _store
+
+
+def current_fingerprint():
+    """Отпечаток данных выбранного источника"""
+    if DATA_SOURCE == 'sqlite':
+        return get_store().data_fingerprint()
+    return data_fingerprint()
+
+
+def get_model():
+    """Модель для текущего отпечатка данных (пересобирается при изменении файлов).
+
+    Разделы, чья таблица не изменилась, переносятся из прежней модели;
+    неизменившийся файл читается из колоночного кэша. Большая таблица
+    профиля не загружается: модель строится по потоковым агрегатам, а
+    построчные данные читаются из кэша при первом запросе сегментов.
+    """
+    global _model
+    fingerprint = current_fingerprint()
+    store = get_store() if DATA_SOURCE == 'sqlite' else None
+    with _model_lock:
+        if _model is None or _model.fingerprint != fingerprint:
+            summary = loader = None
+            if store is not None:
+                fingerprints = store.fingerprints()
+                df_market, df_profile = store.read_table('market'), store.read_table('profile')
+            elif is_large_source(PROFILE_FILE):
+                fingerprints = dataset_fingerprints()
+                df_market, df_profile = load_frame(MARKET_FILE), None
+                summary, loader = load_summary(PROFILE_FILE), partial(load_frame, PROFILE_FILE)
+            else:
+                fingerprints = dataset_fingerprints()
+                df_market, df_profile = load_sources()
+            _model = AnalyticsModel(df_market, df_profile, fingerprint=fingerprint,
+                                    source_fingerprints=fingerprints, previous=_model, aggregates=store,
+                                    profile_summary=summary, profile_loader=loader)
+        return _model
+
+
+def _plain(value):
+    """Приводит numpy/pandas значения к типам JSON"""
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _pair_records(model, data, role):
+    if data is None:
+        return []
+    label_col, value_col = model.schema.pair(role)
+    total = data[value_col].sum()
+    return [
+        {'answer': label, 'count': count, 'share': count / total if total else None}
+        for label, count in zip(data[label_col], data[value_col])
+    ]
+
+
+def _split(counts):
+    if counts is None:
+        return []
+    total = counts.sum()
+    return [{'answer': k, 'count': v, 'share': v / total} for k, v in counts.items()]
+
+
+def _price(summary):
+    if summary is None:
+        return None
+    return {key: summary[key] for key in ('count', 'mean', 'median', 'min', 'max')}
+
+
+def summary_payload(model, params):
+    """KPI карточки"""
+    return {
+        'top_restaurant': model.top_restaurant,
+        'avg_satisfaction': model.avg_satisfaction,
+        'rating_scale': model.rating_scale,
+        'top_purpose': model.top_purpose,
+        'respondents': model.total_respondents,
+        'confidence': model.kpi_confidence,
+        'intervals': model.kpi_intervals,
+    }
+
+
+def purposes_payload(model, params):
+    """Доли целей посещения"""
+    return {'purposes': _pair_records(model, model.purpose_data, 'purpose')}
+
+
+def restaurants_payload(model, params):
+    """Знание, посещение и популярность ресторанов"""
+    return {
+        'known': _pair_records(model, model.known_data, 'known'),
+        'visit': _pair_records(model, model.visit_data, 'visit'),
+        'popular': _pair_records(model, model.popular_data, 'popular'),
+    }
+
+
+def prices_payload(model, params):
+    """Статистика по ценам"""
+    describe = model.price_describe
+    return {
+        'max_price': _price(model.max_price),
+        'min_price': _price(model.min_price),
+        'fair_price': _price(model.fair_price),
+        'describe': describe.to_dict() if describe is not None else None,
+    }
+
+
+def demographics_payload(model, params):
+    """Распределения по полу, возрасту и доходу"""
+    return {
+        'gender': _split(model.gender_counts),
+        'age': _split(model.age_counts),
+        'income': _split(model.income_counts),
+        'female_pct': model.female_pct,
+        'young_pct': model.young_pct,
+    }
+
+
+def sushi_payload(model, params):
+    """Топ-N любимых суши/роллов (?top=N)"""
+    top = _top(params)
+    if model.preferences is None:
+        return {'sushi': []}
+    return {'sushi': [{'name': k, 'count': v} for k, v in model.preferences.top(top).items()]}
+
+
+def segment_payload(model, params):
+    """Сегмент по фильтрам ?gender=...&age=...&income=... (значения можно повторять)"""
+    unknown = sorted(set(params) - set(model.segment_columns) - {'top'})
+    if unknown:
+        raise ParameterError(f"Неизвестные фильтры: {', '.join(unknown)}")
+    top = _top(params)
+    selection = {column: params.get(role, []) for role, column in model.segment_columns.items()}
+    segments = model.segments
+    mask = segments.mask(selection)
+    return {
+        'filters': {role: params[role] for role in model.segment_columns if role in params},
+        'respondents': segments.count(mask),
+        'breakdown': {
+            role: [{'answer': k, 'count': v} for k, v in segments.value_counts(column, mask).items()]
+            for role, column in model.segment_columns.items()
+        },
+        'sushi': [{'name': k, 'count': v} for k, v in segments.top_sushi(mask, top).items()],
+    }
+
+
+ENDPOINTS = {
+    '/api/summary': summary_payload,
+    '/api/purposes': purposes_payload,
+    '/api/restaurants': restaurants_payload,
+    '/api/prices': prices_payload,
+    '/api/demographics': demographics_payload,
+    '/api/sushi': sushi_payload,
+    '/api/segment': segment_payload,
+}
+
+
+class AnalyticsHandler(BaseHTTPRequestHandler):
+    """GET /api/<раздел> -> JSON; поддерживает ETag/If-None-Match"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        builder = ENDPOINTS.get(url.path)
+        if builder is None:
+            self._send_json(404, {'error': 'not found', 'endpoints': sorted(ENDPOINTS)})
+            return
+
+        try:
+            # ETag зависит только от данных и запроса: проверка не требует пересчета
+            request_key = hashlib.sha1(f"{url.path}?{url.query}".encode()).hexdigest()[:8]
+            etag = f'"{current_fingerprint()}-{request_key}"'
+            if etag in self.headers.get('If-None-Match', ''):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            payload = builder(get_model(), parse_qs(url.query))
+        except ParameterError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except SchemaError as e:
+            # Ошибка в данных сервера, а не в запросе
+            self._send_json(500, {'error': f"некорректная структура данных: {e}"})
+            return
+        except (OSError, sqlite3.Error) as e:
+            # Файл или база отсутствуют, заблокированы или недоступны
+            self._send_json(503, {'error': f"данные недоступны: {e}"})
+            return
+        except Exception as e:
+            self.log_error("%s: %r", url.path, e)
+            self._send_json(500, {'error': 'внутренняя ошибка сервера'})
+            return
+        self._send_json(200, _plain(payload), etag=etag)
+
+    def _send_json(self, status, payload, etag=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный JSON API показателей дашборда")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), AnalyticsHandler)
+    print(f"API: http://{args.host}:{args.port}/api/summary")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
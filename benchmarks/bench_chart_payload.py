@@ -0,0 +1,89 @@
+"""Размер JSON графиков с сырыми наблюдениями и со сводками на сервере.
+
+В синтетической таблице рынка ценовые вопросы и оценки характеристик
+заменяются ответами отдельных респондентов (как на большой панели), затем
+графики цен и оценок характеристик собираются дважды: с порогом режима
+больших данных выше числа строк (все наблюдения уходят в браузер) и с
+порогом 0 (гистограммы по интервалам, ящик по квартилям, scattergl по
+прореженной выборке). Для каждого графика печатаются размер JSON и время
+сборки с сериализацией.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_chart_payload.py --rows 100000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import chart_data
+from analytics import AnalyticsModel
+from bench_pipeline import figure_probe, import_dashboard
+from data_loader import clean_excel_errors, optimize_dtypes
+from schema import resolve_schema
+from synthetic_data import CHARACTERISTICS, PRICES, generate_survey, with_loaded_names
+
+CHARTS = ('max_price', 'min_price', 'fair_price', 'char')
+
+
+def respondent_level(df_market, df_profile, rows, seed):
+    """Таблица рынка, где цены и оценки характеристик - ответы отдельных анкет"""
+    rng = np.random.default_rng(seed)
+    schema = resolve_schema(df_market, df_profile)
+    df_market = df_market.reindex(range(rows))
+    for role in ('max_price', 'min_price', 'fair_price'):
+        question, share = schema.pair(role)
+        df_market[question] = rng.choice(PRICES, rows)
+        df_market[share] = 1.0
+    characteristic, score = schema.pair('characteristics')
+    df_market[characteristic] = rng.choice(CHARACTERISTICS, rows)
+    df_market[score] = rng.integers(1, 6, rows).astype(float)
+    return df_market
+
+
+def chart_payloads(dashboard, model, theme, threshold):
+    """id графика -> (байт JSON, секунд на сборку и сериализацию)"""
+    chart_data.LARGE_DATA_ROWS = threshold
+    with figure_probe(dashboard) as builders:
+        dashboard.render_pricing(model, theme)
+        dashboard.render_satisfaction(model, theme)
+    results = {}
+    for chart_id in CHARTS:
+        start = time.perf_counter()
+        payload = builders[chart_id]().to_json()
+        results[chart_id] = (len(payload.encode('utf-8')), time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    market, profile = generate_survey(args.rows, seed=args.seed, market_rows=11)
+    df_profile = optimize_dtypes(clean_excel_errors(profile))
+    df_market = optimize_dtypes(clean_excel_errors(with_loaded_names(market)))
+    df_market = respondent_level(df_market, df_profile, args.rows, args.seed)
+    model = AnalyticsModel(df_market, df_profile, fingerprint='bench')
+
+    dashboard = import_dashboard()
+    theme = dashboard.get_theme(dashboard.DEFAULT_SCHEME, dashboard.font_family)
+    raw = chart_payloads(dashboard, model, theme, threshold=args.rows + 1)
+    summary = chart_payloads(dashboard, model, theme, threshold=0)
+
+    print(f"Строк: {args.rows}")
+    for chart_id in CHARTS:
+        (raw_bytes, raw_time), (summary_bytes, summary_time) = raw[chart_id], summary[chart_id]
+        print(f"  {chart_id:<12} {raw_bytes / 1024:10.1f} КБ {raw_time * 1000:8.1f} мс  ->  "
+              f"{summary_bytes / 1024:8.1f} КБ {summary_time * 1000:8.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Холодная загрузка нескольких городов: последовательно и пулом процессов.
+
+Для каждого города synthetic_data пишет пару xlsx в отдельный каталог,
+затем city_registry.load_cities загружает все города с пустым колоночным
+кэшем - сначала в одном процессе, потом с разбором в пуле процессов.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_cities.py --cities 4 --rows 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def cold_load(registry, cache_dir, max_workers):
+    """Время загрузки всех городов с пустым кэшем, секунды"""
+    import data_loader
+    from city_registry import load_cities
+
+    # Процессы пула читают каталог кэша из переменной окружения при импорте
+    os.environ['SUSHI_CACHE_DIR'] = str(cache_dir)
+    data_loader.CACHE_DIR = Path(cache_dir)
+    start = time.perf_counter()
+    cities = load_cities(registry, max_workers=max_workers)
+    elapsed = time.perf_counter() - start
+    assert len(cities) == len(registry)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cities', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=20_000, help="анкет профиля в каждом городе")
+    parser.add_argument('--workers', type=int, default=None, help="процессов в пуле (по умолчанию - по числу ядер)")
+    args = parser.parse_args()
+
+    from data_loader import DATASETS
+    from synthetic_data import write_survey
+
+    with tempfile.TemporaryDirectory() as workdir:
+        registry = {}
+        for i in range(args.cities):
+            folder = Path(workdir) / f"city{i}"
+            write_survey(folder, rows=args.rows, seed=i)
+            registry[folder.name] = {name: str(folder / filename) for name, filename in DATASETS.items()}
+
+        sequential = cold_load(registry, Path(workdir) / 'cache-sequential', max_workers=1)
+        parallel = cold_load(registry, Path(workdir) / 'cache-parallel', max_workers=args.workers)
+
+    print(f"Городов: {args.cities}, анкет в каждом: {args.rows}, ядер: {os.cpu_count()}")
+    print(f"  последовательно {sequential:8.2f} с")
+    print(f"  пул процессов   {parallel:8.2f} с   ускорение x{sequential / parallel:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Сравнение скорости clean_excel_errors с прежней реализацией.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_clean_excel_errors.py --rows 20000 --cols 60
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_loader import EXCEL_ERRORS, clean_excel_errors
+
+
+def clean_excel_errors_legacy(df):
+    """Прежняя реализация: отдельный проход по колонке для каждой ошибки"""
+    df_clean = df.copy()
+
+    for col in df_clean.columns:
+        for error in EXCEL_ERRORS:
+            df_clean[col] = df_clean[col].replace(error, np.nan)
+            mask = df_clean[col].astype(str).str.contains(error, na=False)
+            if mask.any():
+                df_clean.loc[mask, col] = np.nan
+
+    return df_clean
+
+
+def make_wide_frame(rows, cols, error_rate=0.01, seed=42):
+    """Широкая синтетическая таблица: половина колонок текст, половина числа"""
+    rng = np.random.default_rng(seed)
+    answers = np.array(['Японский домик', 'Суши маркет', 'Япончик', 'Зебры', 'Киото'], dtype=object)
+    data = {}
+    for i in range(cols):
+        if i % 2:
+            data[f'кол-во.{i}'] = rng.integers(0, 300, rows).astype(float)
+        else:
+            column = answers[rng.integers(0, len(answers), rows)]
+            errors = rng.random(rows) < error_rate
+            column[errors] = rng.choice(EXCEL_ERRORS, int(errors.sum()))
+            data[f'вопрос {i}'] = column
+    return pd.DataFrame(data)
+
+
+def best_of(func, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--cols', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_wide_frame(args.rows, args.cols)
+
+    legacy = clean_excel_errors_legacy(df)
+    current, counts = clean_excel_errors(df, return_counts=True)
+    pd.testing.assert_frame_equal(legacy.isna(), current.isna())
+
+    legacy_time = best_of(clean_excel_errors_legacy, df, args.repeat)
+    current_time = best_of(clean_excel_errors, df, args.repeat)
+
+    print(f"Таблица: {args.rows} строк x {args.cols} колонок, обнулено ячеек: {counts.sum()}")
+    print(f"Прежняя реализация: {legacy_time * 1000:.1f} мс")
+    print(f"Векторная реализация: {current_time * 1000:.1f} мс")
+    print(f"Ускорение: x{legacy_time / current_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
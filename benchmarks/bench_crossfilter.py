@@ -0,0 +1,93 @@
+"""Сравнение перекрестного фильтра на битовых картах с фильтрацией таблицы.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_crossfilter.py --rows 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from crossfilter import SegmentIndex
+from data_loader import clean_excel_errors
+from preferences import PreferenceCounts
+from synthetic_data import SUSHI_COLUMN, make_profile
+
+COLUMNS = ('пол', 'возраст', 'доход')
+
+# Комбинации фильтров: от одного условия до трех колонок с несколькими значениями
+QUERIES = (
+    {'пол': ['Женский']},
+    {'пол': ['Женский'], 'возраст': ['18-24']},
+    {'пол': ['Мужской'], 'возраст': ['25-34', '35-44'], 'доход': ['30 000-39 000', 'Более 60 000']},
+)
+
+
+def scan_query(df, preferences, selection):
+    """Прежний способ: булева маска по таблице и value_counts упоминаний"""
+    mask = pd.Series(True, index=df.index)
+    for column, values in selection.items():
+        mask &= df[column].isin(values)
+    tokens = preferences.tokens[mask.reindex(preferences.tokens.index).to_numpy()]
+    return int(mask.sum()), tokens.value_counts()
+
+
+def index_query(index, selection):
+    mask = index.mask(selection)
+    return index.count(mask), index.top_sushi(mask, 10)
+
+
+def check_top(scan_counts, index_top):
+    """Топ совпадает с полными частотами сегмента.
+
+    Порядок названий с равным числом упоминаний в двух способах разный,
+    поэтому сравниваются частоты по именам и последовательность частот.
+    """
+    assert (scan_counts.head(len(index_top)).to_numpy() == index_top.to_numpy()).all()
+    pd.testing.assert_series_equal(scan_counts[index_top.index], index_top,
+                                   check_names=False, check_index_type=False)
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = clean_excel_errors(make_profile(args.rows))
+    preferences = PreferenceCounts(df[SUSHI_COLUMN])
+
+    start = time.perf_counter()
+    index = SegmentIndex(df, COLUMNS, preferences=preferences)
+    print(f"Анкет: {args.rows}, построение индекса: {(time.perf_counter() - start) * 1000:.0f} мс")
+
+    for selection in QUERIES:
+        scan_size, scan_counts = scan_query(df, preferences, selection)
+        index_size, index_top = index_query(index, selection)
+        assert scan_size == index_size
+        check_top(scan_counts, index_top)
+
+        scan_time = best_of(lambda: scan_query(df, preferences, selection), args.repeat)
+        index_time = best_of(lambda: index_query(index, selection), args.repeat)
+        print(f"{selection}: {index_size} анкет")
+        print(f"  фильтр таблицы {scan_time * 1000:8.1f} мс, битовые карты {index_time * 1000:8.1f} мс, "
+              f"ускорение x{scan_time / index_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
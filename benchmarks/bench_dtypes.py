@@ -0,0 +1,62 @@
+"""Память и скорость типовых операций до и после подбора компактных типов.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_dtypes.py --rows 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_loader import clean_excel_errors, optimize_dtypes
+from synthetic_data import generate_survey, with_loaded_names
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def column_operations(df):
+    """value_counts и dropna по каждой колонке, как при построении агрегатов"""
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        column.value_counts()
+        column.dropna()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    market, profile = generate_survey(args.rows)
+    tables = {
+        'рынок': clean_excel_errors(with_loaded_names(market)),
+        'профиль': clean_excel_errors(profile),
+    }
+    for name, df in tables.items():
+        typed, report = optimize_dtypes(df, return_report=True)
+        before, after = report['bytes_before'].sum(), report['bytes_after'].sum()
+        print(f"{name}: {len(df)} строк, {before / 2**20:.1f} МБ -> {after / 2**20:.1f} МБ "
+              f"(x{before / after:.1f})")
+        changed = report[report['dtype_before'] != report['dtype_after']]
+        for row in changed.itertuples():
+            print(f"  {row.column[:40]:<40} {row.dtype_before:>8} -> {row.dtype_after:<9}"
+                  f"{row.bytes_before / 2**20:8.1f} -> {row.bytes_after / 2**20:.1f} МБ")
+        plain_time = best_of(lambda: column_operations(df), args.repeat)
+        typed_time = best_of(lambda: column_operations(typed), args.repeat)
+        print(f"  value_counts + dropna: {plain_time * 1000:.0f} мс -> {typed_time * 1000:.0f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Выгрузка агрегатов: потоковый zip против сборки файлов в памяти.
+
+Прежний способ - отдельно собрать в BytesIO книгу pd.ExcelWriter, parquet и
+CSV каждой таблицы и только потом упаковать их в архив; export.write_bundle
+пишет порции прямо в записи zip. Сравниваются время, пиковая память
+(tracemalloc) и повторное обращение к архиву на диске (bundle_path).
+Таблица рынка берется с ответами отдельных анкет, как в bench_chart_payload.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_export.py --rows 100000
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+import export
+from analytics import AnalyticsModel
+from bench_chart_payload import respondent_level
+from bench_pipeline import best_time, peak_memory
+from data_loader import clean_excel_errors, optimize_dtypes
+from synthetic_data import generate_survey, with_loaded_names
+
+
+def in_memory_bundle(model):
+    """Все файлы собираются целиком в памяти, затем упаковываются"""
+    tables = list(export.model_tables(model))
+    files = {}
+    workbook = io.BytesIO()
+    with pd.ExcelWriter(workbook, engine='openpyxl') as writer:
+        for name, df in tables:
+            df.to_excel(writer, sheet_name=name[:31], index=False)
+    files['aggregates.xlsx'] = workbook.getvalue()
+    for name, df in tables:
+        files[f"parquet/{name}.parquet"] = df.to_parquet(index=False)
+        files[f"csv/{name}.csv"] = df.to_csv(index=False).encode('utf-8-sig')
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for path, content in files.items():
+            archive.writestr(path, content)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    market, profile = generate_survey(args.rows, seed=args.seed, market_rows=11)
+    df_profile = optimize_dtypes(clean_excel_errors(profile))
+    df_market = optimize_dtypes(clean_excel_errors(with_loaded_names(market)))
+    df_market = respondent_level(df_market, df_profile, args.rows, args.seed)
+    model = AnalyticsModel(df_market, df_profile, fingerprint=f'bench-{args.rows}')
+    rows = sum(len(df) for _, df in export.model_tables(model))
+
+    def streaming():
+        with tempfile.TemporaryFile() as f:
+            export.write_bundle(model, f)
+
+    results = {
+        'в памяти': (best_time(lambda: in_memory_bundle(model), args.repeat),
+                     peak_memory(lambda: in_memory_bundle(model))),
+        'потоково': (best_time(streaming, args.repeat), peak_memory(streaming)),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        export.EXPORT_DIR = Path(directory)
+        export.bundle_path(model)
+        start = time.perf_counter()
+        size = os.path.getsize(export.bundle_path(model))
+        cached_time = time.perf_counter() - start
+
+    print(f"Анкет: {args.rows}, строк во всех таблицах: {rows}, архив {size / 1024:.1f} КБ")
+    for name, (seconds, peak) in results.items():
+        print(f"  {name:<9} {seconds * 1000:9.1f} мс  пик {peak / 1024 / 1024:8.1f} МБ")
+    print(f"  архив с диска {cached_time * 1000:.2f} мс")
+
+
+if __name__ == '__main__':
+    main()
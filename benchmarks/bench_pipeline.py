@@ -0,0 +1,242 @@
+"""Замеры этапов дашборда на синтетических данных разного размера.
+
+Этапы: загрузка xlsx (холодная и из колоночного кэша), clean_excel_errors,
+подбор компактных типов, определение схемы, агрегаты каждой вкладки
+AnalyticsModel и сборка каждого графика (вместе с create_custom_chart).
+Для каждого этапа записываются лучшее время из нескольких повторов и
+пиковая память (tracemalloc, отдельным проходом, чтобы трассировка не
+искажала время). Браузер не нужен: функции вкладок вызываются в "голом"
+режиме Streamlit без вывода графиков.
+Данные строит synthetic_data.generate_survey с фиксированным seed.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_pipeline.py --rows 1000,100000,1000000
+    python benchmarks/bench_pipeline.py --save-baseline   # сохранить эталон
+    python benchmarks/bench_pipeline.py --check           # сравнить с эталоном
+
+С --check скрипт завершается с кодом 1, если какой-либо этап стал медленнее
+или прожорливее эталона больше чем на допуск.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from analytics import AnalyticsModel
+from data_loader import MARKET_FILE, PROFILE_FILE, clean_excel_errors, load_sources, optimize_dtypes
+from schema import resolve_schema
+from synthetic_data import generate_survey, with_loaded_names, write_xlsx
+
+BASELINE_FILE = Path(__file__).resolve().parent / 'baseline_pipeline.json'
+
+# Выше этого размера xlsx не пишется: openpyxl записывает 1М строк минутами
+MAX_XLSX_ROWS = 100_000
+
+# Агрегаты вкладок: этап -> метод AnalyticsModel
+AGGREGATE_STAGES = {
+    'attendance': '_build_attendance',
+    'restaurants': '_build_restaurants',
+    'pricing': '_build_pricing',
+    'satisfaction': '_build_satisfaction',
+    'profile': '_build_profile',
+}
+
+# Функции вкладок дашборда, в которых собираются графики
+RENDER_FUNCTIONS = ('render_attendance', 'render_restaurants', 'render_pricing',
+                    'render_satisfaction', 'render_profile')
+
+
+def best_time(func, repeat):
+    """Лучшее время из repeat запусков, секунды"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def peak_memory(func):
+    """Пиковый объем памяти Python/numpy за один запуск, байты"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def figure_probe(dashboard):
+    """Подменяет кэш графиков: сборщик вызывается напрямую, вывод отключен"""
+    builders = {}
+    original_cached_figure = dashboard.cached_figure
+    original_plotly_chart = dashboard.st.plotly_chart
+
+    def collect(chart_id, model, theme, builder):
+        builders[chart_id] = builder
+        return builder()
+
+    dashboard.cached_figure = collect
+    dashboard.st.plotly_chart = lambda *args, **kwargs: None
+    try:
+        yield builders
+    finally:
+        dashboard.cached_figure = original_cached_figure
+        dashboard.st.plotly_chart = original_plotly_chart
+
+
+def import_dashboard():
+    """Модуль дашборда в голом режиме Streamlit (без сервера и браузера)"""
+    from streamlit import logger
+
+    logger.set_log_level('error')
+    import dashboard
+    return dashboard
+
+
+def stage_callables(df_market, df_profile, rows):
+    """Этапы бенчмарка: имя -> функция без аргументов"""
+    stages = {}
+
+    # Загрузка замеряется в рабочем каталоге, куда записаны xlsx файлы
+    if rows <= MAX_XLSX_ROWS:
+        stages['load.xlsx'] = lambda: load_sources(use_cache=False)
+        load_sources()
+        stages['load.cached'] = lambda: load_sources()
+
+    stages['clean.market'] = lambda: clean_excel_errors(df_market)
+    stages['clean.profile'] = lambda: clean_excel_errors(df_profile)
+    df_market = clean_excel_errors(df_market)
+    df_profile = clean_excel_errors(df_profile)
+
+    stages['types.market'] = lambda: optimize_dtypes(df_market)
+    stages['types.profile'] = lambda: optimize_dtypes(df_profile)
+    df_market = optimize_dtypes(df_market)
+    df_profile = optimize_dtypes(df_profile)
+
+    schema = resolve_schema(df_market, df_profile)
+    stages['schema'] = lambda: resolve_schema(df_market, df_profile)
+
+    for name, method in AGGREGATE_STAGES.items():
+        def aggregate(method=method):
+            model = AnalyticsModel.__new__(AnalyticsModel)
+            model.schema = schema
+            model._aggregates = model._profile_summary = model._profile_loader = None
+            frame = df_profile if method == '_build_profile' else df_market
+            getattr(model, method)(frame)
+        stages[f'aggregate.{name}'] = aggregate
+    stages['aggregate.model'] = lambda: AnalyticsModel(df_market, df_profile, fingerprint='bench', schema=schema)
+
+    dashboard = import_dashboard()
+    model = AnalyticsModel(df_market, df_profile, fingerprint='bench', schema=schema)
+    theme = dashboard.get_theme(dashboard.DEFAULT_SCHEME, dashboard.font_family)
+    with figure_probe(dashboard) as builders:
+        for render in RENDER_FUNCTIONS:
+            getattr(dashboard, render)(model, theme)
+    for chart_id, builder in builders.items():
+        stages[f'figure.{chart_id}'] = builder
+    return stages
+
+
+def run_size(rows, repeat, seed):
+    """Результаты всех этапов для одного размера данных"""
+    market, profile = generate_survey(rows, seed=seed)
+    results = {}
+    previous_dir = Path.cwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        if rows <= MAX_XLSX_ROWS:
+            write_xlsx(market, Path(workdir) / MARKET_FILE)
+            write_xlsx(profile, Path(workdir) / PROFILE_FILE)
+        os.chdir(workdir)
+        try:
+            stages = stage_callables(with_loaded_names(market), profile, rows)
+            for name, func in stages.items():
+                results[name] = {
+                    'seconds': best_time(func, repeat),
+                    'peak_bytes': peak_memory(func),
+                }
+        finally:
+            os.chdir(previous_dir)
+    return results
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """Список регрессий относительно эталона"""
+    regressions = []
+    for size, stages in results.items():
+        for name, current in stages.items():
+            reference = baseline.get(size, {}).get(name)
+            if reference is None:
+                continue
+            time_limit = max(reference['seconds'] * (1 + tolerance), reference['seconds'] + min_seconds)
+            if current['seconds'] > time_limit:
+                regressions.append(
+                    f"{size} {name}: {current['seconds'] * 1000:.1f} мс > {time_limit * 1000:.1f} мс"
+                )
+            memory_limit = reference['peak_bytes'] * (1 + tolerance) + 1024 * 1024
+            if current['peak_bytes'] > memory_limit:
+                regressions.append(
+                    f"{size} {name}: {current['peak_bytes'] / 2**20:.1f} МБ > {memory_limit / 2**20:.1f} МБ"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='1000,100000,1000000',
+                        help="размеры данных через запятую")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42, help="seed генератора данных")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="сохранить результаты как эталон")
+    parser.add_argument('--check', action='store_true', help="сравнить с эталоном, код 1 при регрессии")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="допустимый рост времени и памяти (0.5 = +50%%)")
+    parser.add_argument('--min-seconds', type=float, default=0.005,
+                        help="допустимый рост времени в секундах для быстрых этапов")
+    args = parser.parse_args()
+    os.chdir(ROOT)
+
+    results = {}
+    for rows in (int(value) for value in args.rows.split(',')):
+        results[str(rows)] = run_size(rows, args.repeat, args.seed)
+        print(f"\n{rows} строк")
+        for name, result in results[str(rows)].items():
+            print(f"  {name:<24} {result['seconds'] * 1000:10.1f} мс {result['peak_bytes'] / 2**20:10.1f} МБ")
+
+    if args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline.exists() else {}
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"\nЭталон сохранен: {args.baseline}")
+
+    if args.check:
+        if not args.baseline.exists():
+            print(f"\nНет эталона {args.baseline}: запустите с --save-baseline")
+            sys.exit(1)
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+        if regressions:
+            print("\nРегрессии:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nРегрессий нет")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Бутстреп точек Ван Вестендорпа: повторы по анкетам против матрицы частот.
+
+Прежний подход - в каждом повторе выбирать анкеты с возвращением и заново
+строить распределения цен; PriceSensitivity строит все повторы одной
+полиномиальной матрицей по уровням цены. Оценки и интервалы сравниваются.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_price_sensitivity.py --rows 1000000 --boot 200
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from price_sensitivity import POINTS, PriceSensitivity, _curves, _intersections, price_distribution
+
+PRICES = np.array([139, 189, 199, 249, 349], dtype=float)
+
+
+def responses(rows, seed):
+    """Сырые ответы на три ценовых вопроса"""
+    rng = np.random.default_rng(seed)
+    too_cheap = rng.choice(PRICES, rows, p=[0.571, 0.157, 0.14, 0.055, 0.077])
+    too_expensive = rng.choice(PRICES, rows, p=[0.025, 0.106, 0.149, 0.286, 0.434])
+    fair = rng.choice(PRICES, rows, p=[0.1, 0.274, 0.32, 0.229, 0.077])
+    return too_cheap, too_expensive, fair
+
+
+def respondent_bootstrap(answers, n_boot, seed):
+    """Повторы по анкетам: выборка индексов и пересчет распределений в цикле"""
+    rng = np.random.default_rng(seed)
+    grid = np.unique(np.concatenate(answers))
+    points = {key: [] for key in POINTS}
+    for _ in range(n_boot):
+        sample = rng.integers(0, len(answers[0]), len(answers[0]))
+        curves = _curves(grid, *(price_distribution(column[sample]) for column in answers))
+        for key, (a, b, _) in POINTS.items():
+            points[key].append(_intersections(grid, curves[a], curves[b])[0])
+    return {key: np.array(values) for key, values in points.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--boot', type=int, default=200, help="повторов бутстрепа")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    answers = responses(args.rows, args.seed)
+
+    start = time.perf_counter()
+    loop_points = respondent_bootstrap(answers, args.boot, args.seed)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sensitivity = PriceSensitivity(*(price_distribution(column) for column in answers),
+                                   sample_size=args.rows, n_boot=args.boot, seed=args.seed)
+    matrix_time = time.perf_counter() - start
+
+    print(f"Анкет: {args.rows}, повторов: {args.boot}")
+    for key in POINTS:
+        print(f"  {key}: {sensitivity.points[key]:7.1f} ₽, "
+              f"ст. откл. повторов: по анкетам {np.nanstd(loop_points[key]):.3f}, "
+              f"матрица {np.nanstd(sensitivity.bootstrap[key]):.3f}")
+    print(f"  по анкетам {loop_time * 1000:10.1f} мс")
+    print(f"  матрица    {matrix_time * 1000:10.1f} мс   ускорение x{loop_time / matrix_time:.0f}")
+
+
+if __name__ == '__main__':
+    main()
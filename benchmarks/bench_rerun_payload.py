@@ -0,0 +1,89 @@
+"""Объем HTML, который дашборд отправляет в браузер на каждом перезапуске.
+
+Сравнивает встроенный <style> (прежний вариант) с подключением хэшированной
+таблицы стилей и KPI карточки на inline стилях с карточками на классах.
+Запуск из корня репозитория (нужны файлы данных):
+
+    python benchmarks/bench_rerun_payload.py
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from styles import build_stylesheet, kpi_card, stylesheet_html
+from theme import BASE_COLORS
+
+
+def kpi_card_legacy(gradient, shadow, icon, title, value):
+    """KPI карточка в прежнем виде: все оформление в атрибутах style"""
+    return f"""
+        <div style="
+            background: linear-gradient(135deg, {gradient});
+            padding: 2rem;
+            border-radius: 20px;
+            color: white;
+            text-align: center;
+            box-shadow: 0 10px 30px {shadow};
+            transform: translateY(0);
+            transition: all 0.3s ease;
+            border: none;
+            position: relative;
+            overflow: hidden;
+        ">
+            <div style="font-size: 3rem; margin-bottom: 0.5rem;">{icon}</div>
+            <div style="font-size: 1.8rem; font-weight: 700; margin-bottom: 0.5rem;">{title}</div>
+            <div style="font-size: 1.2rem; opacity: 0.9; font-weight: 500;">{value}</div>
+            <div style="position: absolute; top: -20px; right: -20px; width: 60px; height: 60px; background: rgba(255,255,255,0.1); border-radius: 50%;"></div>
+        </div>
+        """
+
+
+def rerun_markdown_bytes(inline_css):
+    """Суммарный объем markdown элементов одного перезапуска дашборда"""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['SUSHI_INLINE_CSS'] = '1' if inline_css else '0'
+    app = AppTest.from_file(str(ROOT / 'dashboard.py'), default_timeout=120)
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    return sum(len(element.value.encode('utf-8')) for element in app.markdown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--skip-app', action='store_true', help="не запускать дашборд, только шаблоны")
+    args = parser.parse_args()
+    os.chdir(ROOT)
+
+    css = build_stylesheet("Inter", BASE_COLORS)
+    link = stylesheet_html(css)
+    print(f"Таблица стилей: {len(css.encode('utf-8'))} байт, тег <link>: {len(link.encode('utf-8'))} байт")
+
+    cards = [
+        (('#667eea 0%, #764ba2 100%', 'rgba(102, 126, 234, 0.3)', "🏆", "Лидер рынка", "Японский домик"),
+         ('leader', "🏆", "Лидер рынка", "Японский домик")),
+        (('#4facfe 0%, #00f2fe 100%', 'rgba(79, 172, 254, 0.3)', "⭐", "Средняя оценка", "4.2/5"),
+         ('score', "⭐", "Средняя оценка", "4.2/5")),
+        (('#fa709a 0%, #fee140 100%', 'rgba(250, 112, 154, 0.3)', "🎯", "Топ цель", "Перекусить"),
+         ('purpose', "🎯", "Топ цель", "Перекусить")),
+    ]
+    legacy = sum(len(kpi_card_legacy(*old).encode('utf-8')) for old, _ in cards)
+    current = sum(len(kpi_card(*new).encode('utf-8')) for _, new in cards)
+    print(f"KPI карточки: было {legacy} байт, стало {current} байт")
+
+    if not args.skip_app:
+        inline = rerun_markdown_bytes(inline_css=True)
+        linked = rerun_markdown_bytes(inline_css=False)
+        print(f"Markdown за перезапуск со встроенным <style>: {inline} байт")
+        print(f"Markdown за перезапуск с <link>: {linked} байт")
+        print(f"Экономия: {inline - linked} байт ({(inline - linked) / inline:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Агрегаты профиля в SQL (хранилище SQLite) против pandas.
+
+Синтетические анкеты записываются в базу survey_store, затем частоты пола,
+возраста и дохода и describe числовых колонок рынка считаются двумя
+способами: выгрузкой таблицы в pandas и запросами SurveyStore. Отдельно
+замеряются импорт с построением индексов и одновременные запросы из
+нескольких потоков через пул соединений.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_survey_store.py --rows 1000000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_loader import clean_excel_errors, optimize_dtypes
+from schema import resolve_schema
+from survey_store import SurveyStore, write_table
+from synthetic_data import generate_survey, with_loaded_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    market, profile = generate_survey(args.rows, seed=args.seed)
+    df_profile = optimize_dtypes(clean_excel_errors(profile))
+    df_market = optimize_dtypes(clean_excel_errors(with_loaded_names(market)))
+    schema = resolve_schema(df_market, df_profile)
+    columns = [schema.profile_column(role) for role in ('gender', 'age', 'income')]
+    numeric = list(df_market[schema.price_columns].select_dtypes(include=[np.number]).columns)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'survey.sqlite'
+        start = time.perf_counter()
+        write_table('market', df_market, path=path)
+        write_table('profile', df_profile, path=path)
+        import_time = time.perf_counter() - start
+        store = SurveyStore(path)
+
+        def in_pandas():
+            profile = store.read_table('profile')
+            market = store.read_table('market')
+            return [profile[column].value_counts() for column in columns], market[numeric].describe()
+
+        def in_sql():
+            return [store.value_counts('profile', column) for column in columns], store.describe('market', numeric)
+
+        start = time.perf_counter()
+        pandas_counts, pandas_describe = in_pandas()
+        pandas_time = time.perf_counter() - start
+        start = time.perf_counter()
+        sql_counts, sql_describe = in_sql()
+        sql_time = time.perf_counter() - start
+
+        same = all((a.to_numpy() == b.to_numpy()).all() for a, b in zip(pandas_counts, sql_counts))
+        same = same and np.allclose(pandas_describe.to_numpy(), sql_describe.to_numpy(), equal_nan=True)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(lambda column: store.value_counts('profile', column), columns * args.threads))
+        concurrent_time = time.perf_counter() - start
+        store.close()
+
+    print(f"Анкет: {args.rows}, база {path.name}")
+    print(f"  импорт с индексами        {import_time * 1000:10.1f} мс")
+    print(f"  выгрузка в pandas         {pandas_time * 1000:10.1f} мс  ({df_profile.memory_usage(deep=True).sum() / 1024 / 1024:.1f} МБ таблица)")
+    print(f"  запросы SQL               {sql_time * 1000:10.1f} мс  ({sum(len(c) for c in sql_counts)} строк результата)")
+    print(f"  {len(columns) * args.threads} запросов в {args.threads} потоках {concurrent_time * 1000:8.1f} мс")
+    print(f"  результаты совпадают: {'да' if same else 'НЕТ'}")
+
+
+if __name__ == '__main__':
+    main()
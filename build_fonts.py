@@ -0,0 +1,113 @@
+"""Сборка локальных шрифтов дашборда.
+
+Берет исходные файлы шрифтов (Inter, JetBrains Mono в формате TTF/OTF/WOFF2)
+из assets/fonts, оставляет в них только латиницу, кириллицу и символы,
+которые встречаются в текстах дашборда, и сохраняет в WOFF2 в static/fonts.
+Там же создается fonts.json, по которому дашборд подключает шрифты через
+статические файлы Streamlit без обращений к внешним серверам.
+
+Запуск:
+
+    python build_fonts.py
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from fontTools import subset
+
+SOURCE_DIR = Path("assets/fonts")
+OUTPUT_DIR = Path("static/fonts")
+MANIFEST_FILE = "fonts.json"
+
+# Файлы, из которых собираются символы, используемые дашбордом
+TEXT_SOURCES = ("dashboard.py",)
+
+# Базовая латиница, Latin-1, кириллица и типографские знаки
+UNICODE_RANGES = (
+    (0x0020, 0x007E),
+    (0x00A0, 0x00FF),
+    (0x0400, 0x045F),
+    (0x2010, 0x2027),
+    (0x2030, 0x203A),
+)
+EXTRA_CHARACTERS = "₽№"
+
+
+def dashboard_unicodes(text_sources=TEXT_SOURCES):
+    """Коды символов для подмножества шрифта"""
+    unicodes = set()
+    for start, end in UNICODE_RANGES:
+        unicodes.update(range(start, end + 1))
+    unicodes.update(map(ord, EXTRA_CHARACTERS))
+    for path in text_sources:
+        path = Path(path)
+        if path.exists():
+            # Эмодзи и прочие символы без глифов в шрифте субсеттер пропустит
+            unicodes.update(ord(ch) for ch in path.read_text(encoding='utf-8') if ord(ch) > 0x7E)
+    return sorted(unicodes)
+
+
+def font_info(font):
+    """Семейство, насыщенность и начертание шрифта из его таблиц"""
+    names = font['name']
+    family = names.getDebugName(16) or names.getDebugName(1)
+    weight = font['OS/2'].usWeightClass
+    italic = bool(font['OS/2'].fsSelection & 1)
+    # Вариативный шрифт покрывает весь диапазон насыщенности
+    if 'fvar' in font:
+        axis = next((a for a in font['fvar'].axes if a.axisTag == 'wght'), None)
+        if axis is not None:
+            weight = f"{int(axis.minValue)} {int(axis.maxValue)}"
+    return {'family': family, 'weight': str(weight), 'style': 'italic' if italic else 'normal'}
+
+
+def build_font(source, output_dir, unicodes):
+    """Сохраняет подмножество одного шрифта в WOFF2, возвращает запись манифеста"""
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+
+    font = subset.load_font(str(source), options)
+    info = font_info(font)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+
+    target = output_dir / f"{source.stem}.woff2"
+    subset.save_font(font, str(target), options)
+    return dict(info, file=target.name, size=target.stat().st_size)
+
+
+def build_fonts(source_dir=SOURCE_DIR, output_dir=OUTPUT_DIR, text_sources=TEXT_SOURCES):
+    """Собирает все шрифты из source_dir и пишет манифест"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    unicodes = dashboard_unicodes(text_sources)
+    sources = sorted(
+        path for path in source_dir.iterdir()
+        if path.suffix.lower() in ('.ttf', '.otf', '.woff', '.woff2')
+    ) if source_dir.exists() else []
+
+    fonts = [build_font(source, output_dir, unicodes) for source in sources]
+    with open(output_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(fonts, f, ensure_ascii=False, indent=2)
+    return fonts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка WOFF2 подмножеств шрифтов дашборда")
+    parser.add_argument('--source', type=Path, default=SOURCE_DIR)
+    parser.add_argument('--output', type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    fonts = build_fonts(args.source, args.output)
+    if not fonts:
+        print(f"Не найдены шрифты в {args.source}: положите туда TTF/OTF файлы Inter и JetBrains Mono")
+    for font in fonts:
+        print(f"{font['file']}: {font['family']} {font['weight']} {font['style']}, {font['size'] / 1024:.1f} КБ")
+
+
+if __name__ == '__main__':
+    main()
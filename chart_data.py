@@ -0,0 +1,64 @@
+"""Сводки данных для графиков на больших выборках.
+
+px.histogram, px.box и px.scatter отправляют в браузер все наблюдения, и
+на больших панелях JSON графика занимает мегабайты. Начиная с
+LARGE_DATA_ROWS значений дашборд строит графики по сводкам, посчитанным
+здесь на NumPy: гистограмма - по готовым интервалам, ящик с усами - по
+квартилям, точечная диаграмма - WebGL (scattergl) по прореженной выборке.
+"""
+
+import os
+
+import numpy as np
+
+# Начиная с этого числа значений графики строятся по сводкам
+LARGE_DATA_ROWS = int(os.environ.get('SUSHI_LARGE_DATA_ROWS', 5000))
+
+# Максимум точек точечной диаграммы в режиме больших данных
+SCATTER_MAX_POINTS = 5000
+
+
+def is_large(n_values, threshold=None):
+    """Нужен ли режим больших данных для графика из n_values значений"""
+    return n_values >= (LARGE_DATA_ROWS if threshold is None else threshold)
+
+
+def histogram_bins(values, nbins):
+    """Границы интервалов и число значений в каждом"""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return np.array([0.0, 1.0]), np.zeros(1, dtype=np.int64)
+    counts, edges = np.histogram(values, bins=max(1, int(nbins)))
+    return edges, counts
+
+
+def box_summary(values):
+    """Квартили и границы усов по правилу 1.5 IQR (как в plotly box)"""
+    values = np.sort(np.asarray(values, dtype=float))
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    # Усы - крайние значения внутри 1.5 IQR, найденные бинарным поиском
+    lower = values[np.searchsorted(values, q1 - 1.5 * iqr, side='left')]
+    upper = values[np.searchsorted(values, q3 + 1.5 * iqr, side='right') - 1]
+    return {
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'lowerfence': float(lower),
+        'upperfence': float(upper),
+        'mean': float(values.mean()),
+        'outliers': int(np.count_nonzero((values < lower) | (values > upper))),
+    }
+
+
+def downsample(df, max_points=SCATTER_MAX_POINTS, seed=0):
+    """Случайная выборка строк без повторов (порядок строк сохраняется)"""
+    if len(df) <= max_points:
+        return df
+    rng = np.random.default_rng(seed)
+    positions = np.sort(rng.choice(len(df), max_points, replace=False))
+    return df.iloc[positions]
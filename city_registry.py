@@ -0,0 +1,66 @@
+"""Реестр городов: для каждого города пара исходных файлов опроса.
+
+Города собираются из трех источников, поздние перекрывают ранние:
+
+1. исходные файлы в текущем каталоге - город по умолчанию (Омск);
+2. подкаталоги CITIES_DIR/<Город>/ с файлами тех же имен;
+3. манифест CITIES_MANIFEST вида {"Город": {"market": путь, "profile": путь}},
+   относительные пути считаются от каталога манифеста.
+
+Модуль не зависит от Streamlit.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from data_loader import DATASETS, load_frame, warm_cache
+
+DEFAULT_CITY = 'Омск'
+
+# Каталог с подкаталогами городов и манифест (можно переопределить переменными окружения)
+CITIES_DIR = Path(os.environ.get('SUSHI_CITIES_DIR', 'cities'))
+CITIES_MANIFEST = Path(os.environ.get('SUSHI_CITIES_MANIFEST', 'cities.json'))
+
+
+def discover_cities():
+    """Город -> {'market': путь, 'profile': путь} для всех найденных наборов"""
+    registry = {}
+    if all(Path(path).exists() for path in DATASETS.values()):
+        registry[DEFAULT_CITY] = dict(DATASETS)
+
+    if CITIES_DIR.is_dir():
+        for folder in sorted(CITIES_DIR.iterdir()):
+            files = {name: folder / filename for name, filename in DATASETS.items()}
+            if folder.is_dir() and all(path.exists() for path in files.values()):
+                registry[folder.name] = {name: str(path) for name, path in files.items()}
+
+    if CITIES_MANIFEST.exists():
+        with open(CITIES_MANIFEST, encoding='utf-8') as f:
+            manifest = json.load(f)
+        for city, files in manifest.items():
+            missing = sorted(set(DATASETS) - set(files))
+            if missing:
+                raise ValueError(f"{CITIES_MANIFEST}: для города {city} не указаны {', '.join(missing)}")
+            registry[city] = {name: str(CITIES_MANIFEST.parent / files[name]) for name in DATASETS}
+    return registry
+
+
+def registry_paths(registry):
+    """Все исходные файлы реестра без повторов"""
+    return list(dict.fromkeys(path for files in registry.values() for path in files.values()))
+
+
+def load_cities(registry, cities=None, max_workers=None):
+    """Таблицы городов: город -> (рынок, профиль).
+
+    Файлы без колоночного кэша сначала разбираются одним пулом процессов,
+    поэтому первая загрузка нескольких городов занимает примерно столько
+    же, сколько загрузка самого большого из них.
+    """
+    cities = list(registry if cities is None else cities)
+    warm_cache([path for city in cities for path in registry[city].values()], max_workers=max_workers)
+    return {
+        city: (load_frame(registry[city]['market']), load_frame(registry[city]['profile']))
+        for city in cities
+    }
@@ -0,0 +1,94 @@
+"""Перекрестные фильтры по сегментам респондентов.
+
+Для каждой категории колонок профиля (пол, возраст, доход) один раз
+строится битовая карта респондентов (np.packbits, 1 бит на анкету).
+Любая комбинация фильтров сводится к OR карт внутри колонки и AND между
+колонками, а размеры сегментов считаются подсчетом единичных битов, поэтому
+ответ не требует повторного прохода по таблице даже на миллионах анкет.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Число единичных битов в каждом значении байта (np.bitwise_count есть
+# только в NumPy 2)
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+class SegmentIndex:
+    """Битовые индексы категорий профиля и упоминаний суши"""
+
+    def __init__(self, df_profile, columns, preferences=None):
+        self.size = len(df_profile)
+        self.columns = list(columns)
+        self.categories = {}
+        self.codes = {}
+        self.bitmaps = {}
+        self._all = np.packbits(np.ones(self.size, dtype=bool))
+
+        for column in self.columns:
+            codes, uniques = pd.factorize(df_profile[column])
+            # Категории по убыванию частоты, как в value_counts
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            order = np.argsort(-counts, kind='stable')
+            remap = np.empty(len(order), dtype=np.int32)
+            remap[order] = np.arange(len(order), dtype=np.int32)
+            codes = np.where(codes >= 0, remap[codes], -1).astype(np.int32)
+
+            self.categories[column] = pd.Index(np.asarray(uniques)[order])
+            self.codes[column] = codes
+            self.bitmaps[column] = np.stack([
+                np.packbits(codes == code) for code in range(len(order))
+            ]) if len(order) else np.empty((0, len(self._all)), dtype=np.uint8)
+
+        # Упоминания суши: позиция респондента и код названия для каждого упоминания
+        self.sushi_names = pd.Index([])
+        self.sushi_positions = np.empty(0, dtype=np.int64)
+        self.sushi_codes = np.empty(0, dtype=np.int32)
+        if preferences is not None:
+            self.sushi_names = preferences.counts.index
+            self.sushi_positions = df_profile.index.get_indexer(preferences.tokens.index)
+            self.sushi_codes = self.sushi_names.get_indexer(preferences.tokens.to_numpy()).astype(np.int32)
+
+    def mask(self, selection=None):
+        """Битовая маска сегмента.
+
+        selection - словарь {колонка: значения}; пустой список значений
+        означает "без фильтра по колонке".
+        """
+        mask = None
+        for column, values in (selection or {}).items():
+            if not values:
+                continue
+            codes = self.categories[column].get_indexer(list(values))
+            codes = codes[codes >= 0]
+            if len(codes):
+                column_mask = np.bitwise_or.reduce(self.bitmaps[column][codes], axis=0)
+            else:
+                column_mask = np.zeros_like(self._all)
+            mask = column_mask if mask is None else mask & column_mask
+        return self._all if mask is None else mask
+
+    def count(self, mask):
+        """Число респондентов в сегменте"""
+        return int(_POPCOUNT[mask].sum(dtype=np.int64))
+
+    def value_counts(self, column, mask):
+        """Распределение колонки внутри сегмента (порядок - общая частота)"""
+        counts = _POPCOUNT[self.bitmaps[column] & mask].sum(axis=1, dtype=np.int64)
+        return pd.Series(counts, index=self.categories[column], name='count')
+
+    def positions(self, mask):
+        """Позиции строк профиля, попавших в сегмент"""
+        return np.flatnonzero(np.unpackbits(mask, count=self.size))
+
+    def top_sushi(self, mask, n=10):
+        """Топ-N суши/роллов внутри сегмента"""
+        if not len(self.sushi_codes):
+            return pd.Series(dtype='int64')
+        selected = np.unpackbits(mask, count=self.size).astype(bool)
+        codes = self.sushi_codes[selected[self.sushi_positions]]
+        counts = np.bincount(codes, minlength=len(self.sushi_names))
+        top = np.argsort(-counts, kind='stable')[:n]
+        top = top[counts[top] > 0]
+        return pd.Series(counts[top], index=self.sushi_names[top], name='count')
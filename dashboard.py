@@ -2,11 +2,28 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
 import os
+import json
+import html
+from functools import lru_cache, partial
 from pathlib import Path
 
+from analytics import AnalyticsModel
+from schema import SchemaError
+from figure_cache import FigureCache
+from chart_data import SCATTER_MAX_POINTS, downsample, is_large
+from data_viewer import PAGE_SIZES, filter_sort_positions, page_count, page_slice
+from theme import BASE_COLORS, COLOR_SCHEMES, DEFAULT_SCHEME, get_theme
+from styles import CSS_FONT_PATH, FONT_URL, build_stylesheet, kpi_card, stylesheet_html
+import profiling
+from profiling import JSONL_FILE, PROFILE_DIR, PROMETHEUS_FILE, Profiler, activate, span
+from data_loader import (DATASETS, data_fingerprint, dataset_fingerprints, is_large_source, load_frame, load_summary,
+                         stat_signature, warm_cache)
+from export import bundle_bytes
+from survey_store import DATA_SOURCE, STORE_FILE, SurveyStore, store_paths
+from city_registry import CITIES_DIR, CITIES_MANIFEST, DEFAULT_CITY, discover_cities, registry_paths
+
 # Настройка страницы
 st.set_page_config(
     page_title="Анализ рынка суши-ресторанов в Омске",
@@ -15,784 +32,638 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Локальные шрифты (собираются скриптом build_fonts.py); их URL - FONT_URL из styles
+FONT_DIR = Path("static/fonts")
+
 def get_font_setup():
     """Определяет какой шрифт использовать"""
-    # Проверяем наличие файлов шрифтов
-    font_dir = Path("assets/fonts")
-    has_custom_fonts = False
-    
-    if font_dir.exists():
-        woff2_files = list(font_dir.glob("*.woff2"))
-        if woff2_files:
-            has_custom_fonts = True
-    
-    if has_custom_fonts:
-        # Используем кастомный шрифт через статические файлы
-        font_css = """
-        <link rel="preconnect" href="https://fonts.googleapis.com">
-        <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&family=JetBrains+Mono:wght@400;500;600&display=swap" rel="stylesheet">
-        """
-        font_family = "Inter"
-        font_status = "Inter (Google Fonts) + статические файлы готовы"
+    # Проверяем наличие собранных шрифтов
+    fonts = []
+    manifest_file = FONT_DIR / "fonts.json"
+    if manifest_file.exists():
+        with open(manifest_file, encoding="utf-8") as f:
+            fonts = [font for font in json.load(f) if (FONT_DIR / font["file"]).exists()]
+    
+    if fonts:
+        # Шрифты отдаются самим сервером Streamlit, внешних запросов нет
+        families = {font["family"] for font in fonts}
+        font_family = "Inter" if "Inter" in families else fonts[0]["family"]
+        preload = "".join(
+            f'<link rel="preload" href="{FONT_URL}/{font["file"]}" as="font" type="font/woff2" crossorigin>'
+            for font in fonts if font["family"] == font_family
+        )
+        # Таблица стилей лежит в static/css, поэтому пути к шрифтам относительные
+        font_faces = "".join(
+            f'@font-face {{ font-family: "{font["family"]}"; src: url("{CSS_FONT_PATH}{font["file"]}") format("woff2"); '
+            f'font-weight: {font["weight"]}; font-style: {font["style"]}; font-display: swap; }}\n'
+            for font in fonts
+        )
+        font_status = f"{font_family} (локальные WOFF2)"
     else:
-        # Используем Google Fonts как основной вариант
-        font_css = """
-        <link rel="preconnect" href="https://fonts.googleapis.com">
-        <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-        <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&family=JetBrains+Mono:wght@400;500;600&display=swap" rel="stylesheet">
-        """
+        # Без собранных шрифтов используем системный (Inter, если установлен)
+        preload = ""
+        font_faces = ""
         font_family = "Inter"
-        font_status = "Inter (Google Fonts)"
+        font_status = "системный шрифт (соберите локальные: python build_fonts.py)"
     
-    return font_css, font_family, font_status
+    return preload, font_faces, font_family, font_status
 
 # Получаем настройки шрифта
-font_css, font_family, font_status = get_font_setup()
-
-# Цветовая палитра Streamlit
-STREAMLIT_COLORS = {
-    'primary': '#1E3A8A',      # темно-синий
-    'secondary': '#3B82F6',    # синий
-    'success': '#10B981',      # зеленый
-    'warning': '#F59E0B',      # оранжевый
-    'info': '#6366F1',         # индиго
-    'purple': '#8B5CF6',       # фиолетовый
-    'dark': '#FF7F50',         # темно-серый
-    'light': '#F3F4F6',        # светло-серый
-    'accent': '#DC2626'        # красный
-}
+font_preload, font_faces, font_family, font_status = get_font_setup()
+
+# Цветовая палитра Streamlit (только для чтения; цвета сессии - в теме)
+STREAMLIT_COLORS = BASE_COLORS
+
+# Стили CSS для красивого дизайна: полный текст уходит в браузер один раз
+# файлом static/css/dashboard-<хэш>.css, на перезапусках - только тег <link>.
+# SUSHI_INLINE_CSS=1 возвращает встроенный <style> (для сравнения объема)
+STYLESHEET = build_stylesheet(font_family, STREAMLIT_COLORS, font_faces)
+st.markdown(
+    font_preload + stylesheet_html(
+        STYLESHEET,
+        static_serving=bool(st.get_option("server.enableStaticServing")) and os.environ.get("SUSHI_INLINE_CSS") != "1",
+    ),
+    unsafe_allow_html=True,
+)
 
-# Стили CSS для красивого дизайна
-st.markdown(f"""
-{font_css}
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-    
-    :root {{
-        --primary-color: {STREAMLIT_COLORS['primary']};
-        --secondary-color: {STREAMLIT_COLORS['secondary']};
-        --text-color: {STREAMLIT_COLORS['dark']};
-        --bg-light: {STREAMLIT_COLORS['light']};
-    }}
-    
-    * {{
-        font-family: "{font_family}", -apple-system, BlinkMacSystemFont, "Segoe UI", "Roboto", sans-serif !important;
-    }}
-    
-    .main-header {{
-        font-size: 3.5rem;
-        background: linear-gradient(45deg, {STREAMLIT_COLORS['primary']}, {STREAMLIT_COLORS['secondary']});
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        text-align: center;
-        margin-bottom: 2rem;
-        font-weight: 700;
-        font-family: "{font_family}", sans-serif !important;
-    }}
-    
-    .metric-card {{
-        background: linear-gradient(135deg, #f8fafc 0%, #ffffff 100%);
-        padding: 1.5rem;
-        border-radius: 15px;
-        border-left: 5px solid var(--primary-color);
-        box-shadow: 0 4px 20px rgba(30, 58, 138, 0.1);
-        font-family: "{font_family}", sans-serif !important;
-        transition: transform 0.2s ease;
-    }}
-    
-    .metric-card:hover {{
-        transform: translateY(-2px);
-        box-shadow: 0 8px 30px rgba(30, 58, 138, 0.15);
-    }}
-    
-    .sidebar .sidebar-content {{
-        background: linear-gradient(180deg, #f1f5f9 0%, #e2e8f0 100%);
-        font-family: "{font_family}", sans-serif !important;
-    }}
-    
-    .stTabs [data-baseweb="tab-list"] button [data-testid="stMarkdownContainer"] p {{
-        font-family: "{font_family}", sans-serif !important;
-        font-weight: 600;
-        font-size: 18px;
-        color: #FF8A65;
-    }}
-    
-    .stTabs [data-baseweb="tab-list"] button {{
-        background-color: transparent;
-        border-radius: 10px 10px 0 0;
-        border: none;
-        padding: 12px 20px;
-        margin-right: 4px;
-        transition: all 0.3s ease;
-    }}
-    
-    .stTabs [data-baseweb="tab-list"] button:hover {{
-        background: linear-gradient(135deg, rgba(30, 58, 138, 0.1), rgba(59, 130, 246, 0.1));
-        transform: translateY(-2px);
-    }}
-    
-    .stTabs [data-baseweb="tab-list"] button[aria-selected="true"] {{
-        background: linear-gradient(135deg, {STREAMLIT_COLORS['primary']}, {STREAMLIT_COLORS['secondary']});
-        color: white !important;
-        box-shadow: 0 4px 15px rgba(30, 58, 138, 0.3);
-    }}
-    
-    .stTabs [data-baseweb="tab-list"] button[aria-selected="true"] [data-testid="stMarkdownContainer"] p {{
-        color: white !important;
-        font-weight: 700;
-    }}
-    
-    .stSelectbox label, .stCheckbox label, .stRadio label {{
-        font-family: "{font_family}", sans-serif !important;
-        font-weight: 500;
-        color: #1F2937;
-    }}
-    
-    .stDataFrame, .stTable {{
-        font-family: "{font_family}", sans-serif !important;
-    }}
-    
-    h1, h2, h3, h4, h5, h6 {{
-        font-family: "{font_family}", sans-serif !important;
-        font-weight: 600;
-        color: #FF8A65;
-    }}
-    
-    .stMetric {{
-        font-family: "{font_family}", sans-serif !important;
-    }}
-    
-    .stMetric > div > div > div > div {{
-        font-size: 1.2rem;
-        font-weight: 600;
-    }}
-    
-    .stInfo, .stSuccess, .stWarning, .stError {{
-        font-family: "{font_family}", sans-serif !important;
-        border-radius: 10px;
-    }}
-    
-    .element-container {{
-        font-family: "{font_family}", sans-serif !important;
-    }}
-    
-    /* Кастомизация графиков */
-    .js-plotly-plot .plotly .main-svg {{
-        border-radius: 10px;
-    }}
-    
-    /* Анимации */
-    @keyframes fadeIn {{
-        from {{ opacity: 0; transform: translateY(20px); }}
-        to {{ opacity: 1; transform: translateY(0); }}
-    }}
-    
-    .element-container {{
-        animation: fadeIn 0.5s ease-out;
-    }}
-</style>
-""", unsafe_allow_html=True)
-
-def get_streamlit_layout():
-    """Настройки для всех графиков в стиле Streamlit"""
+@lru_cache(maxsize=None)
+def get_streamlit_layout(theme=None):
+    """Настройки для всех графиков в стиле Streamlit (одни на тему, не изменять)"""
+    if theme is None:
+        theme = get_theme(DEFAULT_SCHEME, font_family)
     return {
-        'font': dict(size=16, family=f'"{font_family}", Arial, sans-serif'),
-        'title_font': dict(size=24, family=f'"{font_family}", Arial, sans-serif', color="#FF8A65"),
+        'font': dict(size=16, family=f'"{theme.font_family}", Arial, sans-serif'),
+        'title_font': dict(size=24, family=f'"{theme.font_family}", Arial, sans-serif', color="#FF8A65"),
         'plot_bgcolor': 'rgba(0,0,0,0)',
         'paper_bgcolor': 'rgba(0,0,0,0)',
         'margin': dict(l=60, r=60, t=100, b=60),
         'hoverlabel': dict(
             bgcolor="white",
-            bordercolor=STREAMLIT_COLORS['primary'],
+            bordercolor=theme['primary'],
             font_size=14, 
-            font_family=f'"{font_family}", Arial, sans-serif',
+            font_family=f'"{theme.font_family}", Arial, sans-serif',
             font_color="black"
         ),
-        'colorway': list(STREAMLIT_COLORS.values())
+        'colorway': theme.values(),
+        'showlegend': True,
+        'legend': dict(
+            bgcolor="rgba(0,0,0,0)",
+            borderwidth=0,
+            font=dict(family=f'"{theme.font_family}", Arial, sans-serif', size=12)
+        )
     }
 
-@st.cache_data
-def load_data():
-    """Загрузка данных из Excel файлов"""
+# Период опроса исходных файлов в секундах (0 - не следить за изменениями)
+POLL_SECONDS = float(os.environ.get("SUSHI_POLL_SECONDS", 5))
+
+# Графики по профилю потребителей; остальные строятся по таблице рынка
+PROFILE_CHARTS = {'gender', 'age', 'income', 'sushi'}
+
+# Таблицы хранятся в cache_resource: один общий объект без распаковки копии
+# на каждом перезапуске скрипта. Таблицы только читаются, изменять их нельзя
+
+@st.cache_resource(max_entries=16)
+def load_dataset(path, fingerprint):
+    """Одна очищенная таблица; отпечаток файла в ключе сбрасывает кэш при его изменении"""
+    return load_frame(path)
+
+@st.cache_resource(max_entries=16)
+def load_source_summary(path, fingerprint):
+    """Потоковые агрегаты большой таблицы вместо построчных данных"""
+    return load_summary(path)
+
+@st.cache_resource
+def get_survey_store(path):
+    """Общий для всех сессий пул соединений только для чтения к хранилищу анкет"""
+    return SurveyStore(path)
+
+@st.cache_resource(max_entries=16)
+def load_store_table(path, name, fingerprint):
+    """Таблица из хранилища SQLite; отпечаток в ключе сбрасывает кэш после дозаписи"""
+    return get_survey_store(path).read_table(name)
+
+@st.cache_data(max_entries=64)
+def source_fingerprints(files, signature):
+    """Отпечатки таблиц и общий отпечаток города для подписи файлов (mtime и размер).
+
+    Пока файлы не меняются, манифесты кэша не читаются при каждом перезапуске.
+    """
+    return dataset_fingerprints(files), data_fingerprint((files['market'], files['profile']))
+
+@st.cache_resource(max_entries=4)
+def warm_sources(signature):
+    """Сборка колоночного кэша один раз на подпись файлов, а не на каждый перезапуск"""
+    return warm_cache([path for path, _, _ in signature])
+
+def load_data(files=DATASETS):
+    """Загрузка данных одного города из Excel файлов (через колоночный кэш).
+
+    Подпись файлов (mtime и размер) проверяется при каждом запуске скрипта,
+    поэтому обновленный xlsx подхватывается без перезапуска сервера, а таблица,
+    файл которой не менялся, берется из кэша. Если вместо файлов указано
+    хранилище {'store': путь}, таблицы читаются из SQLite. Большая таблица
+    профиля не загружается (df_profile=None): модель строится по ее
+    потоковым агрегатам (см. load_city_model).
+    """
     try:
-        # Основные данные по рынку суши
-        df_market = pd.read_excel('данные по рынку суши.xlsx')
+        if 'store' in files:
+            store = get_survey_store(files['store'])
+            fingerprints = store.fingerprints()
+            df_market = load_store_table(files['store'], 'market', fingerprints['market'])
+            df_profile = load_store_table(files['store'], 'profile', fingerprints['profile'])
+            return df_market, df_profile, store.data_fingerprint(), fingerprints
         
-        # Данные профиля потребителей
-        df_profile = pd.read_excel('профиль_потребителя.xlsx')
+        signature = stat_signature((files['market'], files['profile']))
+        fingerprints, fingerprint = source_fingerprints(files, signature)
         
-        # Очищаем данные от Excel ошибок
-        df_market = clean_excel_errors(df_market)
-        df_profile = clean_excel_errors(df_profile)
+        # Основные данные по рынку суши и профиль потребителей;
+        # очистка от Excel ошибок выполняется при сборке кэша
+        df_market = load_dataset(files['market'], fingerprints['market'])
+        df_profile = None
+        if not is_large_source(files['profile']):
+            df_profile = load_dataset(files['profile'], fingerprints['profile'])
         
-        return df_market, df_profile
+        return df_market, df_profile, fingerprint, fingerprints
     except Exception as e:
         st.error(f"Ошибка загрузки данных: {e}")
-        return None, None
+        return None, None, None, None
 
-def clean_excel_errors(df):
-    """Очищает данные от Excel ошибок типа #REF!, #N/A, #VALUE! и т.д."""
-    df_clean = df.copy()
-    
-    # Список Excel ошибок для удаления
-    excel_errors = ['#REF!', '#N/A', '#VALUE!', '#DIV/0!', '#NUM!', '#NAME?', '#NULL!']
-    
-    for col in df_clean.columns:
-        # Заменяем Excel ошибки на NaN
-        for error in excel_errors:
-            df_clean[col] = df_clean[col].replace(error, np.nan)
-            # Также проверяем строковые представления
-            mask = df_clean[col].astype(str).str.contains(error, na=False)
-            if mask.any():
-                df_clean.loc[mask, col] = np.nan
-    
-    return df_clean
+@st.cache_resource
+def get_model_history():
+    """Последняя модель каждого города: из нее переносятся разделы неизменившихся таблиц"""
+    return {}
+
+@st.cache_resource(max_entries=16)
+def get_analytics_model(fingerprint, _df_market, _df_profile, _source_fingerprints=None, _city=DEFAULT_CITY,
+                        _aggregates=None, _profile_summary=None, _profile_loader=None):
+    """Модель с предрасчитанными показателями, одна на отпечаток данных.
 
-def create_custom_chart(fig, title_color=None):
-    """Применяет кастомные настройки к графику"""
-    layout_settings = get_streamlit_layout()
+    Пересчитываются только разделы, зависящие от изменившейся таблицы;
+    с хранилищем _aggregates частоты и describe считаются в SQL, для
+    большой таблицы профиля - по потоковым агрегатам _profile_summary.
+    """
+    history = get_model_history()
+    model = AnalyticsModel(_df_market, _df_profile, fingerprint=fingerprint,
+                           source_fingerprints=_source_fingerprints, previous=history.get(_city),
+                           aggregates=_aggregates, profile_summary=_profile_summary,
+                           profile_loader=_profile_loader)
+    history[_city] = model
+    return model
+
+@st.cache_resource
+def get_figure_cache():
+    """Общий для всех сессий кэш готовых графиков"""
+    return FigureCache()
+
+def chart_fingerprint(chart_id, model):
+    """Отпечаток таблицы, по которой строится график"""
+    source = 'profile' if chart_id in PROFILE_CHARTS else 'market'
+    return model.source_fingerprints.get(source, model.fingerprint)
+
+def cached_figure(chart_id, model, theme, builder):
+    """Готовый график из кэша по (id графика, тема, отпечаток его таблицы)"""
+    key = (chart_id, theme, chart_fingerprint(chart_id, model))
+    with span(f"chart.{chart_id}.build"):
+        return get_figure_cache().get_or_build(key, builder)
+
+def show_chart(chart_id, fig):
+    """Выводит график; сериализация Plotly замеряется отдельно от сборки"""
+    with span(f"chart.{chart_id}.render"):
+        st.plotly_chart(fig, use_container_width=True)
+
+def create_custom_chart(fig, title_color=None, theme=None):
+    """Применяет кастомные настройки темы к графику"""
+    layout_settings = get_streamlit_layout(theme)
     if title_color:
-        layout_settings['title_font']['color'] = title_color
+        # Общие настройки темы не изменяем
+        layout_settings = dict(layout_settings, title_font=dict(layout_settings['title_font'], color=title_color))
     
     fig.update_layout(**layout_settings)
     
-    # Добавляем красивые границы и тени
-    fig.update_layout(
-        showlegend=True,
-        legend=dict(
-            bgcolor="rgba(0,0,0,0)",
-            borderwidth=0,
-            font=dict(family=f'"{font_family}", Arial, sans-serif', size=12)
-        )
-    )
-    
     return fig
 
-def main():
-    # Заголовок с анимацией
-    st.markdown('<h1 class="main-header">🍣 Анализ рынка суши-ресторанов в Омске</h1>', unsafe_allow_html=True)
-    
-    # Информация о шрифте
-    st.sidebar.markdown(f"**🎨 Шрифт:** {font_status}")
-    
-    # Загрузка данных
-    df_market, df_profile = load_data()
-    
-    if df_market is None or df_profile is None:
-        st.error("Не удалось загрузить данные. Проверьте наличие файлов 'данные по рынку суши.xlsx' и 'профиль_потребителя.xlsx'")
-        return
-    
-    # Боковая панель с фильтрами
-    st.sidebar.markdown("## 🎛️ Настройки дашборда")
-    
-    # Цветовая схема
-    color_scheme = st.sidebar.selectbox(
-        "🎨 Цветовая схема:",
-        ["Яркая (по умолчанию)", "Пастельная", "Монохром", "Морская"],
-        index=0
-    )
+def binned_histogram(summary, title, color):
+    """Гистограмма по интервалам, посчитанным на сервере (режим больших данных)"""
+    edges, counts = summary['bins']
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges) * 0.9,
+        marker_color=color,
+        customdata=np.column_stack([edges[:-1], edges[1:]]),
+        hovertemplate='%{customdata[0]:.0f} - %{customdata[1]:.0f} ₽<br>Количество: %{y}<extra></extra>'
+    ))
+    fig.update_layout(title=title)
+    return fig
+
+def summary_box(summary, title, color):
+    """Ящик с усами по квартилям, посчитанным на сервере (режим больших данных)"""
+    box = summary['box']
+    fig = go.Figure(go.Box(
+        x=[""],
+        q1=[box['q1']],
+        median=[box['median']],
+        q3=[box['q3']],
+        lowerfence=[box['lowerfence']],
+        upperfence=[box['upperfence']],
+        mean=[box['mean']],
+        marker_color=color,
+        name=""
+    ))
+    fig.update_layout(title=title, showlegend=False)
+    return fig
+
+def render_attendance(model, theme):
+    """Вкладка «Посещаемость»"""
+    st.markdown("### 🎯 Анализ посещаемости суши-ресторанов")
     
-    # Обновляем цвета в зависимости от выбора
-    if color_scheme == "Пастельная":
-        STREAMLIT_COLORS.update({
-            'primary': '#FFB5B5', 'secondary': '#B5E7E1', 'success': '#B5D3F0'
-        })
-    elif color_scheme == "Монохром":
-        STREAMLIT_COLORS.update({
-            'primary': '#555555', 'secondary': '#777777', 'success': '#999999'
-        })
-    elif color_scheme == "Морская":
-        STREAMLIT_COLORS.update({
-            'primary': '#006A6B', 'secondary': '#00A8CC', 'success': '#40E0D0'
-        })
+    col1_tab1, col2_tab1 = st.columns(2)
     
-    # Показать сырые данные
-    if st.sidebar.checkbox("📊 Показать исходные данные"):
-        with st.expander("📋 Таблица данных - Рынок суши", expanded=False):
-            st.dataframe(df_market, use_container_width=True)
-        with st.expander("📋 Таблица данных - Профиль потребителей", expanded=False):
-            st.dataframe(df_profile, use_container_width=True)
+    with col1_tab1:
+        # График целей посещения
+        if model.purpose_data is not None:
+            purpose_col, purpose_count_col = model.schema.pair('purpose')
+            def build_purpose():
+                fig_purpose = px.pie(
+                    model.purpose_data,
+                    values=purpose_count_col,
+                    names=purpose_col,
+                    title="🎯 Цели посещения суши-ресторанов",
+                    color_discrete_sequence=[theme['primary'], theme['secondary'], theme['success']]
+                )
+                fig_purpose.update_traces(
+                    textposition='inside',
+                    textinfo='percent+label',
+                    textfont_size=15,
+                    hovertemplate='<b>%{label}</b><br>Количество: %{value}<br>Процент: %{percent}<extra></extra>'
+                )
+                return create_custom_chart(fig_purpose, theme=theme)
+            fig_purpose = cached_figure('purpose', model, theme, build_purpose)
+            show_chart('purpose', fig_purpose)
+
+    with col2_tab1:
+        # График частоты посещений
+        if model.frequency_data is not None:
+            frequency_col, frequency_count_col = model.schema.pair('frequency')
+            def build_freq():
+                fig_freq = px.bar(
+                    model.frequency_data,
+                    x=frequency_col,
+                    y=frequency_count_col,
+                    title="📊 Частота посещения суши-ресторанов",
+                    color_discrete_sequence=[theme['info']]
+                )
+                fig_freq.update_layout(
+                    xaxis_tickangle=-45,
+                    xaxis_title="Частота посещений",
+                    yaxis_title="Количество респондентов"
+                )
+                fig_freq.update_traces(
+                    hovertemplate='<b>%{x}</b><br>Количество: %{y}<extra></extra>'
+                )
+                return create_custom_chart(fig_freq, theme=theme)
+            fig_freq = cached_figure('freq', model, theme, build_freq)
+            show_chart('freq', fig_freq)
+
+def render_restaurants(model, theme):
+    """Вкладка «Рестораны»"""
+    st.markdown("### 🏪 Анализ знания и посещения ресторанов")
     
-    # Отладочная информация
-    if st.sidebar.checkbox("🔍 Показать структуру данных"):
-        with st.expander("🗂️ Названия колонок - Рынок суши", expanded=False):
-            for i, col in enumerate(df_market.columns):
-                st.write(f"`{i}:` {col}")
-        with st.expander("🗂️ Названия колонок - Профиль потребителей", expanded=False):
-            for i, col in enumerate(df_profile.columns):
-                st.write(f"`{i}:` {col}")
+    col1_tab2, col2_tab2 = st.columns(2)
     
-    # Основные метрики с красивыми карточками
-    st.markdown("### 🎨 Ключевые показатели рынка")
+    with col1_tab2:
+        # Топ известных ресторанов
+        if model.known_data is not None:
+            known_col, known_count_col = model.schema.pair('known')
+            def build_known():
+                fig_known = px.bar(
+                    model.known_data,
+                    x=known_count_col,
+                    y=known_col,
+                    orientation='h',
+                    title="🏆 Известность суши-ресторанов в Омске",
+                    color=known_count_col,
+                    color_continuous_scale=[[0, theme['warning']], [1, theme['secondary']]]
+                )
+                fig_known.update_layout(
+                    xaxis_title="Количество упоминаний",
+                    yaxis_title="Рестораны"
+                )
+                return create_custom_chart(fig_known, theme=theme)
+            fig_known = cached_figure('known', model, theme, build_known)
+            show_chart('known', fig_known)
     
-    # Вычисляем реальные показатели из данных
-    top_restaurant = ""
-    avg_satisfaction = 0
-    top_purpose = ""
-    
-    # Находим самый популярный ресторан
-    if 'Какой суши-ресторан  посещают чаще всего' in df_market.columns and 'кол-во.3' in df_market.columns:
-        popular_data = df_market[['Какой суши-ресторан  посещают чаще всего', 'кол-во.3']].dropna()
-        if not popular_data.empty:
-            top_restaurant = popular_data.loc[popular_data['кол-во.3'].idxmax(), 'Какой суши-ресторан  посещают чаще всего']
-    
-    # Находим среднюю удовлетворенность (исправляем на формат x/5)
-    satisfaction_cols = [col for col in df_market.columns if 'балл' in col]
-    if satisfaction_cols:
-        avg_satisfaction = df_market[satisfaction_cols[0]].mean()
-        # Преобразуем из 10-балльной в 5-балльную систему
-        if avg_satisfaction > 5:
-            avg_satisfaction = avg_satisfaction / 2
-    
-    # Находим топ цель посещения
-    if 'цель посещения' in df_market.columns and 'кол-во' in df_market.columns:
-        purpose_data = df_market[['цель посещения', 'кол-во']].dropna()
-        if not purpose_data.empty:
-            top_purpose = purpose_data.loc[purpose_data['кол-во'].idxmax(), 'цель посещения']
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown(f"""
-        <div style="
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 2rem;
-            border-radius: 20px;
-            color: white;
-            text-align: center;
-            box-shadow: 0 10px 30px rgba(102, 126, 234, 0.3);
-            transform: translateY(0);
-            transition: all 0.3s ease;
-            border: none;
-            position: relative;
-            overflow: hidden;
-        ">
-            <div style="font-size: 3rem; margin-bottom: 0.5rem;">🏆</div>
-            <div style="font-size: 1.8rem; font-weight: 700; margin-bottom: 0.5rem;">Лидер рынка</div>
-            <div style="font-size: 1.2rem; opacity: 0.9; font-weight: 500;">{top_restaurant if top_restaurant else "Анализируем..."}</div>
-            <div style="position: absolute; top: -20px; right: -20px; width: 60px; height: 60px; background: rgba(255,255,255,0.1); border-radius: 50%;"></div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
-        <div style="
-            background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-            padding: 2rem;
-            border-radius: 20px;
-            color: white;
-            text-align: center;
-            box-shadow: 0 10px 30px rgba(79, 172, 254, 0.3);
-            transform: translateY(0);
-            transition: all 0.3s ease;
-            border: none;
-            position: relative;
-            overflow: hidden;
-        ">
-            <div style="font-size: 3rem; margin-bottom: 0.5rem;">⭐</div>
-            <div style="font-size: 1.8rem; font-weight: 700; margin-bottom: 0.5rem;">Средняя оценка</div>
-            <div style="font-size: 1.2rem; opacity: 0.9; font-weight: 500;">{f"{avg_satisfaction:.1f}/5" if avg_satisfaction > 0 else "Анализируем..."}</div>
-            <div style="position: absolute; top: -20px; right: -20px; width: 60px; height: 60px; background: rgba(255,255,255,0.1); border-radius: 50%;"></div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-        <div style="
-            background: linear-gradient(135deg, #fa709a 0%, #fee140 100%);
-            padding: 2rem;
-            border-radius: 20px;
-            color: white;
-            text-align: center;
-            box-shadow: 0 10px 30px rgba(250, 112, 154, 0.3);
-            transform: translateY(0);
-            transition: all 0.3s ease;
-            border: none;
-            position: relative;
-            overflow: hidden;
-        ">
-            <div style="font-size: 3rem; margin-bottom: 0.5rem;">🎯</div>
-            <div style="font-size: 1.8rem; font-weight: 700; margin-bottom: 0.5rem;">Топ цель</div>
-            <div style="font-size: 1.2rem; opacity: 0.9; font-weight: 500;">{top_purpose if top_purpose else "Определяем..."}</div>
-            <div style="position: absolute; top: -20px; right: -20px; width: 60px; height: 60px; background: rgba(255,255,255,0.1); border-radius: 50%;"></div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    # Добавляем CSS для hover эффектов
-    st.markdown("""
-    <style>
-    div[style*="background: linear-gradient"]:hover {
-        transform: translateY(-5px) !important;
-        box-shadow: 0 15px 40px rgba(0,0,0,0.2) !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    with col2_tab2:
+        # Фактическое посещение
+        if model.visit_data is not None:
+            visit_col, visit_count_col = model.schema.pair('visit')
+            def build_visit():
+                fig_visit = px.pie(
+                    model.visit_data,
+                    values=visit_count_col,
+                    names=visit_col,
+                    title="🍽️ Фактическое посещение ресторанов",
+                    color_discrete_sequence=[theme['success'], theme['purple'], theme['warning'], theme['info']]
+                )
+                fig_visit.update_traces(
+                    textposition='inside', 
+                    textinfo='percent+label', 
+                    textfont_size=15,
+                    hovertemplate='<b>%{label}</b><br>Посещений: %{value}<br>Процент: %{percent}<extra></extra>'
+                )
+                return create_custom_chart(fig_visit, theme=theme)
+            fig_visit = cached_figure('visit', model, theme, build_visit)
+            show_chart('visit', fig_visit)
     
-    st.markdown("---")
+    # Самые популярные рестораны
+    if model.popular_data is not None:
+        popular_col, popular_count_col = model.schema.pair('popular')
+        def build_popular():
+            fig_popular = px.treemap(
+                model.popular_data,
+                path=[popular_col],
+                values=popular_count_col,
+                title="🌟 Самые часто посещаемые рестораны",
+                color=popular_count_col,
+                color_continuous_scale=[[0, theme['light']], [0.5, theme['primary']], [1, theme['dark']]]
+            )
+            return create_custom_chart(fig_popular, theme=theme)
+        fig_popular = cached_figure('popular', model, theme, build_popular)
+        show_chart('popular', fig_popular)
+
+def render_pricing(model, theme):
+    """Вкладка «Ценообразование»"""
+    st.markdown("### 💰 Анализ ценообразования")
     
-    # Вкладки для разных анализов
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "🎯 Посещаемость", 
-        "🏪 Рестораны", 
-        "💰 Ценообразование", 
-        "📈 Удовлетворенность",
-        "👥 Профиль потребителей"
-    ])
-    
-    with tab1:
-        st.markdown("### 🎯 Анализ посещаемости суши-ресторанов")
-        
-        col1_tab1, col2_tab1 = st.columns(2)
-        
-        with col1_tab1:
-            # График целей посещения
-            if 'цель посещения' in df_market.columns and 'кол-во' in df_market.columns:
-                purpose_data = df_market[['цель посещения', 'кол-во']].dropna()
-                if not purpose_data.empty:
-                    fig_purpose = px.pie(
-                        purpose_data, 
-                        values='кол-во', 
-                        names='цель посещения',
-                        title="🎯 Цели посещения суши-ресторанов",
-                        color_discrete_sequence=[STREAMLIT_COLORS['primary'], STREAMLIT_COLORS['secondary'], STREAMLIT_COLORS['success']]
-                    )
-                    fig_purpose.update_traces(
-                        textposition='inside', 
-                        textinfo='percent+label', 
-                        textfont_size=15,
-                        hovertemplate='<b>%{label}</b><br>Количество: %{value}<br>Процент: %{percent}<extra></extra>'
-                    )
-                    fig_purpose = create_custom_chart(fig_purpose)
-                    st.plotly_chart(fig_purpose, use_container_width=True)
-        
-        with col2_tab1:
-            # График частоты посещений
-            if 'Как часто посещают суши-рестораны' in df_market.columns:
-                frequency_col = df_market.columns[df_market.columns.str.contains('кол-во')][1] if len(df_market.columns[df_market.columns.str.contains('кол-во')]) > 1 else 'кол-во'
-                frequency_data = df_market[['Как часто посещают суши-рестораны', frequency_col]].dropna()
-                if not frequency_data.empty:
-                    fig_freq = px.bar(
-                        frequency_data,
-                        x='Как часто посещают суши-рестораны',
-                        y=frequency_col,
-                        title="📊 Частота посещения суши-ресторанов",
-                        color_discrete_sequence=[STREAMLIT_COLORS['info']]
-                    )
-                    fig_freq.update_layout(
-                        xaxis_tickangle=-45,
-                        xaxis_title="Частота посещений",
-                        yaxis_title="Количество респондентов"
-                    )
-                    fig_freq.update_traces(
-                        hovertemplate='<b>%{x}</b><br>Количество: %{y}<extra></extra>'
-                    )
-                    fig_freq = create_custom_chart(fig_freq)
-                    st.plotly_chart(fig_freq, use_container_width=True)
+    price_columns = model.price_columns
     
-    with tab2:
-        st.markdown("### 🏪 Анализ знания и посещения ресторанов")
-        
-        col1_tab2, col2_tab2 = st.columns(2)
-        
-        with col1_tab2:
-            # Топ известных ресторанов
-            if 'Какие суши-рестораны в г. Омск  знают' in df_market.columns and 'кол-во.1' in df_market.columns:
-                known_data = df_market[['Какие суши-рестораны в г. Омск  знают', 'кол-во.1']].dropna()
-                if not known_data.empty:
-                    known_data = known_data.sort_values('кол-во.1', ascending=True)
-                    fig_known = px.bar(
-                        known_data,
-                        x='кол-во.1',
-                        y='Какие суши-рестораны в г. Омск  знают',
-                        orientation='h',
-                        title="🏆 Известность суши-ресторанов в Омске",
-                        color='кол-во.1',
-                        color_continuous_scale=[[0, STREAMLIT_COLORS['warning']], [1, STREAMLIT_COLORS['secondary']]]
-                    )
-                    fig_known.update_layout(
-                        xaxis_title="Количество упоминаний",
-                        yaxis_title="Рестораны"
-                    )
-                    fig_known = create_custom_chart(fig_known)
-                    st.plotly_chart(fig_known, use_container_width=True)
+    if price_columns:
+        st.info(f"📊 Найденные колонки с ценами: {', '.join(price_columns[:3])}...")
         
-        with col2_tab2:
-            # Фактическое посещение
-            if 'В какие суши-рестораны в г. Омск бычно ходят' in df_market.columns and 'кол-во.2' in df_market.columns:
-                visit_data = df_market[['В какие суши-рестораны в г. Омск бычно ходят', 'кол-во.2']].dropna()
-                if not visit_data.empty:
-                    visit_data = visit_data.sort_values('кол-во.2', ascending=False)
-                    fig_visit = px.pie(
-                        visit_data,
-                        values='кол-во.2',
-                        names='В какие суши-рестораны в г. Омск бычно ходят',
-                        title="🍽️ Фактическое посещение ресторанов",
-                        color_discrete_sequence=[STREAMLIT_COLORS['success'], STREAMLIT_COLORS['purple'], STREAMLIT_COLORS['warning'], STREAMLIT_COLORS['info']]
-                    )
-                    fig_visit.update_traces(
-                        textposition='inside', 
-                        textinfo='percent+label', 
-                        textfont_size=15,
-                        hovertemplate='<b>%{label}</b><br>Посещений: %{value}<br>Процент: %{percent}<extra></extra>'
-                    )
-                    fig_visit = create_custom_chart(fig_visit)
-                    st.plotly_chart(fig_visit, use_container_width=True)
-        
-        # Самые популярные рестораны
-        if 'Какой суши-ресторан  посещают чаще всего' in df_market.columns and 'кол-во.3' in df_market.columns:
-            popular_data = df_market[['Какой суши-ресторан  посещают чаще всего', 'кол-во.3']].dropna()
-            if not popular_data.empty:
-                fig_popular = px.treemap(
-                    popular_data,
-                    path=['Какой суши-ресторан  посещают чаще всего'],
-                    values='кол-во.3',
-                    title="🌟 Самые часто посещаемые рестораны",
-                    color='кол-во.3',
-                    color_continuous_scale=[[0, STREAMLIT_COLORS['light']], [0.5, STREAMLIT_COLORS['primary']], [1, STREAMLIT_COLORS['dark']]]
-                )
-                fig_popular = create_custom_chart(fig_popular)
-                st.plotly_chart(fig_popular, use_container_width=True)
-    
-    with tab3:
-        st.markdown("### 💰 Анализ ценообразования")
+        # Количество данных в каждой ценовой колонке
+        st.markdown("#### 📈 Статистика по ценовым данным")
+        st.dataframe(model.price_stats, use_container_width=True)
         
-        # Поиск колонок с ценами
-        price_columns = []
-        for col in df_market.columns:
-            if any(word in col.lower() for word in ['цена', 'цены', 'стоимость', 'руб']):
-                price_columns.append(col)
+        col1_tab3, col2_tab3 = st.columns(2)
         
-        if price_columns:
-            st.info(f"📊 Найденные колонки с ценами: {', '.join(price_columns[:3])}...")
-            
-            # Анализируем количество данных в каждой ценовой колонке
-            st.markdown("#### 📈 Статистика по ценовым данным")
-            price_stats = {}
-            for col in price_columns:
-                non_null_count = df_market[col].count()
-                price_stats[col] = non_null_count
-                
-            # Показываем статистику
-            stats_df = pd.DataFrame([
-                {"Колонка": col, "Количество ответов": count} 
-                for col, count in price_stats.items()
-            ])
-            st.dataframe(stats_df, use_container_width=True)
-            
-            col1_tab3, col2_tab3 = st.columns(2)
-            
-            # Ищем конкретные колонки по ключевым словам
-            max_price_cols = [col for col in df_market.columns if 'выше' in col.lower() and 'цен' in col.lower()]
-            min_price_cols = [col for col in df_market.columns if 'ниже' in col.lower() and 'цен' in col.lower()]
-            fair_price_cols = [col for col in df_market.columns if 'справедлив' in col.lower() and 'цен' in col.lower()]
-            
-            with col1_tab3:
-                if max_price_cols:
-                    max_price_data = df_market[max_price_cols[0]].dropna()
-                    if len(max_price_data) >= 3:  # Минимум 3 значения для графика
-                        fig_max_price = px.histogram(
-                            x=max_price_data,
-                            title="💸 Максимальная приемлемая цена",
-                            nbins=min(10, len(max_price_data)),
-                            color_discrete_sequence=[STREAMLIT_COLORS['primary']]
-                        )
+        with col1_tab3:
+            max_price = model.max_price
+            if max_price:
+                if max_price['enough']:  # Минимум 3 значения для графика
+                    def build_max_price():
+                        if is_large(max_price['count']):
+                            fig_max_price = binned_histogram(max_price, "💸 Максимальная приемлемая цена", theme['primary'])
+                        else:
+                            fig_max_price = px.histogram(
+                                x=max_price['data'],
+                                title="💸 Максимальная приемлемая цена",
+                                nbins=min(10, max_price['count']),
+                                color_discrete_sequence=[theme['primary']]
+                            )
                         fig_max_price.update_layout(
                             xaxis_title="Цена (руб.)",
                             yaxis_title="Количество респондентов",
                             bargap=0.1
                         )
-                        fig_max_price = create_custom_chart(fig_max_price)
-                        st.plotly_chart(fig_max_price, use_container_width=True)
-                        
-                        # Показываем статистику
-                        st.markdown(f"**📊 Статистика по максимальной цене:**")
-                        st.write(f"• Респондентов: {len(max_price_data)}")
-                        st.write(f"• Средняя цена: {max_price_data.mean():.0f} ₽")
-                        st.write(f"• Диапазон: {max_price_data.min():.0f} - {max_price_data.max():.0f} ₽")
-                    else:
-                        st.warning(f"⚠️ Недостаточно данных для максимальной цены (только {len(max_price_data)} ответов)")
+                        return create_custom_chart(fig_max_price, theme=theme)
+                    fig_max_price = cached_figure('max_price', model, theme, build_max_price)
+                    show_chart('max_price', fig_max_price)
+                    
+                    # Показываем статистику
+                    st.markdown(f"**📊 Статистика по максимальной цене:**")
+                    st.write(f"• Респондентов: {max_price['count']}")
+                    st.write(f"• Средняя цена: {max_price['mean']:.0f} ₽")
+                    st.write(f"• Диапазон: {max_price['min']:.0f} - {max_price['max']:.0f} ₽")
                 else:
-                    st.info("💭 Данные о максимальной цене не найдены")
-            
-            with col2_tab3:
-                if min_price_cols:
-                    min_price_data = df_market[min_price_cols[0]].dropna()
-                    if len(min_price_data) >= 3:  # Минимум 3 значения для графика
-                        fig_min_price = px.histogram(
-                            x=min_price_data,
-                            title="✨ Минимальная цена для качества",
-                            nbins=min(10, len(min_price_data)),
-                            color_discrete_sequence=[STREAMLIT_COLORS['success']]
-                        )
+                    st.warning(f"⚠️ Недостаточно данных для максимальной цены (только {max_price['count']} ответов)")
+            else:
+                st.info("💭 Данные о максимальной цене не найдены")
+        
+        with col2_tab3:
+            min_price = model.min_price
+            if min_price:
+                if min_price['enough']:  # Минимум 3 значения для графика
+                    def build_min_price():
+                        if is_large(min_price['count']):
+                            fig_min_price = binned_histogram(min_price, "✨ Минимальная цена для качества", theme['success'])
+                        else:
+                            fig_min_price = px.histogram(
+                                x=min_price['data'],
+                                title="✨ Минимальная цена для качества",
+                                nbins=min(10, min_price['count']),
+                                color_discrete_sequence=[theme['success']]
+                            )
                         fig_min_price.update_layout(
                             xaxis_title="Цена (руб.)",
                             yaxis_title="Количество респондентов",
                             bargap=0.1
                         )
-                        fig_min_price = create_custom_chart(fig_min_price)
-                        st.plotly_chart(fig_min_price, use_container_width=True)
-                        
-                        # Показываем статистику  
-                        st.markdown(f"**📊 Статистика по минимальной цене:**")
-                        st.write(f"• Респондентов: {len(min_price_data)}")
-                        st.write(f"• Средняя цена: {min_price_data.mean():.0f} ₽")
-                        st.write(f"• Диапазон: {min_price_data.min():.0f} - {min_price_data.max():.0f} ₽")
-                    else:
-                        st.warning(f"⚠️ Недостаточно данных для минимальной цены (только {len(min_price_data)} ответов)")
-                else:
-                    st.info("💭 Данные о минимальной цене не найдены")
-            
-            # Справедливая цена
-            if fair_price_cols:
-                fair_price_data = df_market[fair_price_cols[0]].dropna()
-                if len(fair_price_data) >= 3:
-                    fig_fair_price = px.box(
-                        y=fair_price_data,
-                        title="⚖️ Распределение справедливой цены",
-                        color_discrete_sequence=[STREAMLIT_COLORS['secondary']]
-                    )
-                    fig_fair_price.update_layout(yaxis_title="Цена (руб.)")
-                    fig_fair_price = create_custom_chart(fig_fair_price)
-                    st.plotly_chart(fig_fair_price, use_container_width=True)
+                        return create_custom_chart(fig_min_price, theme=theme)
+                    fig_min_price = cached_figure('min_price', model, theme, build_min_price)
+                    show_chart('min_price', fig_min_price)
                     
-                    # Дополнительная статистика
-                    col_stats1, col_stats2, col_stats3 = st.columns(3)
-                    with col_stats1:
-                        st.metric("Респондентов", len(fair_price_data))
-                    with col_stats2:
-                        st.metric("Средняя цена", f"{fair_price_data.mean():.0f} ₽")
-                    with col_stats3:
-                        st.metric("Медианная цена", f"{fair_price_data.median():.0f} ₽")
+                    # Показываем статистику  
+                    st.markdown(f"**📊 Статистика по минимальной цене:**")
+                    st.write(f"• Респондентов: {min_price['count']}")
+                    st.write(f"• Средняя цена: {min_price['mean']:.0f} ₽")
+                    st.write(f"• Диапазон: {min_price['min']:.0f} - {min_price['max']:.0f} ₽")
                 else:
-                    st.warning(f"⚠️ Недостаточно данных для справедливой цены (только {len(fair_price_data)} ответов)")
-            
-            # Общий анализ всех ценовых колонок
-            if price_columns:
-                st.markdown("#### 📈 Сравнительный анализ цен")
-                numeric_price_cols = df_market[price_columns].select_dtypes(include=[np.number]).columns
-                if len(numeric_price_cols) > 0:
-                    price_data = df_market[numeric_price_cols].describe().round(2)
-                    st.dataframe(price_data, use_container_width=True)
-                    
-                    # Предупреждение о малом количестве данных
-                    low_data_cols = [col for col in numeric_price_cols if df_market[col].count() < 10]
-                    if low_data_cols:
-                        st.warning(f"⚠️ **Внимание:** В следующих колонках мало данных (менее 10 ответов): {', '.join(low_data_cols)}")
-                        st.info("💡 **Рекомендация:** Необходимо собрать больше данных для более точного анализа ценообразования.")
-        else:
-            st.warning("🔍 Не найдены колонки с ценовыми данными. Проверьте структуру файла.")
-    
-    with tab4:
-        st.markdown("### 📈 Анализ удовлетворенности")
+                    st.warning(f"⚠️ Недостаточно данных для минимальной цены (только {min_price['count']} ответов)")
+            else:
+                st.info("💭 Данные о минимальной цене не найдены")
         
-        # Поиск колонок с удовлетворенностью
-        satisfaction_columns = []
-        for col in df_market.columns:
-            if any(word in col.lower() for word in ['удовлетвор', 'оценк', 'балл', 'рейтинг']):
-                satisfaction_columns.append(col)
+        # Справедливая цена
+        fair_price = model.fair_price
+        if fair_price:
+            if fair_price['enough']:
+                def build_fair_price():
+                    if is_large(fair_price['count']):
+                        fig_fair_price = summary_box(fair_price, "⚖️ Распределение справедливой цены", theme['secondary'])
+                    else:
+                        fig_fair_price = px.box(
+                            y=fair_price['data'],
+                            title="⚖️ Распределение справедливой цены",
+                            color_discrete_sequence=[theme['secondary']]
+                        )
+                    fig_fair_price.update_layout(yaxis_title="Цена (руб.)")
+                    return create_custom_chart(fig_fair_price, theme=theme)
+                fig_fair_price = cached_figure('fair_price', model, theme, build_fair_price)
+                show_chart('fair_price', fig_fair_price)
+                
+                # Дополнительная статистика
+                col_stats1, col_stats2, col_stats3 = st.columns(3)
+                with col_stats1:
+                    st.metric("Респондентов", fair_price['count'])
+                with col_stats2:
+                    st.metric("Средняя цена", f"{fair_price['mean']:.0f} ₽")
+                with col_stats3:
+                    st.metric("Медианная цена", f"{fair_price['median']:.0f} ₽")
+            else:
+                st.warning(f"⚠️ Недостаточно данных для справедливой цены (только {fair_price['count']} ответов)")
         
-        if satisfaction_columns:
-            st.info(f"📊 Найденные колонки с оценками: {', '.join(satisfaction_columns[:3])}...")
-            
-            col1_tab4, col2_tab4 = st.columns(2)
-            
-            # Поиск конкретных колонок
-            general_satisfaction_cols = [col for col in df_market.columns if 'удовлетворены суши-рестораном' in col]
-            characteristics_cols = [col for col in df_market.columns if 'характеристик' in col.lower()]
-            importance_cols = [col for col in df_market.columns if 'важность' in col.lower()]
-            
-            with col1_tab4:
-                if general_satisfaction_cols and any('кол-во' in col for col in df_market.columns):
-                    count_col = [col for col in df_market.columns if 'кол-во.4' in col]
-                    if count_col:
-                        satisfaction_data = df_market[[general_satisfaction_cols[0], count_col[0]]].dropna()
-                        if not satisfaction_data.empty:
-                            fig_satisfaction = px.bar(
-                                satisfaction_data,
-                                x=general_satisfaction_cols[0],
-                                y=count_col[0],
-                                title="😊 Общая удовлетворенность",
-                                color_discrete_sequence=[STREAMLIT_COLORS['success']]
-                            )
-                            fig_satisfaction.update_layout(
-                                xaxis_tickangle=-45,
-                                xaxis_title="Уровень удовлетворенности",
-                                yaxis_title="Количество респондентов"
-                            )
-                            fig_satisfaction = create_custom_chart(fig_satisfaction)
-                            st.plotly_chart(fig_satisfaction, use_container_width=True)
-                else:
-                    st.info("💭 Данные об общей удовлетворенности не найдены")
+        # Кривые Ван Вестендорпа: диапазон приемлемых цен
+        sensitivity = model.price_sensitivity
+        if sensitivity is not None:
+            st.markdown("#### 📉 Ценовая чувствительность (Ван Вестендорп)")
+            def build_price_sensitivity():
+                fig_sensitivity = go.Figure()
+                colors = [theme['success'], theme['info'], theme['warning'], theme['primary']]
+                for (curve, values), color in zip(sensitivity.curves.items(), colors):
+                    fig_sensitivity.add_trace(go.Scatter(
+                        x=sensitivity.curves.index,
+                        y=values * 100,
+                        mode='lines+markers',
+                        name=curve,
+                        line=dict(color=color, width=3),
+                        hovertemplate='<b>%{fullData.name}</b><br>Цена: %{x:.0f} ₽<br>Доля: %{y:.1f}%<extra></extra>'
+                    ))
+                low, high = sensitivity.acceptable_range()
+                if not (np.isnan(low) or np.isnan(high)):
+                    fig_sensitivity.add_vrect(x0=low, x1=high, fillcolor=theme['light'], opacity=0.3, line_width=0)
+                for point, price in sensitivity.points.items():
+                    if not np.isnan(price):
+                        fig_sensitivity.add_vline(x=price, line_dash="dot", line_color=theme['dark'],
+                                                  annotation_text=point, annotation_position="top")
+                fig_sensitivity.update_layout(
+                    title="📉 Кривые ценовой чувствительности",
+                    xaxis_title="Цена (руб.)",
+                    yaxis_title="Доля респондентов, %"
+                )
+                return create_custom_chart(fig_sensitivity, theme=theme)
+            fig_sensitivity = cached_figure('price_sensitivity', model, theme, build_price_sensitivity)
+            show_chart('price_sensitivity', fig_sensitivity)
             
-            with col2_tab4:
-                if characteristics_cols and 'балл' in df_market.columns:
-                    char_data = df_market[[characteristics_cols[0], 'балл']].dropna()
-                    if not char_data.empty:
-                        fig_char = px.scatter(
-                            char_data,
-                            x=characteristics_cols[0],
-                            y='балл',
-                            title="⭐ Оценка характеристик",
-                            size='балл',
-                            color='балл',
-                            color_continuous_scale=[[0, STREAMLIT_COLORS['warning']], [1, STREAMLIT_COLORS['primary']]]
-                        )
-                        fig_char.update_layout(
-                            xaxis_tickangle=-45,
-                            xaxis_title="Характеристики",
-                            yaxis_title="Оценка (балл)"
-                        )
-                        fig_char = create_custom_chart(fig_char)
-                        st.plotly_chart(fig_char, use_container_width=True)
-                else:
-                    st.info("💭 Данные об оценке характеристик не найдены")
+            st.dataframe(
+                sensitivity.intervals().round(0),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption(
+                f"Границы - {sensitivity.confidence:.0%} доверительный интервал бутстрепа "
+                f"по {sensitivity.sample_size} респондентам. Кривые «не дешево» и «не дорого» "
+                f"построены по справедливой цене."
+            )
+        
+        # Общий анализ всех ценовых колонок
+        if model.price_describe is not None:
+            st.markdown("#### 📈 Сравнительный анализ цен")
+            st.dataframe(model.price_describe, use_container_width=True)
             
-            # Важность характеристик
-            if importance_cols and '%' in df_market.columns:
-                importance_data = df_market[[importance_cols[0], '%']].dropna()
-                if not importance_data.empty:
-                    fig_importance = px.bar(
-                        importance_data,
-                        x='%',
-                        y=importance_cols[0],
-                        orientation='h',
-                        title="🎯 Важность характеристик (%)",
-                        color='%',
-                        color_continuous_scale=[[0, STREAMLIT_COLORS['light']], [1, STREAMLIT_COLORS['info']]]
+            # Предупреждение о малом количестве данных
+            if model.low_data_price_cols:
+                st.warning(f"⚠️ **Внимание:** В следующих колонках мало данных (менее 10 ответов): {', '.join(model.low_data_price_cols)}")
+                st.info("💡 **Рекомендация:** Необходимо собрать больше данных для более точного анализа ценообразования.")
+    else:
+        st.warning("🔍 Не найдены колонки с ценовыми данными. Проверьте структуру файла.")
+
+def render_satisfaction(model, theme):
+    """Вкладка «Удовлетворенность»"""
+    st.markdown("### 📈 Анализ удовлетворенности")
+    
+    satisfaction_columns = model.satisfaction_columns
+    
+    if satisfaction_columns:
+        st.info(f"📊 Найденные колонки с оценками: {', '.join(satisfaction_columns[:3])}...")
+        
+        col1_tab4, col2_tab4 = st.columns(2)
+        
+        with col1_tab4:
+            if model.general_satisfaction_data is not None:
+                satisfaction_col, count_col = model.schema.pair('general_satisfaction')
+                def build_satisfaction():
+                    fig_satisfaction = px.bar(
+                        model.general_satisfaction_data,
+                        x=satisfaction_col,
+                        y=count_col,
+                        title="😊 Общая удовлетворенность",
+                        color_discrete_sequence=[theme['success']]
                     )
-                    fig_importance.update_layout(
-                        xaxis_title="Важность (%)",
-                        yaxis_title="Характеристики"
+                    fig_satisfaction.update_layout(
+                        xaxis_tickangle=-45,
+                        xaxis_title="Уровень удовлетворенности",
+                        yaxis_title="Количество респондентов"
                     )
-                    fig_importance = create_custom_chart(fig_importance)
-                    st.plotly_chart(fig_importance, use_container_width=True)
-            
-            # Общий анализ всех колонок с оценками
-            if satisfaction_columns:
-                st.markdown("#### 📊 Статистика по всем оценкам")
-                numeric_satisfaction = df_market[satisfaction_columns].select_dtypes(include=[np.number])
-                if not numeric_satisfaction.empty:
-                    satisfaction_stats = numeric_satisfaction.describe().round(2)
-                    st.dataframe(satisfaction_stats, use_container_width=True)
-        else:
-            st.warning("🔍 Не найдены колонки с данными об удовлетворенности.")
-    
-    with tab5:
-        st.markdown("### 👥 Профиль потребителей суши-ресторанов")
+                    return create_custom_chart(fig_satisfaction, theme=theme)
+                fig_satisfaction = cached_figure('satisfaction', model, theme, build_satisfaction)
+                show_chart('satisfaction', fig_satisfaction)
+            else:
+                st.info("💭 Данные об общей удовлетворенности не найдены")
         
-        col1_tab5, col2_tab5 = st.columns(2)
+        with col2_tab4:
+            if model.characteristics_data is not None:
+                characteristics_col, score_col = model.schema.pair('characteristics')
+                def build_char():
+                    # На больших данных - WebGL и прореженная выборка точек
+                    char_data = model.characteristics_data
+                    large = is_large(len(char_data))
+                    title = "⭐ Оценка характеристик"
+                    if large and len(char_data) > SCATTER_MAX_POINTS:
+                        title += f" (выборка {SCATTER_MAX_POINTS:,} из {len(char_data):,})".replace(",", " ")
+                    fig_char = px.scatter(
+                        downsample(char_data) if large else char_data,
+                        x=characteristics_col,
+                        y=score_col,
+                        title=title,
+                        size=score_col,
+                        color=score_col,
+                        color_continuous_scale=[[0, theme['warning']], [1, theme['primary']]],
+                        render_mode='webgl' if large else 'auto'
+                    )
+                    fig_char.update_layout(
+                        xaxis_tickangle=-45,
+                        xaxis_title="Характеристики",
+                        yaxis_title="Оценка (балл)"
+                    )
+                    return create_custom_chart(fig_char, theme=theme)
+                fig_char = cached_figure('char', model, theme, build_char)
+                show_chart('char', fig_char)
+            else:
+                st.info("💭 Данные об оценке характеристик не найдены")
+        
+        # Важность характеристик
+        if model.importance_data is not None:
+            importance_col, share_col = model.schema.pair('importance')
+            def build_importance():
+                fig_importance = px.bar(
+                    model.importance_data,
+                    x=share_col,
+                    y=importance_col,
+                    orientation='h',
+                    title="🎯 Важность характеристик (%)",
+                    color=share_col,
+                    color_continuous_scale=[[0, theme['light']], [1, theme['info']]]
+                )
+                fig_importance.update_layout(
+                    xaxis_title="Важность (%)",
+                    yaxis_title="Характеристики"
+                )
+                return create_custom_chart(fig_importance, theme=theme)
+            fig_importance = cached_figure('importance', model, theme, build_importance)
+            show_chart('importance', fig_importance)
         
-        with col1_tab5:
-            # Анализ по полу
-            if 'пол' in df_profile.columns:
-                gender_data = df_profile['пол'].value_counts()
+        # Общий анализ всех колонок с оценками
+        if model.satisfaction_stats is not None:
+            st.markdown("#### 📊 Статистика по всем оценкам")
+            st.dataframe(model.satisfaction_stats, use_container_width=True)
+    else:
+        st.warning("🔍 Не найдены колонки с данными об удовлетворенности.")
+
+def render_profile(model, theme):
+    """Вкладка «Профиль потребителей»"""
+    st.markdown("### 👥 Профиль потребителей суши-ресторанов")
+    
+    col1_tab5, col2_tab5 = st.columns(2)
+    
+    with col1_tab5:
+        # Анализ по полу
+        gender_data = model.gender_counts
+        if gender_data is not None:
+            def build_gender():
                 fig_gender = px.pie(
                     values=gender_data.values,
                     names=gender_data.index,
                     title="👥 Распределение по полу",
-                    color_discrete_sequence=[STREAMLIT_COLORS['primary'], STREAMLIT_COLORS['secondary']]
+                    color_discrete_sequence=[theme['primary'], theme['secondary']]
                 )
                 fig_gender.update_traces(
                     textposition='inside', 
@@ -800,18 +671,20 @@ def main():
                     textfont_size=15,
                     hovertemplate='<b>%{label}</b><br>Количество: %{value}<br>Процент: %{percent}<extra></extra>'
                 )
-                fig_gender = create_custom_chart(fig_gender)
-                st.plotly_chart(fig_gender, use_container_width=True)
-        
-        with col2_tab5:
-            # Анализ по возрасту
-            if 'возраст' in df_profile.columns:
-                age_data = df_profile['возраст'].value_counts()
+                return create_custom_chart(fig_gender, theme=theme)
+            fig_gender = cached_figure('gender', model, theme, build_gender)
+            show_chart('gender', fig_gender)
+    
+    with col2_tab5:
+        # Анализ по возрасту
+        age_data = model.age_counts
+        if age_data is not None:
+            def build_age():
                 fig_age = px.bar(
                     x=age_data.index,
                     y=age_data.values,
                     title="🎂 Распределение по возрастам",
-                    color_discrete_sequence=[STREAMLIT_COLORS['info']]
+                    color_discrete_sequence=[theme['info']]
                 )
                 fig_age.update_layout(
                     xaxis_title="Возрастная группа",
@@ -820,20 +693,22 @@ def main():
                 fig_age.update_traces(
                     hovertemplate='<b>%{x}</b><br>Количество: %{y}<extra></extra>'
                 )
-                fig_age = create_custom_chart(fig_age)
-                st.plotly_chart(fig_age, use_container_width=True)
-        
-        col3_tab5, col4_tab5 = st.columns(2)
-        
-        with col3_tab5:
-            # Анализ по доходу
-            if 'доход' in df_profile.columns:
-                income_data = df_profile['доход'].value_counts()
+                return create_custom_chart(fig_age, theme=theme)
+            fig_age = cached_figure('age', model, theme, build_age)
+            show_chart('age', fig_age)
+    
+    col3_tab5, col4_tab5 = st.columns(2)
+    
+    with col3_tab5:
+        # Анализ по доходу
+        income_data = model.income_counts
+        if income_data is not None:
+            def build_income():
                 fig_income = px.pie(
                     values=income_data.values,
                     names=income_data.index,
                     title="💰 Распределение по доходу",
-                    color_discrete_sequence=[STREAMLIT_COLORS['success'], STREAMLIT_COLORS['warning'], STREAMLIT_COLORS['purple'], STREAMLIT_COLORS['accent']]
+                    color_discrete_sequence=[theme['success'], theme['warning'], theme['purple'], theme['accent']]
                 )
                 fig_income.update_traces(
                     textposition='inside', 
@@ -841,67 +716,467 @@ def main():
                     textfont_size=12,
                     hovertemplate='<b>%{label}</b><br>Количество: %{value}<br>Процент: %{percent}<extra></extra>'
                 )
-                fig_income = create_custom_chart(fig_income)
-                st.plotly_chart(fig_income, use_container_width=True)
+                return create_custom_chart(fig_income, theme=theme)
+            fig_income = cached_figure('income', model, theme, build_income)
+            show_chart('income', fig_income)
+    
+    with col4_tab5:
+        # Топ любимых суши/роллов
+        top_sushi = model.top_sushi
+        if top_sushi:
+            def build_sushi():
+                fig_sushi = px.bar(
+                    x=list(top_sushi.values()),
+                    y=list(top_sushi.keys()),
+                    orientation='h',
+                    title="🍣 Топ-10 любимых суши/роллов",
+                    color=list(top_sushi.values()),
+                    color_continuous_scale=[[0, theme['light']], [1, theme['primary']]]
+                )
+                fig_sushi.update_layout(
+                    xaxis_title="Количество упоминаний",
+                    yaxis_title="Суши/Роллы"
+                )
+                return create_custom_chart(fig_sushi, theme=theme)
+            fig_sushi = cached_figure('sushi', model, theme, build_sushi)
+            show_chart('sushi', fig_sushi)
+    
+    # Статистическая сводка профиля потребителей
+    st.markdown("#### 📈 Общая статистика профиля потребителей")
+    col_stats1, col_stats2 = st.columns(2)
+    
+    with col_stats1:
+        st.markdown("**📊 Основные показатели:**")
+        st.metric("Общее количество респондентов", model.total_respondents)
         
-        with col4_tab5:
-            # Топ любимых суши/роллов
-            if 'Какие суши\\роллы  любят больше всего' in df_profile.columns:
-                # Разбираем данные по любимым суши/роллам
-                sushi_data = df_profile['Какие суши\\роллы  любят больше всего'].dropna()
-                
-                # Создаем список всех упомянутых суши/роллов
-                all_sushi = []
-                for entry in sushi_data:
-                    if isinstance(entry, str):
-                        # Разделяем по запятым и очищаем
-                        sushi_list = [s.strip().lower() for s in entry.split(',')]
-                        all_sushi.extend(sushi_list)
-                
-                # Подсчитываем частоту
-                from collections import Counter
-                sushi_counts = Counter(all_sushi)
-                
-                # Берем топ-10
-                top_sushi = dict(sushi_counts.most_common(10))
-                
-                if top_sushi:
-                    fig_sushi = px.bar(
-                        x=list(top_sushi.values()),
-                        y=list(top_sushi.keys()),
-                        orientation='h',
-                        title="🍣 Топ-10 любимых суши/роллов",
-                        color=list(top_sushi.values()),
-                        color_continuous_scale=[[0, STREAMLIT_COLORS['light']], [1, STREAMLIT_COLORS['primary']]]
-                    )
-                    fig_sushi.update_layout(
-                        xaxis_title="Количество упоминаний",
-                        yaxis_title="Суши/Роллы"
-                    )
-                    fig_sushi = create_custom_chart(fig_sushi)
-                    st.plotly_chart(fig_sushi, use_container_width=True)
+        if model.female_pct is not None:
+            st.metric("Доля женщин", f"{model.female_pct:.1f}%")
+    
+    with col_stats2:
+        if model.young_pct is not None:
+            st.metric("Доля молодежи (18-24)", f"{model.young_pct:.1f}%")
         
-        # Статистическая сводка профиля потребителей
-        st.markdown("#### 📈 Общая статистика профиля потребителей")
-        col_stats1, col_stats2 = st.columns(2)
+        if model.top_income is not None:
+            st.metric("Наиболее частый доход", model.top_income)
+    
+    render_segment_filter(model, theme)
+
+# Подписи фильтров сегментов по ролям колонок профиля
+SEGMENT_LABELS = {'gender': "👥 Пол", 'age': "🎂 Возраст", 'income': "💰 Доход"}
+
+def render_segment_filter(model, theme):
+    """Перекрестный фильтр сегментов: размер сегмента и его любимые суши"""
+    if not model.segment_columns:
+        return
+    
+    st.markdown("#### 🔎 Перекрестный фильтр сегментов")
+    segments = model.segments
+    filter_columns = st.columns(len(model.segment_columns))
+    selection = {}
+    for filter_column, (role, column) in zip(filter_columns, model.segment_columns.items()):
+        with filter_column:
+            selection[column] = st.multiselect(
+                SEGMENT_LABELS.get(role, column),
+                list(segments.categories[column]),
+                key=f"segment_{role}",
+                placeholder="Все"
+            )
+    
+    # Пересечение битовых карт вместо фильтрации таблицы
+    with span("segment.query"):
+        mask = segments.mask(selection)
+        segment_size = segments.count(mask)
+        segment_sushi = segments.top_sushi(mask, 10)
+    
+    share = segment_size / segments.size * 100 if segments.size else 0
+    st.metric("Респондентов в сегменте", f"{segment_size:,}".replace(",", " "), f"{share:.1f}% выборки", delta_color="off")
+    
+    if segment_sushi.empty:
+        st.info("В выбранном сегменте нет ответов о любимых суши")
+        return
+    
+    with span("chart.segment_sushi.build"):
+        fig_segment = px.bar(
+            x=segment_sushi.values,
+            y=segment_sushi.index,
+            orientation='h',
+            title="🍣 Любимые суши/роллы сегмента",
+            color_discrete_sequence=[theme['secondary']]
+        )
+        fig_segment.update_layout(
+            xaxis_title="Количество упоминаний",
+            yaxis_title="Суши/Роллы",
+            yaxis=dict(autorange="reversed")
+        )
+        fig_segment = create_custom_chart(fig_segment, theme=theme)
+    show_chart('segment_sushi', fig_segment)
+
+@st.cache_data(max_entries=64)
+def get_view_positions(fingerprint, table, query, column, sort_by, ascending, _df):
+    """Отфильтрованный и отсортированный порядок строк (кэшируется)"""
+    return filter_sort_positions(_df, query=query, column=column, sort_by=sort_by, ascending=ascending)
+
+@st.cache_data(max_entries=256)
+def get_view_page(fingerprint, table, query, column, sort_by, ascending, columns, page, page_size, _df):
+    """Одна страница таблицы (кэшируется)"""
+    positions = get_view_positions(fingerprint, table, query, column, sort_by, ascending, _df)
+    return page_slice(_df, positions, page, page_size, columns=columns), len(positions)
+
+def render_data_viewer(table, df, fingerprint):
+    """Постраничный просмотр таблицы: в браузер уходит только текущая страница"""
+    all_columns = list(df.columns)
+    columns = st.multiselect("Колонки", all_columns, default=all_columns, key=f"{table}_columns")
+    
+    col_query, col_filter_column = st.columns(2)
+    with col_query:
+        query = st.text_input("🔎 Фильтр", key=f"{table}_query").strip()
+    with col_filter_column:
+        column = st.selectbox("Искать в колонке", [None] + all_columns, format_func=lambda c: "Во всех" if c is None else c, key=f"{table}_filter_column")
+    
+    col_sort, col_order, col_size = st.columns(3)
+    with col_sort:
+        sort_by = st.selectbox("Сортировка", [None] + all_columns, format_func=lambda c: "Без сортировки" if c is None else c, key=f"{table}_sort")
+    with col_order:
+        ascending = st.radio("Порядок", ["По возрастанию", "По убыванию"], horizontal=True, key=f"{table}_order") == "По возрастанию"
+    with col_size:
+        page_size = st.selectbox("Строк на странице", PAGE_SIZES, key=f"{table}_page_size")
+    
+    total_rows = len(get_view_positions(fingerprint, table, query, column, sort_by, ascending, df))
+    pages = page_count(total_rows, page_size)
+    # После смены фильтра номер страницы может выйти за пределы
+    if st.session_state.get(f"{table}_page", 1) > pages:
+        st.session_state[f"{table}_page"] = pages
+    page = st.number_input(f"Страница (из {pages})", min_value=1, max_value=pages, key=f"{table}_page")
+    
+    rows, total_rows = get_view_page(fingerprint, table, query, column, sort_by, ascending, tuple(columns), page, page_size, df)
+    st.dataframe(rows, use_container_width=True)
+    first_row = (page - 1) * page_size + 1 if total_rows else 0
+    st.caption(f"Строки {first_row}-{first_row + len(rows) - 1 if total_rows else 0} из {total_rows}")
+
+# Разделы дашборда: название вкладки -> функция отрисовки
+SECTIONS = {
+    "🎯 Посещаемость": render_attendance,
+    "🏪 Рестораны": render_restaurants,
+    "💰 Ценообразование": render_pricing,
+    "📈 Удовлетворенность": render_satisfaction,
+    "👥 Профиль потребителей": render_profile,
+}
+
+def profiling_enabled():
+    return bool(st.session_state.get("profiling")) or os.environ.get("SUSHI_PROFILE") == "1"
+
+def write_profile(profiler):
+    """Сохраняет замеры запуска в JSON lines и файл Prometheus"""
+    profiler.write_jsonl(PROFILE_DIR / JSONL_FILE)
+    profiler.write_prometheus(PROFILE_DIR / PROMETHEUS_FILE)
+
+def _render_active_section(model, theme):
+    """Отрисовывает только выбранный раздел"""
+    section = st.radio(
+        "Раздел",
+        list(SECTIONS),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="active_section"
+    )
+    # Перезапуск одного фрагмента идет без main(): замеряем его отдельно
+    # и записываем, когда фрагмент закончится
+    if profiling.current() is None and profiling_enabled():
+        profiler = Profiler()
+        with activate(profiler), span("fragment"), span(f"section.{section}"):
+            SECTIONS[section](model, theme)
+        write_profile(profiler)
+        return
+    with span(f"section.{section}"):
+        SECTIONS[section](model, theme)
+
+# Во фрагменте переключение раздела перезапускает только сам фрагмент
+render_active_section = st.fragment(_render_active_section) if hasattr(st, 'fragment') else _render_active_section
+
+def _watch_sources():
+    """Перезапускает страницу, когда меняются mtime или размер исходных файлов"""
+    signature = stat_signature(st.session_state.get("source_paths", DATASETS.values()))
+    if signature != st.session_state.get("source_signature", signature):
+        st.rerun(scope="app")
+
+# Фрагмент опрашивает файлы по таймеру, не перерисовывая остальную страницу
+watch_sources = (
+    st.fragment(_watch_sources, run_every=POLL_SECONDS)
+    if hasattr(st, 'fragment') and POLL_SECONDS > 0 else None
+)
+
+def main():
+    """Страница дашборда; при включенном профилировании - с замерами разделов"""
+    profiler = Profiler() if profiling_enabled() else None
+    
+    with activate(profiler):
+        with span("main"):
+            profile_panel = render_page()
+    
+    if profiler is not None:
+        write_profile(profiler)
+        if profile_panel is not None:
+            render_profile_panel(profile_panel, profiler)
+    
+    if watch_sources is not None:
+        watch_sources()
+
+def render_profile_panel(panel, profiler):
+    """Таблица замеров последнего запуска в боковой панели"""
+    rows = [
+        {
+            "Раздел": "\u00a0\u00a0" * record["depth"] + record["span"].rsplit("/", 1)[-1],
+            "мс": round(record["seconds"] * 1000, 1),
+            "Пик памяти, КБ": round(record["alloc_peak_bytes"] / 1024, 1) if "alloc_peak_bytes" in record else None,
+        }
+        for record in profiler.records
+    ]
+    with panel.container():
+        with st.expander("⏱️ Профиль запуска", expanded=True):
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+            st.caption(f"Записано в {PROFILE_DIR / JSONL_FILE} и {PROFILE_DIR / PROMETHEUS_FILE}")
+
+def load_city_model(registry, city):
+    """Таблицы и модель одного города; None, если данные не загрузились.
+
+    Вместо таблицы профиля возвращается функция, загружающая ее: большая
+    таблица читается из колоночного кэша только там, где нужны отдельные
+    анкеты (просмотр данных, структура колонок).
+    """
+    files = registry[city]
+    df_market, df_profile, fingerprint, fingerprints = load_data(files)
+    if fingerprint is None:
+        return None
+    aggregates = get_survey_store(files['store']) if 'store' in files else None
+    summary = loader = None
+    if df_profile is None:
+        summary = load_source_summary(files['profile'], fingerprints['profile'])
+        loader = partial(load_dataset, files['profile'], fingerprints['profile'])
+    with span("analytics_model"):
+        model = get_analytics_model(fingerprint, df_market, df_profile, fingerprints, city, aggregates,
+                                    summary, loader)
+    profile_rows = loader or (lambda: df_profile)
+    return df_market, profile_rows, fingerprints, model
+
+def kpi_notes(model):
+    """Пояснения к KPI карточкам: доверительные интервалы бутстрепа из модели"""
+    level = f"{model.kpi_confidence:.0%}"
+    notes = {}
+    for key in ("leader", "purpose"):
+        interval = model.kpi_intervals.get(key)
+        if interval:
+            notes[key] = (
+                f"{interval['share']:.0%} ответов ({level} ДИ {interval['low']:.0%}–{interval['high']:.0%}), "
+                f"первое место в {interval['stability']:.0%} повторов"
+            )
+    score = model.kpi_intervals.get("score")
+    if score:
+        notes["score"] = f"{level} ДИ по {score['n']} характеристикам: {score['low']:.2f}–{score['high']:.2f}"
+    return notes
+
+def render_city_comparison(models, theme):
+    """Ключевые показатели нескольких городов рядом"""
+    st.markdown("### 🏙️ Сравнение городов")
+    rows = []
+    for city, city_model in models.items():
+        fair_price = city_model.fair_price
+        rows.append({
+            "Город": city,
+            "Анкет": city_model.total_respondents,
+            "Лидер рынка": city_model.top_restaurant,
+            "Средняя оценка": round(city_model.avg_satisfaction, 2),
+            "Топ цель": city_model.top_purpose,
+            "Женщин, %": None if city_model.female_pct is None else round(city_model.female_pct, 1),
+            "18-24 года, %": None if city_model.young_pct is None else round(city_model.young_pct, 1),
+            "Справедливая цена (медиана)": fair_price['median'] if fair_price and fair_price['enough'] else None,
+        })
+    comparison = pd.DataFrame(rows)
+    st.dataframe(comparison, use_container_width=True, hide_index=True)
+    
+    with span("chart.city_satisfaction.build"):
+        fig_cities = px.bar(
+            comparison,
+            x="Город",
+            y="Средняя оценка",
+            title="⭐ Средняя оценка по городам",
+            color="Город",
+            color_discrete_sequence=theme.values()
+        )
+        fig_cities.update_layout(yaxis_range=[0, max(m.rating_scale for m in models.values())], showlegend=False)
+        fig_cities = create_custom_chart(fig_cities, theme=theme)
+    show_chart('city_satisfaction', fig_cities)
+
+def render_page():
+    """Содержимое страницы; возвращает место для панели профилирования"""
+    # Реестр городов: исходные файлы в корне, каталог городов и манифест;
+    # с SUSHI_DATA_SOURCE=sqlite данные берутся из хранилища анкет
+    if DATA_SOURCE == 'sqlite':
+        registry = {DEFAULT_CITY: {'store': str(STORE_FILE)}}
+    else:
+        try:
+            registry = discover_cities() or {DEFAULT_CITY: dict(DATASETS)}
+        except (OSError, ValueError) as e:
+            st.error(f"Ошибка реестра городов: {e}")
+            return
+    
+    city = DEFAULT_CITY if DEFAULT_CITY in registry else next(iter(registry))
+    compare_cities = []
+    if len(registry) > 1:
+        city = st.sidebar.selectbox("🏙️ Город:", list(registry), index=list(registry).index(city), key="city")
+        compare_cities = st.sidebar.multiselect(
+            "🆚 Сравнить с городами:",
+            [name for name in registry if name != city],
+            key="compare_cities"
+        )
+    
+    # Заголовок с анимацией
+    if len(registry) > 1:
+        st.markdown(f'<h1 class="main-header">🍣 Анализ рынка суши-ресторанов: {html.escape(city)}</h1>', unsafe_allow_html=True)
+    else:
+        st.markdown('<h1 class="main-header">🍣 Анализ рынка суши-ресторанов в Омске</h1>', unsafe_allow_html=True)
+    
+    # Информация о шрифте
+    st.sidebar.markdown(f"**🎨 Шрифт:** {font_status}")
+    
+    # Опрос следит за всеми файлами реестра и за появлением новых городов;
+    # подпись запоминается до загрузки, чтобы изменение во время нее не потерялось
+    if DATA_SOURCE == 'sqlite':
+        st.session_state["source_paths"] = store_paths(STORE_FILE)
+    else:
+        st.session_state["source_paths"] = registry_paths(registry) + [str(CITIES_DIR), str(CITIES_MANIFEST)]
+    st.session_state["source_signature"] = stat_signature(st.session_state["source_paths"])
+    
+    # Файлы всех городов без колоночного кэша разбираются параллельно в процессах
+    if DATA_SOURCE != 'sqlite':
+        with span("warm_cache"):
+            warm_sources(stat_signature(registry_paths(registry)))
+    
+    # Загрузка данных; все показатели считаются один раз на набор данных
+    try:
+        with span("load_data"):
+            loaded = load_city_model(registry, city)
+    except SchemaError as e:
+        st.error(f"Некорректная структура данных: {e}")
+        return
+    
+    if loaded is None:
+        st.error("Не удалось загрузить данные. Проверьте наличие файлов 'данные по рынку суши.xlsx' и 'профиль_потребителя.xlsx'")
+        return
+    df_market, profile_rows, fingerprints, model = loaded
+    
+    # Боковая панель с фильтрами
+    st.sidebar.markdown("## 🎛️ Настройки дашборда")
+    
+    # Цветовая схема: неизменяемая тема этой сессии
+    color_scheme = st.sidebar.selectbox(
+        "🎨 Цветовая схема:",
+        list(COLOR_SCHEMES),
+        index=0,
+        key="color_scheme"
+    )
+    theme = get_theme(color_scheme, font_family)
+    
+    # Режим навигации
+    lazy_sections = st.sidebar.checkbox(
+        "⚡ Показывать один раздел",
+        value=True,
+        help="Строить графики только для выбранного раздела вместо всех вкладок сразу"
+    )
+    
+    # Выгрузка агрегатов: архив собирается только по нажатию кнопки
+    # и берется с диска, пока не изменятся данные
+    st.sidebar.download_button(
+        "📦 Скачать агрегаты (zip)",
+        data=partial(bundle_bytes, model),
+        file_name=f"sushi_aggregates_{city}.zip",
+        mime="application/zip",
+        on_click="ignore",
+        help="Все таблицы дашборда: листы xlsx, Parquet и CSV",
+    )
+    
+    # Показать сырые данные
+    if st.sidebar.checkbox("📊 Показать исходные данные"):
+        with st.expander("📋 Таблица данных - Рынок суши", expanded=False):
+            render_data_viewer("market", df_market, fingerprints["market"])
+        with st.expander("📋 Таблица данных - Профиль потребителей", expanded=False):
+            render_data_viewer("profile", profile_rows(), fingerprints["profile"])
+    
+    # Отладочная информация
+    if st.sidebar.checkbox("🔍 Показать структуру данных"):
+        with st.expander("🗂️ Названия колонок - Рынок суши", expanded=False):
+            for i, col in enumerate(df_market.columns):
+                st.write(f"`{i}:` {col}")
+        with st.expander("🗂️ Названия колонок - Профиль потребителей", expanded=False):
+            for i, col in enumerate(profile_rows().columns):
+                st.write(f"`{i}:` {col}")
+        with st.expander("🧭 Роли колонок", expanded=False):
+            st.dataframe(pd.DataFrame(model.schema.describe()), use_container_width=True)
+        cache_stats = get_figure_cache().stats()
+        st.sidebar.caption(
+            f"🗃️ Кэш графиков: {cache_stats['entries']}/{cache_stats['max_entries']}, "
+            f"попаданий {cache_stats['hits']}, промахов {cache_stats['misses']}"
+        )
+        # Объем таблиц до и после подбора компактных типов при загрузке
+        for table_name, df in (("рынок", df_market), ("профиль", profile_rows())):
+            memory = df.attrs.get("memory")
+            if memory:
+                st.sidebar.caption(
+                    f"🧮 Память ({table_name}): {memory['before'] / 1024:.1f} → {memory['after'] / 1024:.1f} КБ"
+                )
+    
+    # Замеры разделов страницы (таблица появляется после отрисовки)
+    profile_panel = None
+    if st.sidebar.checkbox("⏱️ Профилирование", key="profiling", help="Время и память по разделам страницы"):
+        profile_panel = st.sidebar.empty()
+    
+    # Основные метрики с красивыми карточками
+    st.markdown("### 🎨 Ключевые показатели рынка")
+    
+    with span("kpi"):
+        top_restaurant = model.top_restaurant
+        avg_satisfaction = model.avg_satisfaction
+        top_purpose = model.top_purpose
         
-        with col_stats1:
-            st.markdown("**📊 Основные показатели:**")
-            total_respondents = len(df_profile)
-            st.metric("Общее количество респондентов", total_respondents)
-            
-            if 'пол' in df_profile.columns:
-                female_pct = (df_profile['пол'] == 'Женский').mean() * 100
-                st.metric("Доля женщин", f"{female_pct:.1f}%")
+        notes = kpi_notes(model)
         
-        with col_stats2:
-            if 'возраст' in df_profile.columns:
-                young_pct = (df_profile['возраст'] == '18-24').mean() * 100
-                st.metric("Доля молодежи (18-24)", f"{young_pct:.1f}%")
-            
-            if 'доход' in df_profile.columns:
-                middle_income = df_profile['доход'].value_counts().index[0]
-                st.metric("Наиболее частый доход", middle_income)
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.markdown(kpi_card("leader", "🏆", "Лидер рынка", top_restaurant or "Анализируем...", notes.get("leader")), unsafe_allow_html=True)
+        
+        with col2:
+            score = f"{avg_satisfaction:.1f}/{model.rating_scale}" if avg_satisfaction > 0 else "Анализируем..."
+            st.markdown(kpi_card("score", "⭐", "Средняя оценка", score, notes.get("score")), unsafe_allow_html=True)
+        
+        with col3:
+            st.markdown(kpi_card("purpose", "🎯", "Топ цель", top_purpose or "Определяем...", notes.get("purpose")), unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    # Сравнение выбранного города с другими
+    if compare_cities:
+        models = {city: model}
+        with span("compare_cities"):
+            for other in compare_cities:
+                try:
+                    other_loaded = load_city_model(registry, other)
+                except SchemaError as e:
+                    st.warning(f"{other}: некорректная структура данных: {e}")
+                    continue
+                if other_loaded is not None:
+                    models[other] = other_loaded[-1]
+            render_city_comparison(models, theme)
+        st.markdown("---")
+    
+    # Ленивый режим строит данные и графики только для активного раздела,
+    # режим вкладок - для всех пяти сразу
+    if lazy_sections:
+        render_active_section(model, theme)
+    else:
+        tabs = st.tabs(list(SECTIONS))
+        for tab, (name, render_section) in zip(tabs, SECTIONS.items()):
+            with tab, span(f"section.{name}"):
+                render_section(model, theme)
     
     # Дополнительная информация
     st.markdown("---")
@@ -935,6 +1210,8 @@ def main():
         • Улучшение качества обслуживания  
         • Мониторинг удовлетворенности
         """)
+    
+    return profile_panel
 
 if __name__ == "__main__":
     main() 
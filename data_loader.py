@@ -0,0 +1,398 @@
+"""Загрузка и очистка исходных данных дашборда.
+
+Модуль не зависит от Streamlit, поэтому его можно использовать из скриптов
+и фоновых процессов. Очищенные таблицы сохраняются в колоночный кэш
+(Parquet), чтобы повторный запуск сервера не разбирал xlsx через openpyxl.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Исходные файлы
+MARKET_FILE = 'данные по рынку суши.xlsx'
+PROFILE_FILE = 'профиль_потребителя.xlsx'
+
+# Наборы данных дашборда: имя -> исходный файл
+DATASETS = {'market': MARKET_FILE, 'profile': PROFILE_FILE}
+
+# Каталог колоночного кэша (можно переопределить переменной окружения)
+CACHE_DIR = Path(os.environ.get('SUSHI_CACHE_DIR', '.data_cache'))
+
+# Версия формата кэша: увеличиваем при изменении логики очистки,
+# чтобы старые parquet-файлы не использовались
+CACHE_VERSION = 3
+
+# Файлы больше этого размера читаются потоково через openpyxl read_only
+STREAMING_THRESHOLD_BYTES = int(os.environ.get('SUSHI_STREAMING_THRESHOLD', 20 * 1024 * 1024))
+
+# Сколько устаревших файлов разбирается без пула процессов (один город)
+POOL_MIN_FILES = len(DATASETS)
+
+# Список Excel ошибок для удаления
+EXCEL_ERRORS = ['#REF!', '#N/A', '#VALUE!', '#DIV/0!', '#NUM!', '#NAME?', '#NULL!']
+EXCEL_ERROR_PATTERN = '|'.join(re.escape(error) for error in EXCEL_ERRORS)
+
+# Текстовая колонка становится категориальной, если уникальных ответов
+# не больше этой доли от непустых значений
+CATEGORY_MAX_RATIO = 0.5
+
+# Целые значения в float32 хранятся без потерь до 2**24
+FLOAT32_EXACT_LIMIT = 2 ** 24
+
+
+def clean_excel_errors(df, return_counts=False):
+    """Очищает данные от Excel ошибок типа #REF!, #N/A, #VALUE! и т.д.
+
+    Все ошибки ищутся одним регулярным выражением за один проход по каждой
+    текстовой колонке; числовые колонки пропускаются, так как ошибок в них
+    быть не может. При return_counts=True дополнительно возвращает Series
+    с количеством обнуленных ячеек по каждой колонке. Колонка, в которой
+    кроме ошибок были только числа, после очистки становится числовой.
+    """
+    df_clean = df.copy()
+    counts = pd.Series(0, index=df_clean.columns, dtype='int64')
+
+    # Позиционный доступ: в таблице рынка есть колонки с одинаковыми именами
+    for i, dtype in enumerate(df_clean.dtypes):
+        if not (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)):
+            continue
+        column = df_clean.iloc[:, i]
+        # Смешанные колонки (числа + текст) сравниваем по строковому представлению
+        if pd.api.types.is_object_dtype(dtype):
+            column = column.astype(str)
+        mask = column.str.contains(EXCEL_ERROR_PATTERN, regex=True, na=False).to_numpy()
+        n_errors = int(mask.sum())
+        if n_errors:
+            df_clean.iloc[mask, i] = np.nan
+            if pd.api.types.is_object_dtype(dtype):
+                df_clean.isetitem(i, df_clean.iloc[:, i].infer_objects())
+            counts.iloc[i] = n_errors
+
+    if return_counts:
+        return df_clean, counts
+    return df_clean
+
+
+def optimize_dtypes(df, return_report=False):
+    """Компактные типы колонок после очистки.
+
+    Текстовые ответы с небольшим числом вариантов (цели, частота, пол,
+    возраст, доход) становятся Categorical, целые количества - самым
+    маленьким целым типом (или float32, если в колонке есть пропуски).
+    Дробные оценки и проценты не изменяются, чтобы не терять точность.
+    Объем таблицы до и после сохраняется в df.attrs['memory'], при
+    return_report=True дополнительно возвращается отчет по колонкам.
+    """
+    before = df.memory_usage(deep=True).to_numpy()[1:]
+    df_typed = df.copy()
+
+    for i, dtype in enumerate(df_typed.dtypes):
+        column = df_typed.iloc[:, i]
+        if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            n_values = column.count()
+            if n_values and column.nunique() <= n_values * CATEGORY_MAX_RATIO:
+                df_typed.isetitem(i, column.astype('category'))
+        elif pd.api.types.is_integer_dtype(dtype):
+            df_typed.isetitem(i, pd.to_numeric(column, downcast='integer'))
+        elif pd.api.types.is_float_dtype(dtype):
+            values = column.dropna().to_numpy()
+            if not len(values) or (values != np.round(values)).any() or np.abs(values).max() >= FLOAT32_EXACT_LIMIT:
+                continue
+            if len(values) == len(column):
+                df_typed.isetitem(i, pd.to_numeric(column, downcast='integer'))
+            else:
+                df_typed.isetitem(i, column.astype('float32'))
+
+    after = df_typed.memory_usage(deep=True).to_numpy()[1:]
+    df_typed.attrs['memory'] = {'before': int(before.sum()), 'after': int(after.sum())}
+
+    if return_report:
+        report = pd.DataFrame({
+            'column': df.columns,
+            'dtype_before': df.dtypes.astype(str).to_numpy(),
+            'dtype_after': df_typed.dtypes.astype(str).to_numpy(),
+            'bytes_before': before,
+            'bytes_after': after,
+        })
+        return df_typed, report
+    return df_typed
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """Отпечаток исходного файла: хэш содержимого и время изменения.
+
+    Хэш пересчитывается только если изменились mtime или размер файла,
+    иначе берется из манифеста кэша.
+    """
+    path = Path(path)
+    stat = path.stat()
+    manifest = _read_manifest(path)
+    if (manifest and manifest.get('mtime_ns') == stat.st_mtime_ns
+            and manifest.get('size') == stat.st_size):
+        digest = manifest['sha256']
+    else:
+        digest = file_hash(path)
+    return {'sha256': digest, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _cache_stem(path):
+    """Имя файла в кэше: одноименные xlsx из разных каталогов (городов) не пересекаются"""
+    path = Path(path)
+    folder = hashlib.sha256(str(path.resolve().parent).encode()).hexdigest()[:8]
+    return f"{path.stem}-{folder}"
+
+
+def _manifest_path(path):
+    return CACHE_DIR / f"{_cache_stem(path)}.json"
+
+
+def _read_manifest(path):
+    try:
+        with open(_manifest_path(path), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_path(path, fingerprint):
+    return CACHE_DIR / f"{_cache_stem(path)}-v{CACHE_VERSION}-{fingerprint['sha256'][:16]}.parquet"
+
+
+def is_cached(path):
+    """Есть ли в колоночном кэше актуальная копия файла (xlsx не читается)"""
+    manifest = _read_manifest(path)
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return False
+    if not (manifest and manifest.get('mtime_ns') == stat.st_mtime_ns
+            and manifest.get('size') == stat.st_size):
+        return False
+    cache_file = _cache_path(path, manifest)
+    return manifest.get('cache_file') == cache_file.name and cache_file.exists()
+
+
+def is_large_source(path):
+    """Большой файл: читается потоково и в память целиком не загружается"""
+    return Path(path).stat().st_size >= STREAMING_THRESHOLD_BYTES
+
+
+def read_source(path):
+    """Читает, очищает и приводит к компактным типам один Excel файл без кэша.
+
+    Небольшие файлы читаются целиком через pd.read_excel, большие -
+    потоково порциями через временный parquet файл (см. streaming_ingest).
+    """
+    if is_large_source(path):
+        from streaming_ingest import stream_to_parquet
+        with tempfile.TemporaryDirectory() as directory:
+            target = Path(directory) / 'source.parquet'
+            stream_to_parquet(path, target)
+            return optimize_dtypes(pd.read_parquet(target))
+    return optimize_dtypes(clean_excel_errors(pd.read_excel(path)))
+
+
+def load_frame(path, use_cache=True):
+    """Возвращает очищенную таблицу из колоночного кэша или из xlsx.
+
+    Кэш привязан к хэшу содержимого и mtime исходного файла и
+    пересобирается автоматически, когда файл меняется. Большой файл
+    пишется в кэш порциями и затем читается из parquet.
+    """
+    if not use_cache:
+        return read_source(path)
+
+    fingerprint = file_fingerprint(path)
+    cache_file = _cache_path(path, fingerprint)
+    if cache_file.exists():
+        try:
+            df = pd.read_parquet(cache_file)
+            _write_manifest(path, fingerprint, cache_file)
+            # Потоковый кэш хранит исходные типы (float64 и строки)
+            return optimize_dtypes(df) if is_large_source(path) else df
+        except Exception:
+            # Поврежденный кэш просто пересобираем
+            pass
+
+    if is_large_source(path):
+        if _store_streaming(path, fingerprint, cache_file) is not None:
+            return optimize_dtypes(pd.read_parquet(cache_file))
+        return read_source(path)
+
+    df = read_source(path)
+    _store(path, fingerprint, cache_file, df)
+    return df
+
+
+def load_summary(path):
+    """Агрегаты большой таблицы (streaming_ingest.StreamingAggregates).
+
+    Считаются по порциям при сборке колоночного кэша или, если кэш уже
+    есть, по пакетам parquet; таблица целиком в память не загружается.
+    """
+    from streaming_ingest import aggregate_chunks, aggregate_parquet, iter_chunks
+
+    fingerprint = file_fingerprint(path)
+    cache_file = _cache_path(path, fingerprint)
+    if cache_file.exists():
+        try:
+            aggregates = aggregate_parquet(cache_file)
+            _write_manifest(path, fingerprint, cache_file)
+            return aggregates
+        except Exception:
+            pass
+    aggregates = _store_streaming(path, fingerprint, cache_file)
+    if aggregates is None:
+        # Кэш недоступен: агрегаты считаются прямо по порциям xlsx
+        aggregates = aggregate_chunks(iter_chunks(path))
+    return aggregates
+
+
+def _store(path, fingerprint, cache_file, df):
+    """Сохраняет таблицу в кэш, удаляя устаревшие версии этого файла"""
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+        df.to_parquet(tmp_file, index=False)
+        # Атомарная замена: параллельные процессы не увидят недописанный файл
+        os.replace(tmp_file, cache_file)
+        for old in CACHE_DIR.glob(f"{_cache_stem(path)}-v*.parquet"):
+            if old != cache_file:
+                old.unlink(missing_ok=True)
+        _write_manifest(path, fingerprint, cache_file)
+    except Exception:
+        # Например, смешанные типы в колонке или каталог только для чтения:
+        # дашборд продолжает работать без кэша
+        pass
+
+
+def _store_streaming(path, fingerprint, cache_file):
+    """Пишет большой файл в кэш порциями; возвращает агрегаты или None"""
+    from streaming_ingest import stream_to_parquet
+
+    tmp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        aggregates = stream_to_parquet(path, tmp_file)
+        os.replace(tmp_file, cache_file)
+    except Exception:
+        # Как и в _store: без кэша таблица будет прочитана заново
+        tmp_file.unlink(missing_ok=True)
+        return None
+    for old in CACHE_DIR.glob(f"{_cache_stem(path)}-v*.parquet"):
+        if old != cache_file:
+            old.unlink(missing_ok=True)
+    _write_manifest(path, fingerprint, cache_file)
+    return aggregates
+
+
+def _write_manifest(path, fingerprint, cache_file):
+    manifest = dict(fingerprint, cache_file=cache_file.name)
+    if _read_manifest(path) == manifest:
+        return
+    try:
+        tmp_file = _manifest_path(path).with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_file, _manifest_path(path))
+    except OSError:
+        pass
+
+
+def _warm(path):
+    if is_large_source(path):
+        # Большой файл только пишется в кэш, таблица в процесс не загружается
+        fingerprint = file_fingerprint(path)
+        _store_streaming(path, fingerprint, _cache_path(path, fingerprint))
+    else:
+        load_frame(path)
+
+
+def _needs_pool(paths):
+    """Стоит ли запускать процессы: несколько городов или большие файлы"""
+    if len(paths) > POOL_MIN_FILES:
+        return True
+    return any(Path(path).exists() and is_large_source(path) for path in paths)
+
+
+def warm_cache(paths, max_workers=None):
+    """Собирает колоночный кэш для файлов, у которых его нет.
+
+    Разбор xlsx через openpyxl упирается в GIL, поэтому несколько файлов
+    разбираются параллельно в отдельных процессах; таблицы в основной
+    процесс не передаются - он потом читает готовый parquet. Запуск пула
+    стоит дороже разбора пары небольших файлов одного города, поэтому
+    пул нужен, только если устаревших файлов больше POOL_MIN_FILES или
+    среди них есть большие (см. STREAMING_THRESHOLD_BYTES); иначе файлы
+    разбираются в текущем процессе при загрузке таблиц. Возвращает
+    список устаревших файлов. Ошибки разбора здесь не поднимаются:
+    они появятся при загрузке конкретного файла.
+    """
+    stale = [path for path in dict.fromkeys(paths) if not is_cached(path)]
+    if len(stale) < 2 or max_workers == 1 or not _needs_pool(stale):
+        return stale
+    workers = min(len(stale), max_workers or os.cpu_count() or 1)
+    # spawn безопасен в многопоточном сервере Streamlit и работает так же на Windows
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(_warm, path) for path in stale]
+        for future in futures:
+            future.exception()
+    return stale
+
+
+def load_sources(use_cache=True):
+    """Загружает обе таблицы: рынок и профиль потребителей"""
+    df_market = load_frame(MARKET_FILE, use_cache=use_cache)
+    df_profile = load_frame(PROFILE_FILE, use_cache=use_cache)
+    return df_market, df_profile
+
+
+def data_fingerprint(paths=(MARKET_FILE, PROFILE_FILE)):
+    """Общий отпечаток набора данных для ключей кэшей"""
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for path in paths:
+        digest.update(file_fingerprint(path)['sha256'].encode())
+    return digest.hexdigest()[:16]
+
+
+def dataset_fingerprints(datasets=DATASETS):
+    """Отпечатки каждой таблицы отдельно: имя набора -> 16 hex символов.
+
+    По ним дашборд перезагружает и пересчитывает только изменившуюся таблицу.
+    """
+    fingerprints = {}
+    for name, path in datasets.items():
+        digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+        digest.update(file_fingerprint(path)['sha256'].encode())
+        fingerprints[name] = digest.hexdigest()[:16]
+    return fingerprints
+
+
+def stat_signature(paths=(MARKET_FILE, PROFILE_FILE)):
+    """Дешевая подпись файлов (mtime и размер) для частого опроса изменений"""
+    signature = []
+    for path in paths:
+        try:
+            stat = Path(path).stat()
+            signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((str(path), None, None))
+    return tuple(signature)
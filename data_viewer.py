@@ -0,0 +1,49 @@
+"""Постраничный просмотр исходных таблиц.
+
+Фильтрация, сортировка и выбор колонок выполняются на сервере, в браузер
+уходит только текущая страница строк, поэтому объем передаваемых данных не
+зависит от числа респондентов.
+"""
+
+import numpy as np
+
+# Варианты размера страницы
+PAGE_SIZES = (25, 50, 100, 250)
+
+
+def filter_sort_positions(df, query='', column=None, sort_by=None, ascending=True):
+    """Позиции строк после фильтра и сортировки.
+
+    query ищется без учета регистра как подстрока в колонке column или,
+    если колонка не указана, во всех колонках.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if query:
+        positions = [df.columns.get_loc(column)] if column is not None else range(df.shape[1])
+        found = np.zeros(len(df), dtype=bool)
+        for i in positions:
+            values = df.iloc[:, i]
+            found |= values.astype(str).str.contains(query, case=False, regex=False, na=False).to_numpy()
+        mask &= found
+
+    positions = np.flatnonzero(mask)
+    if sort_by is not None:
+        keys = df[sort_by].iloc[positions]
+        # Устойчивая сортировка, пропуски в конце
+        order = np.argsort(keys.rank(method='first', ascending=ascending, na_option='bottom').to_numpy(), kind='stable')
+        positions = positions[order]
+    return positions
+
+
+def page_count(total_rows, page_size):
+    """Количество страниц (минимум одна)"""
+    return max(1, -(-total_rows // page_size))
+
+
+def page_slice(df, positions, page, page_size, columns=None):
+    """Строки страницы page (с 1) с выбранными колонками"""
+    start = (page - 1) * page_size
+    rows = df.iloc[positions[start:start + page_size]]
+    if columns:
+        rows = rows[list(columns)]
+    return rows
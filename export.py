@@ -0,0 +1,206 @@
+"""Выгрузка всех агрегатов дашборда в один zip архив.
+
+В архив попадает каждая таблица AnalyticsModel: лист книги aggregates.xlsx
+и отдельные файлы parquet/<имя>.parquet и csv/<имя>.csv. Таблицы берутся из
+готовой модели, ничего не пересчитывается. Архив пишется потоково: CSV и
+parquet порциями по CHUNK_ROWS строк, xlsx через openpyxl write_only,
+поэтому в памяти одновременно находится только текущая порция. Готовый
+архив сохраняется на диск и переиспользуется, пока не изменятся данные.
+"""
+
+import io
+import os
+import tempfile
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from data_loader import CACHE_DIR
+
+# Каталог готовых архивов
+EXPORT_DIR = CACHE_DIR / 'exports'
+
+# Версия состава архива: увеличиваем при изменении списка таблиц
+EXPORT_VERSION = 1
+
+EXPORT_FORMATS = ('xlsx', 'parquet', 'csv')
+
+# Строк в одной порции записи
+CHUNK_ROWS = 50_000
+
+# Сколько последних архивов хранить на диске
+EXPORT_KEEP = 8
+
+# Ограничение листа Excel (без строки заголовка)
+XLSX_MAX_ROWS = 1_048_575
+
+
+def _frame(data, index_name=None):
+    """Таблица для выгрузки: Series и индексы превращаются в обычные колонки"""
+    if data is None:
+        return None
+    if isinstance(data, pd.Series):
+        data = data.rename_axis(index_name or data.index.name or 'index').reset_index()
+    elif not isinstance(data.index, pd.RangeIndex):
+        data = data.rename_axis(index_name or data.index.name or 'index').reset_index()
+    return data
+
+
+def _price_summaries(model):
+    rows = []
+    for role, label in (('max_price', "Максимальная цена"), ('min_price', "Минимальная цена"),
+                        ('fair_price', "Справедливая цена")):
+        summary = getattr(model, role)
+        if summary:
+            rows.append({"Вопрос": label, **{key: float(summary[key]) for key in ('count', 'mean', 'median', 'min', 'max')}})
+    return pd.DataFrame(rows) if rows else None
+
+
+def _kpis(model):
+    """Карточки KPI с доверительными интервалами"""
+    rows = []
+    cards = (('leader', "Лидер рынка", model.top_restaurant),
+             ('score', "Средняя оценка", f"{model.avg_satisfaction:.2f}/{model.rating_scale}"),
+             ('purpose', "Топ цель", model.top_purpose))
+    for key, title, value in cards:
+        interval = model.kpi_intervals.get(key, {})
+        rows.append({
+            "Показатель": title,
+            "Значение": str(value),
+            "Доля": interval.get('share'),
+            "Нижняя граница": interval.get('low'),
+            "Верхняя граница": interval.get('high'),
+            "Устойчивость": interval.get('stability'),
+        })
+    return pd.DataFrame(rows).astype({"Доля": float, "Устойчивость": float})
+
+
+def model_tables(model):
+    """Пары (имя, таблица) всех агрегатов модели в порядке вкладок дашборда"""
+    sensitivity = model.price_sensitivity
+    preferences = model.preferences
+    tables = (
+        ('kpi', lambda: _kpis(model)),
+        ('purpose', lambda: model.purpose_data),
+        ('frequency', lambda: model.frequency_data),
+        ('restaurants_known', lambda: model.known_data),
+        ('restaurants_visit', lambda: model.visit_data),
+        ('restaurants_popular', lambda: model.popular_data),
+        ('price_stats', lambda: model.price_stats),
+        ('price_summary', lambda: _price_summaries(model)),
+        ('price_describe', lambda: _frame(model.price_describe, "Статистика")),
+        ('price_sensitivity_curves', lambda: _frame(sensitivity.curves) if sensitivity else None),
+        ('price_sensitivity_points', lambda: sensitivity.intervals() if sensitivity else None),
+        ('satisfaction_general', lambda: model.general_satisfaction_data),
+        ('satisfaction_characteristics', lambda: model.characteristics_data),
+        ('importance', lambda: model.importance_data),
+        ('satisfaction_stats', lambda: _frame(model.satisfaction_stats, "Статистика")),
+        ('gender', lambda: _frame(model.gender_counts)),
+        ('age', lambda: _frame(model.age_counts)),
+        ('income', lambda: _frame(model.income_counts)),
+        ('sushi', lambda: _frame(preferences.counts, "Суши/роллы") if preferences is not None else None),
+    )
+    for name, build in tables:
+        df = build()
+        if df is not None and len(df.columns):
+            yield name, df
+
+
+def _chunks(df, chunk_rows):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield start, df.iloc[start:start + chunk_rows]
+
+
+def _write_csv(archive, path, df, chunk_rows):
+    # utf-8-sig: Excel открывает кириллицу без выбора кодировки
+    with archive.open(path, 'w', force_zip64=True) as raw, \
+            io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as text:
+        for start, chunk in _chunks(df, chunk_rows):
+            chunk.to_csv(text, index=False, header=start == 0)
+
+
+def _write_parquet(archive, path, df, chunk_rows):
+    with archive.open(path, 'w', force_zip64=True) as raw:
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(raw, schema) as writer:
+            for _, chunk in _chunks(df, chunk_rows):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _append_sheet(workbook, name, df, chunk_rows):
+    sheet = workbook.create_sheet(name[:31])
+    sheet.append([str(column) for column in df.columns])
+    for _, chunk in _chunks(df.iloc[:XLSX_MAX_ROWS], chunk_rows):
+        # В Excel нет NaN: пропуски пишутся пустыми ячейками
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+
+
+def write_bundle(model, fileobj, formats=EXPORT_FORMATS, chunk_rows=CHUNK_ROWS):
+    """Пишет zip архив со всеми агрегатами модели в файл или поток"""
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Неизвестные форматы выгрузки: {', '.join(sorted(unknown))}")
+    workbook = Workbook(write_only=True) if 'xlsx' in formats else None
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, df in model_tables(model):
+            if 'csv' in formats:
+                _write_csv(archive, f"csv/{name}.csv", df, chunk_rows)
+            if 'parquet' in formats:
+                _write_parquet(archive, f"parquet/{name}.parquet", df, chunk_rows)
+            if workbook is not None:
+                _append_sheet(workbook, name, df, chunk_rows)
+        if workbook is not None:
+            with archive.open('aggregates.xlsx', 'w', force_zip64=True) as raw:
+                workbook.save(raw)
+
+
+def bundle_path(model, formats=EXPORT_FORMATS):
+    """Путь к архиву модели в EXPORT_DIR; архив собирается при первом обращении"""
+    formats = tuple(format_ for format_ in EXPORT_FORMATS if format_ in formats)
+    path = EXPORT_DIR / f"aggregates-v{EXPORT_VERSION}-{model.fingerprint}-{'-'.join(formats)}.zip"
+    if path.exists():
+        return path
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    # Свой временный файл на каждый вызов: сессии одного процесса не пишут в один файл
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_bundle(model, f, formats)
+        # Атомарная замена: параллельные сессии не увидят недописанный архив
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    _prune()
+    return path
+
+
+def _prune(keep=EXPORT_KEEP):
+    """Удаляет самые старые архивы сверх keep"""
+    archives = sorted(EXPORT_DIR.glob('aggregates-*.zip'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for old in archives[keep:]:
+        old.unlink(missing_ok=True)
+
+
+def bundle_bytes(model, formats=EXPORT_FORMATS):
+    """Содержимое архива для st.download_button.
+
+    Архив модели с отпечатком данных берется с диска (или собирается один
+    раз), без отпечатка - собирается в памяти.
+    """
+    if model.fingerprint is None:
+        buffer = io.BytesIO()
+        write_bundle(model, buffer, formats)
+        return buffer.getvalue()
+    try:
+        return bundle_path(model, formats).read_bytes()
+    except OSError:
+        # Каталог кэша недоступен для записи: собираем архив в памяти
+        buffer = io.BytesIO()
+        write_bundle(model, buffer, formats)
+        return buffer.getvalue()
@@ -0,0 +1,63 @@
+"""Кэш готовых графиков Plotly.
+
+Графики хранятся уже оформленными (после create_custom_chart) по ключу
+(идентификатор графика, палитра, отпечаток данных). Размер кэша ограничен,
+лишние записи вытесняются по принципу LRU.
+"""
+
+import threading
+from collections import OrderedDict
+
+# Максимальное количество графиков в кэше по умолчанию
+DEFAULT_MAX_ENTRIES = 256
+
+
+class FigureCache:
+    """Потокобезопасный LRU-кэш графиков со счетчиками попаданий и промахов"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        """Возвращает график из кэша или строит его через builder()"""
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return fig
+            self.misses += 1
+
+        # Строим вне блокировки: другие сессии не ждут построения графика
+        fig = builder()
+
+        with self._lock:
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return fig
+
+    def clear(self):
+        """Очищает кэш и сбрасывает счетчики"""
+        with self._lock:
+            self._figures.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Размер кэша и счетчики попаданий/промахов"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._figures),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
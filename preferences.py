@@ -0,0 +1,136 @@
+"""Разбор свободных ответов о любимых суши/роллах.
+
+Ответы разбиваются на упоминания векторно (str.split + explode), после чего
+каждое уникальное написание нормализуется один раз: регистр, ё/е, латинские
+буквы-двойники в кириллических словах и таблица синонимов
+("филка" -> "филадельфия", "колифорнию" -> "калифорния").
+"""
+
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Необязательный файл с дополнительными синонимами {"вариант": "название"}
+SYNONYMS_FILE = 'sushi_synonyms.json'
+
+# Варианты написания -> каноническое название (ключи уже в нормализованном виде)
+SUSHI_SYNONYMS = {
+    'филадельфию': 'филадельфия',
+    'филадельфия лайт': 'филадельфия',
+    'филадельфия в любом виде': 'филадельфия',
+    'фаладельфия': 'филадельфия',
+    'филодельфия': 'филадельфия',
+    'филка': 'филадельфия',
+    'фила': 'филадельфия',
+    'philadelphia': 'филадельфия',
+    'калифорнию': 'калифорния',
+    'колифорнию': 'калифорния',
+    'колифорния': 'калифорния',
+    'california': 'калифорния',
+    'dragon': 'дракон',
+    'запеченые': 'запеченные',
+    'запеченые роллы': 'запеченные',
+    'запеченные роллы': 'запеченные',
+    'запеченные любые': 'запеченные',
+    'любые запеченные': 'запеченные',
+    'жаренные': 'жареные',
+    'жаренный рол': 'жареные',
+    'жареные роллы': 'жареные',
+    'горячие суши': 'горячие',
+    'темпуро': 'темпура',
+    'темпурные': 'темпура',
+    'в темпуре': 'темпура',
+    'ролл с угрем': 'с угрем',
+    'ролл с креветкой': 'с креветкой',
+}
+
+# Латинские буквы, которые выглядят как кириллические
+_HOMOGLYPHS = str.maketrans('aceopxykmtbh', 'асеорхукмтвн')
+_CYRILLIC = re.compile('[а-я]')
+_SPACES = re.compile(r'\s+')
+_EDGE_PUNCTUATION = ' .;:!?"\'«»()-'
+
+
+def load_synonyms(path=SYNONYMS_FILE):
+    """Таблица синонимов по умолчанию, дополненная из JSON файла (если есть)"""
+    synonyms = dict(SUSHI_SYNONYMS)
+    path = Path(path)
+    if path.exists():
+        with open(path, encoding='utf-8') as f:
+            synonyms.update({normalize_token(k): normalize_token(v) for k, v in json.load(f).items()})
+    return synonyms
+
+
+def normalize_token(token):
+    """Приводит одно написание к нормальной форме (без синонимов)"""
+    token = _SPACES.sub(' ', token.lower().replace('ё', 'е')).strip(_EDGE_PUNCTUATION)
+    # Латинские двойники заменяем только в словах с кириллицей
+    if _CYRILLIC.search(token):
+        token = token.translate(_HOMOGLYPHS)
+    return token
+
+
+def extract_preferences(answers, synonyms=None):
+    """Упоминания суши/роллов: Series с индексом респондента.
+
+    Одно и то же название в одном ответе учитывается один раз.
+    """
+    if synonyms is None:
+        synonyms = SUSHI_SYNONYMS
+
+    tokens = answers.dropna().astype(str).str.split(',').explode()
+
+    # Нормализуем только уникальные написания, затем раскладываем по кодам
+    codes, uniques = pd.factorize(tokens, use_na_sentinel=True)
+    normalized = np.array(
+        [synonyms.get(token, token) for token in map(normalize_token, uniques)] + [''],
+        dtype=object,
+    )
+    tokens = pd.Series(normalized[codes], index=tokens.index, name='sushi')
+
+    tokens = tokens[tokens != '']
+    duplicated = pd.DataFrame({'respondent': tokens.index, 'sushi': tokens.to_numpy()}).duplicated()
+    return tokens[~duplicated.to_numpy()]
+
+
+class PreferenceCounts:
+    """Частоты упоминаний суши/роллов, посчитанные один раз на набор данных"""
+
+    def __init__(self, answers, synonyms=None):
+        self.tokens = extract_preferences(answers, synonyms=synonyms)
+        self.counts = self.tokens.value_counts()
+
+    @classmethod
+    def from_answer_counts(cls, answer_counts, synonyms=None):
+        """Частоты по готовым частотам ответов (Series: ответ -> число анкет).
+
+        Так считаются упоминания для большой таблицы по потоковым агрегатам:
+        каждый уникальный ответ разбирается один раз. Упоминаний отдельных
+        анкет (tokens) в таком объекте нет, by_segment для него недоступен.
+        """
+        answers = pd.Series(answer_counts.index.astype(str), dtype=object)
+        tokens = extract_preferences(answers, synonyms=synonyms)
+        weights = answer_counts.to_numpy()[tokens.index.to_numpy()]
+        counts = pd.Series(weights, index=pd.Index(tokens.to_numpy(), name='sushi'), name='count')
+        preferences = cls.__new__(cls)
+        preferences.tokens = None
+        preferences.counts = counts.groupby(level=0, sort=False).sum().sort_values(ascending=False, kind='stable')
+        return preferences
+
+    def top(self, n=10):
+        """Топ-N названий с количеством упоминаний"""
+        return self.counts.head(n)
+
+    def by_segment(self, segments, top=None):
+        """Упоминания по сегментам: строки - сегменты, колонки - названия.
+
+        segments - Series с тем же индексом, что и ответы (например, пол).
+        """
+        columns = self.counts.index if top is None else self.counts.index[:top]
+        frame = pd.DataFrame({'segment': segments.reindex(self.tokens.index), 'sushi': self.tokens})
+        frame = frame[frame['sushi'].isin(columns)].dropna()
+        table = frame.groupby(['segment', 'sushi'], observed=True).size().unstack(fill_value=0)
+        return table.reindex(columns=columns, fill_value=0)
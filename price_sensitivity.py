@@ -0,0 +1,142 @@
+"""Ценовая чувствительность по методу Ван Вестендорпа.
+
+В опросе три ценовых вопроса: "выше какой цены не купят, потому что дорого"
+(слишком дорого), "ниже какой цены не купят, потому что усомнятся в
+качестве" (слишком дешево) и "справедливая цена". Отдельных вопросов
+"дешево" и "дорого" нет, поэтому кривые "не дешево" и "не дорого" строятся
+по распределению справедливой цены: цена не выше справедливой для
+респондента - не дорогая, не ниже - не дешевая.
+
+Распределения задаются таблицей (цена, доля или число ответов) либо сырыми
+ответами. Кривые считаются через np.searchsorted по отсортированным ценам.
+Доверительные интервалы точек - бутстреп: повторы выборки строятся
+матрицами полиномиальных частот (повтор x уровень цены, см. resampling),
+поэтому стоимость не зависит от числа респондентов.
+"""
+
+import numpy as np
+import pandas as pd
+
+from resampling import BOOTSTRAP_SAMPLES, CONFIDENCE, percentile_interval, resample_shares
+
+# Кривые графика: ключ -> подпись
+CURVES = {
+    'too_cheap': "Слишком дешево",
+    'not_cheap': "Не дешево",
+    'not_expensive': "Не дорого",
+    'too_expensive': "Слишком дорого",
+}
+
+# Точки пересечения кривых: ключ -> (кривая 1, кривая 2, подпись)
+POINTS = {
+    'PMC': ('too_cheap', 'not_cheap', "Минимальная приемлемая цена"),
+    'OPP': ('too_cheap', 'too_expensive', "Оптимальная цена"),
+    'IPP': ('not_cheap', 'not_expensive', "Безразличная цена"),
+    'PME': ('not_expensive', 'too_expensive', "Максимальная приемлемая цена"),
+}
+
+
+def price_distribution(values, weights=None):
+    """Уровни цены по возрастанию и их доли.
+
+    values - цены (сырые ответы или варианты из таблицы), weights - доли или
+    число ответов для каждого варианта; без weights каждый ответ весит 1.
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+    keep = ~(np.isnan(values) | np.isnan(weights)) & (weights > 0)
+    levels, inverse = np.unique(values[keep], return_inverse=True)
+    totals = np.bincount(inverse, weights=weights[keep], minlength=len(levels))
+    if not totals.sum():
+        return levels, totals
+    return levels, totals / totals.sum()
+
+
+def _cdf(levels, shares, grid):
+    """Доли P(X <= цена) на сетке; shares - вектор или матрица (повтор x уровень)"""
+    positions = np.searchsorted(levels, grid, side='right')
+    cumulative = np.cumsum(shares, axis=-1)
+    # Нормировка убирает ошибку округления: последняя доля ровно 1
+    cumulative = cumulative / cumulative[..., -1:]
+    cumulative = np.concatenate([np.zeros(cumulative.shape[:-1] + (1,)), cumulative], axis=-1)
+    return cumulative[..., positions]
+
+
+def _curves(grid, too_cheap, too_expensive, fair):
+    """Четыре кривые на сетке; каждый аргумент - (уровни, доли)"""
+    fair_cdf = _cdf(*fair, grid)
+    return {
+        'too_cheap': 1 - _cdf(*too_cheap, grid),
+        'not_cheap': fair_cdf,
+        'not_expensive': 1 - fair_cdf,
+        'too_expensive': _cdf(*too_expensive, grid),
+    }
+
+
+def _intersections(grid, first, second):
+    """Цена первого пересечения кривых (линейно между точками сетки), по строкам.
+
+    first и second - матрицы (повтор x сетка); NaN, если кривые не пересекаются.
+    """
+    difference = np.atleast_2d(first - second)
+    crossing = difference[:, :-1] * difference[:, 1:] <= 0
+    found = crossing.any(axis=1)
+    index = crossing.argmax(axis=1)
+    rows = np.arange(len(difference))
+    left, right = difference[rows, index], difference[rows, index + 1]
+    step = np.where(left != right, left / np.where(left != right, left - right, 1), 0)
+    prices = grid[index] + (grid[index + 1] - grid[index]) * step
+    return np.where(found, prices, np.nan)
+
+
+class PriceSensitivity:
+    """Кривые Ван Вестендорпа, точки OPP/IPP/PMC/PME и их доверительные интервалы"""
+
+    def __init__(self, too_cheap, too_expensive, fair, sample_size,
+                 n_boot=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, seed=0):
+        distributions = {'too_cheap': too_cheap, 'too_expensive': too_expensive, 'fair': fair}
+        for name, (levels, shares) in distributions.items():
+            if len(levels) < 2:
+                raise ValueError(f"Для кривой {name} нужно хотя бы два уровня цены")
+        self.sample_size = int(sample_size)
+        self.confidence = confidence
+        self.grid = np.unique(np.concatenate([levels for levels, _ in distributions.values()]))
+
+        curves = _curves(self.grid, too_cheap, too_expensive, fair)
+        self.curves = pd.DataFrame(
+            {CURVES[key]: values for key, values in curves.items()},
+            index=pd.Index(self.grid, name="Цена"),
+        )
+        self.points = {
+            key: float(_intersections(self.grid, curves[a], curves[b])[0])
+            for key, (a, b, _) in POINTS.items()
+        }
+
+        # Бутстреп: для каждого вопроса матрица долей уровней в n_boot повторах
+        resampled = {
+            name: (levels, resample_shares(shares, self.sample_size, n_boot=n_boot, seed=[seed, i]))
+            for i, (name, (levels, shares)) in enumerate(distributions.items())
+        }
+        boot_curves = _curves(self.grid, **resampled)
+        self.bootstrap = {
+            key: _intersections(self.grid, boot_curves[a], boot_curves[b])
+            for key, (a, b, _) in POINTS.items()
+        }
+
+    def intervals(self):
+        """Таблица точек с оценкой и границами доверительного интервала"""
+        rows = []
+        for key, (_, _, label) in POINTS.items():
+            low, high = percentile_interval(self.bootstrap[key], self.confidence)
+            rows.append({
+                "Точка": key,
+                "Описание": label,
+                "Цена": self.points[key],
+                "Нижняя граница": low,
+                "Верхняя граница": high,
+            })
+        return pd.DataFrame(rows)
+
+    def acceptable_range(self):
+        """Диапазон приемлемых цен (PMC, PME)"""
+        return self.points['PMC'], self.points['PME']
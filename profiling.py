@@ -0,0 +1,175 @@
+"""Замеры времени и памяти по разделам дашборда.
+
+Раздел оборачивается в span("имя"): при включенном профилировании
+записываются время выполнения и выделенная за это время память
+(tracemalloc), при выключенном span возвращает пустой контекст и почти
+ничего не стоит. Результаты одного запуска скрипта можно дописать в
+JSON lines файл и сохранить в текстовом формате Prometheus.
+
+tracemalloc и его пик общие на процесс, поэтому память достоверна, только
+когда профилирует одна сессия: пока профилируют несколько, новые разделы
+записываются без памяти (сброс пика одной сессией испортил бы замеры
+другой). Выделения других потоков, в том числе сессий без профилирования,
+тоже попадают в замер.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+# Каталог для файлов профилирования
+PROFILE_DIR = Path(os.environ.get('SUSHI_PROFILE_DIR', '.profile'))
+JSONL_FILE = 'spans.jsonl'
+PROMETHEUS_FILE = 'metrics.prom'
+
+METRIC_PREFIX = 'sushi_dashboard_span'
+
+_active = contextvars.ContextVar('profiler', default=None)
+_null_span = contextlib.nullcontext()
+
+# tracemalloc общий на процесс: включаем, пока профилирует хотя бы одна сессия
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+class Profiler:
+    """Записи разделов одного запуска скрипта"""
+
+    def __init__(self, trace_memory=True):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """Замер раздела; вложенные разделы получают путь через '/'"""
+        path = '/'.join([frame['path'] for frame in self._stack[-1:]] + [name])
+        frame = {'path': path, 'start_bytes': 0, 'peak_bytes': 0}
+        tracing = self.trace_memory and tracemalloc.is_tracing() and _tracing_users <= 1
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # Пик родителя до сброса счетчика сохраняем в его записи
+            if self._stack:
+                self._stack[-1]['peak_bytes'] = max(self._stack[-1]['peak_bytes'], peak)
+            frame['start_bytes'] = current
+            tracemalloc.reset_peak()
+        # Запись добавляется при входе, чтобы разделы шли в порядке начала
+        record = {'span': path, 'depth': len(self._stack), 'seconds': 0.0}
+        self.records.append(record)
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._stack.pop()
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(frame['peak_bytes'], peak)
+                if self._stack:
+                    self._stack[-1]['peak_bytes'] = max(self._stack[-1]['peak_bytes'], peak)
+                record['alloc_peak_bytes'] = max(0, peak - frame['start_bytes'])
+                record['alloc_net_bytes'] = current - frame['start_bytes']
+
+    def write_jsonl(self, path):
+        """Дописывает записи запуска в JSON lines файл"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in self.records:
+                f.write(json.dumps(dict(record, run=self.run_id, ts=self.started_at), ensure_ascii=False) + '\n')
+
+    def prometheus_text(self):
+        """Показатели последнего запуска в текстовом формате Prometheus"""
+        metrics = (
+            ('seconds', 'seconds', "Время выполнения раздела за последний запуск"),
+            ('alloc_peak_bytes', 'alloc_peak_bytes', "Пик выделенной памяти в разделе"),
+        )
+        totals = {}
+        for record in self.records:
+            for key, _, _ in metrics:
+                if key in record:
+                    totals.setdefault(key, {})
+                    totals[key][record['span']] = totals[key].get(record['span'], 0) + record[key]
+
+        lines = []
+        for key, suffix, help_text in metrics:
+            if key not in totals:
+                continue
+            name = f"{METRIC_PREFIX}_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for span_path, value in totals[key].items():
+                lines.append(f'{name}{{span="{_escape_label(span_path)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Перезаписывает файл для textfile коллектора Prometheus"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_text(self.prometheus_text(), encoding='utf-8')
+        tmp_path.replace(path)
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _start_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_users += 1
+        elif _tracing_users:
+            _tracing_users += 1
+        else:
+            # tracemalloc включен кем-то еще: не выключаем его
+            return False
+    return True
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def activate(profiler):
+    """Делает профилировщик текущим для span(); None - профилирование выключено"""
+    if profiler is None:
+        yield None
+        return
+    started = profiler.trace_memory and _start_tracing()
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+        if started:
+            _stop_tracing()
+
+
+def current():
+    """Текущий профилировщик или None"""
+    return _active.get()
+
+
+def span(name):
+    """Замер раздела текущим профилировщиком (пустой контекст, если его нет)"""
+    profiler = _active.get()
+    if profiler is None:
+        return _null_span
+    return profiler.span(name)
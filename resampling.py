@@ -0,0 +1,81 @@
+"""Бутстреп пакетами матриц повторов.
+
+Выборка из n ответов с возвращением задается полиномиальными частотами
+вариантов ответа, поэтому все повторы строятся матрицей (повтор x вариант),
+а не циклом по анкетам. Повторы делятся на пакеты ограниченного размера и
+считаются в пуле потоков: numpy отпускает GIL на генерации и суммировании.
+Каждый пакет получает свой генератор от общего SeedSequence, так что
+результат не зависит от числа потоков.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Повторы бутстрепа и уровень доверия
+BOOTSTRAP_SAMPLES = 2000
+CONFIDENCE = 0.95
+
+# Элементов матрицы в одном пакете: ограничивает память на поток
+BATCH_ELEMENTS = 1_000_000
+
+# Потоков для пакетов (можно переопределить переменной окружения)
+WORKERS = int(os.environ.get('SUSHI_BOOTSTRAP_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+def _batched(sample, n_boot, row_size, seed, workers):
+    """Склеивает результаты sample(rng, число повторов) по пакетам"""
+    batch = max(1, BATCH_ELEMENTS // max(row_size, 1))
+    sizes = [min(batch, n_boot - start) for start in range(0, n_boot, batch)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+
+    def run(task):
+        seed_sequence, size = task
+        return sample(np.random.default_rng(seed_sequence), size)
+
+    workers = min(workers or WORKERS, len(tasks))
+    if workers <= 1:
+        return np.concatenate([run(task) for task in tasks])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(run, tasks)))
+
+
+def resample_shares(counts, sample_size=None, n_boot=BOOTSTRAP_SAMPLES, seed=0, workers=None):
+    """Доли вариантов ответа в повторах выборки: матрица (повтор x вариант).
+
+    counts - число (или доля) ответов на каждый вариант, sample_size -
+    размер выборки; по умолчанию сумма counts.
+    """
+    counts = np.asarray(counts, dtype=float)
+    shares = counts / counts.sum()
+    size = int(round(counts.sum())) if sample_size is None else int(sample_size)
+    return _batched(
+        lambda rng, n: rng.multinomial(size, shares, size=n) / size,
+        n_boot, len(shares), seed, workers,
+    )
+
+
+def resample_means(values, n_boot=BOOTSTRAP_SAMPLES, seed=0, workers=None):
+    """Средние значения в повторах выборки с возвращением.
+
+    Повторяющиеся значения (баллы шкалы) сворачиваются в частоты, поэтому
+    стоимость зависит от числа разных значений, а не от числа ответов.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return np.full(n_boot, np.nan)
+    levels, counts = np.unique(values, return_counts=True)
+    return resample_shares(counts, n_boot=n_boot, seed=seed, workers=workers) @ levels
+
+
+def percentile_interval(samples, confidence=CONFIDENCE):
+    """Процентильный доверительный интервал (нижняя, верхняя граница)"""
+    samples = np.asarray(samples, dtype=float)
+    samples = samples[~np.isnan(samples)]
+    if not len(samples):
+        return np.nan, np.nan
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(samples, [tail, 100 - tail])
+    return float(low), float(high)
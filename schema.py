@@ -0,0 +1,121 @@
+"""Роли колонок в таблицах опроса.
+
+Схема определяется один раз на набор данных: каждому вопросу сопоставляется
+колонка со значениями (количеством, баллом или долей), которая в выгрузке
+всегда стоит справа от вопроса. Дальше дашборд обращается к колонкам по
+ролям, а не ищет их по ключевым словам при каждом перезапуске.
+"""
+
+
+class SchemaError(ValueError):
+    """В таблице нет колонки для обязательной роли"""
+
+
+# Роли вопросов таблицы рынка: роль -> ключевые слова (все должны входить
+# в название колонки в нижнем регистре)
+QUESTION_ROLES = {
+    'purpose': ('цель посещения',),
+    'frequency': ('как часто',),
+    'known': ('знают',),
+    'visit': ('ходят',),
+    'popular': ('какой суши-ресторан',),
+    'general_satisfaction': ('удовлетворены суши-рестораном',),
+    'characteristics': ('характеристик', 'удовлетвор'),
+    'importance': ('важность',),
+    'max_price': ('выше', 'цен'),
+    'min_price': ('ниже', 'цен'),
+    'fair_price': ('справедлив', 'цен'),
+}
+
+# Роли таблицы профиля потребителей: роль -> название колонки
+PROFILE_ROLES = {
+    'gender': 'пол',
+    'age': 'возраст',
+    'income': 'доход',
+    'sushi': 'Какие суши\\роллы  любят больше всего',
+}
+
+# Без этих ролей дашборд не имеет смысла
+REQUIRED_ROLES = ('purpose', 'frequency', 'known', 'visit', 'popular')
+
+# Ключевые слова групп колонок
+PRICE_KEYWORDS = ('цена', 'цены', 'стоимость', 'руб')
+RATING_KEYWORDS = ('удовлетвор', 'оценк', 'балл', 'рейтинг')
+
+# Префиксы колонок со значениями (не вопросов)
+VALUE_PREFIXES = ('кол-во', 'балл', '%')
+
+
+def _is_value_column(name):
+    return name.strip().startswith(VALUE_PREFIXES)
+
+
+class SurveySchema:
+    """Соответствие ролей и колонок для таблиц рынка и профиля"""
+
+    def __init__(self, questions, profile, price_columns, rating_columns):
+        self.questions = questions
+        self.profile = profile
+        self.price_columns = price_columns
+        self.rating_columns = rating_columns
+
+    def get(self, role):
+        """(колонка вопроса, колонка значений) или None, если роли нет"""
+        return self.questions.get(role)
+
+    def pair(self, role):
+        """(колонка вопроса, колонка значений); SchemaError, если роли нет"""
+        pair = self.questions.get(role)
+        if pair is None:
+            raise SchemaError(f"В таблице рынка не найдена колонка для роли '{role}'")
+        return pair
+
+    def profile_column(self, role):
+        """Колонка профиля или None"""
+        return self.profile.get(role)
+
+    def describe(self):
+        """Таблица ролей для отладочной панели"""
+        rows = [
+            {"Роль": role, "Вопрос": question, "Значения": value}
+            for role, (question, value) in self.questions.items()
+        ]
+        rows += [
+            {"Роль": role, "Вопрос": column, "Значения": ""}
+            for role, column in self.profile.items()
+        ]
+        return rows
+
+
+def resolve_schema(df_market, df_profile, required=REQUIRED_ROLES):
+    """Определяет роли колонок; SchemaError, если нет обязательных ролей"""
+    market_columns = list(df_market.columns)
+
+    questions = {}
+    for role, keywords in QUESTION_ROLES.items():
+        for i, name in enumerate(market_columns):
+            if _is_value_column(name) or not all(word in name.lower() for word in keywords):
+                continue
+            # Значения вопроса - в соседней колонке справа
+            if i + 1 < len(market_columns) and _is_value_column(market_columns[i + 1]):
+                questions[role] = (name, market_columns[i + 1])
+            break
+
+    profile = {role: name for role, name in PROFILE_ROLES.items() if name in df_profile.columns}
+
+    missing = [role for role in required if role not in questions and role not in profile]
+    if missing:
+        raise SchemaError(
+            "Не найдены колонки для ролей: " + ", ".join(missing)
+            + ". Проверьте структуру файла."
+        )
+
+    price_columns = [
+        name for name in market_columns
+        if any(word in name.lower() for word in PRICE_KEYWORDS)
+    ]
+    rating_columns = [
+        name for name in market_columns
+        if any(word in name.lower() for word in RATING_KEYWORDS)
+    ]
+    return SurveySchema(questions, profile, price_columns, rating_columns)
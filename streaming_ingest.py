@@ -0,0 +1,212 @@
+"""Потоковая загрузка больших Excel файлов.
+
+Лист читается через openpyxl в режиме read_only построчно и обрабатывается
+порциями фиксированного размера: каждая порция очищается от Excel ошибок,
+сразу учитывается в агрегатах (частоты ответов, суммы, минимум/максимум,
+гистограммы) и дописывается в parquet файл колоночного кэша. Целиком лист
+в памяти не держится; построчная таблица читается из parquet только там,
+где она нужна (сегменты, просмотр данных).
+"""
+
+from collections import Counter
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_loader import clean_excel_errors
+
+# Размер порции строк по умолчанию
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Точность округления числовых значений для гистограмм
+NUMERIC_PRECISION = 2
+
+
+def header_names(header):
+    """Имена колонок как у pd.read_excel: дубликаты получают суффикс .1, .2 ..."""
+    # Пустые ячейки в конце строки заголовков не являются колонками
+    header = list(header)
+    while header and header[-1] is None:
+        header.pop()
+
+    names = []
+    used = set()
+    suffixes = Counter()
+    for i, name in enumerate(header):
+        base = f"Unnamed: {i}" if name is None else str(name)
+        name = base
+        if name in used:
+            n = max(suffixes[base], 1)
+            while f"{base}.{n}" in used:
+                n += 1
+            name = f"{base}.{n}"
+            suffixes[base] = n + 1
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, sheet_name=None):
+    """Читает первый (или указанный) лист порциями по chunk_size строк.
+
+    Возвращает генератор очищенных DataFrame с одинаковыми колонками.
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = header_names(header)
+        width = len(columns)
+
+        buffer = []
+        for row in rows:
+            row = row[:width]
+            # Полностью пустые строки (форматирование в конце листа) пропускаем
+            if all(value is None for value in row):
+                continue
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield _make_chunk(buffer, columns)
+                buffer = []
+        if buffer:
+            yield _make_chunk(buffer, columns)
+    finally:
+        wb.close()
+
+
+def _make_chunk(rows, columns):
+    """Порция строк в виде очищенного DataFrame с выведенными типами"""
+    chunk = pd.DataFrame.from_records(rows, columns=columns).infer_objects()
+    return clean_excel_errors(chunk)
+
+
+class StreamingAggregates:
+    """Агрегаты по колонкам, обновляемые порция за порцией.
+
+    Для текстовых колонок хранятся частоты ответов, для числовых - счетчик,
+    сумма, минимум, максимум и частоты округленных значений, из которых
+    строится гистограмма с любым числом интервалов. По этим агрегатам
+    AnalyticsModel строит раздел профиля большой таблицы без ее загрузки.
+    """
+
+    def __init__(self, precision=NUMERIC_PRECISION):
+        self.precision = precision
+        self.rows = 0
+        self.columns = []
+        self.value_counts_by_column = {}
+        self.numeric = {}
+
+    def update(self, chunk):
+        """Учитывает очередную порцию строк"""
+        if not self.columns:
+            self.columns = list(chunk.columns)
+        self.rows += len(chunk)
+        for i, name in enumerate(chunk.columns):
+            column = chunk.iloc[:, i].dropna()
+            if column.empty:
+                continue
+            counts = self.value_counts_by_column.setdefault(name, Counter())
+            if pd.api.types.is_numeric_dtype(column.dtype):
+                values = column.to_numpy(dtype=float)
+                stats = self.numeric.setdefault(
+                    name, {'count': 0, 'sum': 0.0, 'min': np.inf, 'max': -np.inf}
+                )
+                stats['count'] += len(values)
+                stats['sum'] += float(values.sum())
+                stats['min'] = min(stats['min'], float(values.min()))
+                stats['max'] = max(stats['max'], float(values.max()))
+                column = pd.Series(np.round(values, self.precision))
+            counts.update(column.value_counts().to_dict())
+
+    def count(self, column):
+        """Число непустых значений колонки"""
+        return sum(self.value_counts_by_column.get(column, Counter()).values())
+
+    def value_counts(self, column, top=None):
+        """Частоты ответов в колонке по убыванию, как Series.value_counts()"""
+        counts = self.value_counts_by_column.get(column, Counter())
+        labels, values = zip(*counts.most_common(top)) if counts else ((), ())
+        return pd.Series(np.array(values, dtype=np.int64), index=pd.Index(list(labels), name=column), name='count')
+
+    def stats(self, column):
+        """count, sum, mean, min, max числовой колонки"""
+        stats = dict(self.numeric[column])
+        stats['mean'] = stats['sum'] / stats['count'] if stats['count'] else np.nan
+        return stats
+
+    def histogram(self, column, bins=10):
+        """Гистограмма числовой колонки: (частоты, границы интервалов)"""
+        counts = self.value_counts_by_column.get(column, Counter())
+        values = np.fromiter(counts.keys(), dtype=float, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=float, count=len(counts))
+        return np.histogram(values, bins=bins, weights=weights)
+
+
+def aggregate_chunks(chunks, aggregates=None):
+    """Агрегаты по последовательности порций (лист xlsx, пакеты parquet)"""
+    if aggregates is None:
+        aggregates = StreamingAggregates()
+    for chunk in chunks:
+        aggregates.update(chunk)
+    return aggregates
+
+
+def _arrow_schema(chunk):
+    """Схема parquet по первой порции: числа - float64, остальное - строки"""
+    return pa.schema([
+        (str(name), pa.float64() if pd.api.types.is_numeric_dtype(dtype) else pa.string())
+        for name, dtype in chunk.dtypes.items()
+    ])
+
+
+def _conform(chunk, schema):
+    """Приводит порцию к схеме первой порции.
+
+    Текст в колонке, которая в первой порции была числовой, становится
+    пропуском; числа в текстовой колонке записываются строками.
+    """
+    columns = {}
+    for field, (_, column) in zip(schema, chunk.items()):
+        if pa.types.is_floating(field.type):
+            columns[field.name] = pd.to_numeric(column, errors='coerce').astype('float64')
+        else:
+            columns[field.name] = column.astype(str).where(column.notna(), None).astype(object)
+    return pd.DataFrame(columns)
+
+
+def stream_to_parquet(path, target, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Переписывает лист xlsx в parquet порциями и считает агрегаты.
+
+    В памяти одновременно находятся только текущая порция и агрегаты;
+    агрегаты считаются по уже приведенной порции, поэтому совпадают с
+    агрегатами по готовому parquet. Возвращает StreamingAggregates.
+    """
+    aggregates = StreamingAggregates()
+    writer = None
+    try:
+        for chunk in iter_chunks(path, chunk_size=chunk_size):
+            if writer is None:
+                writer = pq.ParquetWriter(target, _arrow_schema(chunk))
+            chunk = _conform(chunk, writer.schema)
+            aggregates.update(chunk)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pd.DataFrame().to_parquet(target, index=False)
+    return aggregates
+
+
+def aggregate_parquet(path, batch_rows=DEFAULT_CHUNK_SIZE):
+    """Агрегаты parquet файла, прочитанного пакетами по batch_rows строк"""
+    batches = pq.ParquetFile(path).iter_batches(batch_size=batch_rows)
+    return aggregate_chunks(batch.to_pandas() for batch in batches)
@@ -0,0 +1,247 @@
+"""Глобальная таблица стилей и шаблоны KPI карточек.
+
+Стили собираются один раз и сохраняются в static/css под именем с хэшем
+содержимого, после чего на каждом перезапуске скрипта в браузер уходит
+только короткий тег <link>. Браузер кэширует файл по имени, а при
+изменении стилей меняется хэш и, значит, имя файла. KPI карточки
+оформлены классами, поэтому их HTML содержит почти только значения.
+"""
+
+import hashlib
+import html
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+CSS_DIR = Path("static/css")
+CSS_URL = "app/static/css"
+FONT_URL = "app/static/fonts"
+
+# Путь к шрифтам в файле static/css/*.css (относительно каталога таблицы стилей)
+CSS_FONT_PATH = "../fonts/"
+
+# Оформление KPI карточек: вариант -> (градиент, цвет тени)
+KPI_VARIANTS = {
+    'leader': ('#667eea 0%, #764ba2 100%', 'rgba(102, 126, 234, 0.3)'),
+    'score': ('#4facfe 0%, #00f2fe 100%', 'rgba(79, 172, 254, 0.3)'),
+    'purpose': ('#fa709a 0%, #fee140 100%', 'rgba(250, 112, 154, 0.3)'),
+}
+
+KPI_CARD_TEMPLATE = (
+    '<div class="kpi-card kpi-{variant}"><div class="kpi-icon">{icon}</div>'
+    '<div class="kpi-title">{title}</div><div class="kpi-value">{value}</div>{note}</div>'
+)
+
+
+def build_stylesheet(font_family, colors, font_faces=""):
+    """Полный текст таблицы стилей дашборда"""
+    return font_faces + f"""
+:root {{
+    --primary-color: {colors['primary']};
+    --secondary-color: {colors['secondary']};
+    --text-color: {colors['dark']};
+    --bg-light: {colors['light']};
+}}
+
+* {{
+    font-family: "{font_family}", -apple-system, BlinkMacSystemFont, "Segoe UI", "Roboto", sans-serif !important;
+}}
+
+.main-header {{
+    font-size: 3.5rem;
+    background: linear-gradient(45deg, {colors['primary']}, {colors['secondary']});
+    -webkit-background-clip: text;
+    -webkit-text-fill-color: transparent;
+    background-clip: text;
+    text-align: center;
+    margin-bottom: 2rem;
+    font-weight: 700;
+    font-family: "{font_family}", sans-serif !important;
+}}
+
+.metric-card {{
+    background: linear-gradient(135deg, #f8fafc 0%, #ffffff 100%);
+    padding: 1.5rem;
+    border-radius: 15px;
+    border-left: 5px solid var(--primary-color);
+    box-shadow: 0 4px 20px rgba(30, 58, 138, 0.1);
+    font-family: "{font_family}", sans-serif !important;
+    transition: transform 0.2s ease;
+}}
+
+.metric-card:hover {{
+    transform: translateY(-2px);
+    box-shadow: 0 8px 30px rgba(30, 58, 138, 0.15);
+}}
+
+.sidebar .sidebar-content {{
+    background: linear-gradient(180deg, #f1f5f9 0%, #e2e8f0 100%);
+    font-family: "{font_family}", sans-serif !important;
+}}
+
+.stTabs [data-baseweb="tab-list"] button [data-testid="stMarkdownContainer"] p {{
+    font-family: "{font_family}", sans-serif !important;
+    font-weight: 600;
+    font-size: 18px;
+    color: #FF8A65;
+}}
+
+.stTabs [data-baseweb="tab-list"] button {{
+    background-color: transparent;
+    border-radius: 10px 10px 0 0;
+    border: none;
+    padding: 12px 20px;
+    margin-right: 4px;
+    transition: all 0.3s ease;
+}}
+
+.stTabs [data-baseweb="tab-list"] button:hover {{
+    background: linear-gradient(135deg, rgba(30, 58, 138, 0.1), rgba(59, 130, 246, 0.1));
+    transform: translateY(-2px);
+}}
+
+.stTabs [data-baseweb="tab-list"] button[aria-selected="true"] {{
+    background: linear-gradient(135deg, {colors['primary']}, {colors['secondary']});
+    color: white !important;
+    box-shadow: 0 4px 15px rgba(30, 58, 138, 0.3);
+}}
+
+.stTabs [data-baseweb="tab-list"] button[aria-selected="true"] [data-testid="stMarkdownContainer"] p {{
+    color: white !important;
+    font-weight: 700;
+}}
+
+.stSelectbox label, .stCheckbox label, .stRadio label {{
+    font-family: "{font_family}", sans-serif !important;
+    font-weight: 500;
+    color: #1F2937;
+}}
+
+.stDataFrame, .stTable {{
+    font-family: "{font_family}", sans-serif !important;
+}}
+
+h1, h2, h3, h4, h5, h6 {{
+    font-family: "{font_family}", sans-serif !important;
+    font-weight: 600;
+    color: #FF8A65;
+}}
+
+.stMetric {{
+    font-family: "{font_family}", sans-serif !important;
+}}
+
+.stMetric > div > div > div > div {{
+    font-size: 1.2rem;
+    font-weight: 600;
+}}
+
+.stInfo, .stSuccess, .stWarning, .stError {{
+    font-family: "{font_family}", sans-serif !important;
+    border-radius: 10px;
+}}
+
+.element-container {{
+    font-family: "{font_family}", sans-serif !important;
+}}
+
+/* Кастомизация графиков */
+.js-plotly-plot .plotly .main-svg {{
+    border-radius: 10px;
+}}
+
+/* Анимации */
+@keyframes fadeIn {{
+    from {{ opacity: 0; transform: translateY(20px); }}
+    to {{ opacity: 1; transform: translateY(0); }}
+}}
+
+.element-container {{
+    animation: fadeIn 0.5s ease-out;
+}}
+""" + _kpi_css()
+
+
+def _kpi_css():
+    """Классы KPI карточек и hover эффект"""
+    css = """
+.kpi-card {
+    padding: 2rem;
+    border-radius: 20px;
+    color: white;
+    text-align: center;
+    transform: translateY(0);
+    transition: all 0.3s ease;
+    border: none;
+    position: relative;
+    overflow: hidden;
+}
+
+.kpi-card::after {
+    content: "";
+    position: absolute;
+    top: -20px;
+    right: -20px;
+    width: 60px;
+    height: 60px;
+    background: rgba(255,255,255,0.1);
+    border-radius: 50%;
+}
+
+.kpi-card:hover {
+    transform: translateY(-5px) !important;
+    box-shadow: 0 15px 40px rgba(0,0,0,0.2) !important;
+}
+
+.kpi-icon { font-size: 3rem; margin-bottom: 0.5rem; }
+.kpi-title { font-size: 1.8rem; font-weight: 700; margin-bottom: 0.5rem; }
+.kpi-value { font-size: 1.2rem; opacity: 0.9; font-weight: 500; }
+.kpi-note { font-size: 0.85rem; opacity: 0.8; margin-top: 0.4rem; }
+"""
+    for variant, (gradient, shadow) in KPI_VARIANTS.items():
+        css += f".kpi-{variant} {{ background: linear-gradient(135deg, {gradient}); box-shadow: 0 10px 30px {shadow}; }}\n"
+    return css
+
+
+def kpi_card(variant, icon, title, value, note=""):
+    """HTML одной KPI карточки (значение и пояснение экранируются)"""
+    note = f'<div class="kpi-note">{html.escape(note)}</div>' if note else ""
+    return KPI_CARD_TEMPLATE.format(
+        variant=variant, icon=icon, title=html.escape(title), value=html.escape(str(value)), note=note
+    )
+
+
+@lru_cache(maxsize=32)
+def stylesheet_html(css, static_serving=True):
+    """Тег подключения таблицы стилей.
+
+    Файл static/css/dashboard-<хэш>.css пишется один раз на процесс,
+    файлы с прежними хэшами при этом удаляются. Если статические файлы
+    Streamlit отключены или каталог недоступен для записи, стили
+    вставляются в страницу напрямую; пути к шрифтам тогда указываются от
+    страницы, а не от static/css.
+    """
+    if static_serving:
+        digest = hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+        name = f"dashboard-{digest}.css"
+        try:
+            CSS_DIR.mkdir(parents=True, exist_ok=True)
+            path = CSS_DIR / name
+            if not path.exists():
+                # Свой временный файл: параллельные процессы не пишут в один
+                fd, tmp_path = tempfile.mkstemp(dir=CSS_DIR, suffix='.tmp')
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        f.write(css)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+                for old in CSS_DIR.glob("dashboard-*.css"):
+                    if old != path:
+                        old.unlink(missing_ok=True)
+            return f'<link rel="stylesheet" href="{CSS_URL}/{name}">'
+        except OSError:
+            pass
+    return f"<style>{css.replace(CSS_FONT_PATH, FONT_URL + '/')}</style>"
@@ -0,0 +1,349 @@
+"""Хранилище анкет опроса в локальном файле SQLite.
+
+Альтернатива xlsx для длительного сбора: ответы дописываются в базу, а не
+переэкспортируются файлами. Таблицы наборов данных (market, profile) лежат в
+одноименных таблицах базы; по колонкам ответов (категории и числа) строятся
+индексы. Групповые счетчики, describe и квантили считаются в SQL, в pandas
+попадают только небольшие результаты (см. AnalyticsModel(aggregates=...)).
+
+База открывается в режиме WAL: запись новых анкет не блокирует чтение.
+Сессии Streamlit читают через общий пул соединений только для чтения
+(SurveyStore); каждое соединение в один момент времени занято одним потоком.
+
+Импорт xlsx (через колоночный кэш data_loader) и дозапись ответов:
+
+    python survey_store.py import
+    python survey_store.py append profile новые_анкеты.xlsx
+"""
+
+import argparse
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATASETS, file_fingerprint, load_frame, optimize_dtypes, read_source
+
+# Источник данных дашборда: 'xlsx' (по умолчанию) или 'sqlite'
+DATA_SOURCE = os.environ.get('SUSHI_DATA_SOURCE', 'xlsx')
+
+# Файл базы (можно переопределить переменной окружения)
+STORE_FILE = Path(os.environ.get('SUSHI_STORE_FILE', 'survey.sqlite'))
+
+# Версия формата хранилища: входит в отпечатки таблиц
+STORE_VERSION = 1
+
+# Соединений для чтения в пуле
+POOL_SIZE = int(os.environ.get('SUSHI_STORE_POOL', 4))
+
+# Строк в одной порции вставки
+INSERT_CHUNK_ROWS = 50_000
+
+# Служебная таблица: набор данных -> отпечаток, число строк, источник
+META_TABLE = 'survey_tables'
+
+
+def _quote(name):
+    """Имя таблицы или колонки в SQL (кириллица, пробелы, кавычки)"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _is_answer_column(dtype):
+    """Колонки ответов с повторяющимися значениями: по ним строятся индексы"""
+    return isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_numeric_dtype(dtype)
+
+
+def store_paths(path=STORE_FILE):
+    """Файлы базы для опроса изменений: сама база и журнал WAL"""
+    return [str(path), f"{path}-wal"]
+
+
+def _rows_digest(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()
+
+
+def _connect_writer(path):
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {META_TABLE} ("
+        "name TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, rows INTEGER NOT NULL, "
+        "source TEXT, updated_at TEXT NOT NULL)"
+    )
+    return connection
+
+
+def _insert(connection, name, df):
+    placeholders = ', '.join('?' * len(df.columns))
+    statement = f"INSERT INTO {_quote(name)} VALUES ({placeholders})"
+    for start in range(0, len(df), INSERT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + INSERT_CHUNK_ROWS]
+        # Пропуски записываются как NULL, numpy значения - как обычные числа
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        connection.executemany(statement, chunk.itertuples(index=False, name=None))
+
+
+def _update_meta(connection, name, fingerprint, rows, source):
+    connection.execute(
+        f"INSERT OR REPLACE INTO {META_TABLE} VALUES (?, ?, ?, ?, ?)",
+        (name, fingerprint, rows, source, datetime.now(timezone.utc).isoformat(timespec='seconds')),
+    )
+
+
+def write_table(name, df, path=STORE_FILE, source=None, fingerprint=None):
+    """Заменяет таблицу набора данных в базе одной транзакцией.
+
+    Читатели до фиксации видят прежнюю версию таблицы. fingerprint по
+    умолчанию - хэш содержимого df.
+    """
+    if fingerprint is None:
+        fingerprint = hashlib.sha256(_rows_digest(df)).hexdigest()
+    digest = hashlib.sha256(f"v{STORE_VERSION}".encode())
+    digest.update(fingerprint.encode())
+    columns = ', '.join(f"{_quote(column)} {_sql_type(dtype)}" for column, dtype in df.dtypes.items())
+
+    connection = _connect_writer(path)
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(f"DROP TABLE IF EXISTS {_quote(name)}")
+            connection.execute(f"CREATE TABLE {_quote(name)} ({columns})")
+            _insert(connection, name, df)
+            # Индексы после вставки: так их построение быстрее
+            for i, (column, dtype) in enumerate(df.dtypes.items()):
+                if _is_answer_column(dtype):
+                    connection.execute(
+                        f"CREATE INDEX {_quote(f'ix_{name}_{i}')} ON {_quote(name)} ({_quote(column)})"
+                    )
+            _update_meta(connection, name, digest.hexdigest()[:16], len(df), source)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+    finally:
+        connection.close()
+
+
+def append_rows(name, df, path=STORE_FILE, source=None):
+    """Дописывает новые анкеты в таблицу; колонки должны совпадать с таблицей"""
+    connection = _connect_writer(path)
+    try:
+        columns = [row[1] for row in connection.execute(f"PRAGMA table_info({_quote(name)})")]
+        if not columns:
+            raise ValueError(f"В хранилище {path} нет таблицы {name}: сначала выполните импорт")
+        if list(df.columns) != columns:
+            raise ValueError(f"Колонки новых анкет не совпадают с таблицей {name}")
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            previous, rows = connection.execute(
+                f"SELECT fingerprint, rows FROM {META_TABLE} WHERE name = ?", (name,)
+            ).fetchone()
+            _insert(connection, name, df)
+            # Отпечаток цепочкой: прежний отпечаток + хэш дописанных строк
+            digest = hashlib.sha256(previous.encode())
+            digest.update(_rows_digest(df))
+            _update_meta(connection, name, digest.hexdigest()[:16], rows + len(df), source)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+    finally:
+        connection.close()
+
+
+def import_sources(datasets=DATASETS, path=STORE_FILE):
+    """Импорт исходных xlsx в базу; отпечаток таблицы - хэш файла"""
+    for name, source in datasets.items():
+        write_table(name, load_frame(source), path=path, source=str(source),
+                    fingerprint=file_fingerprint(source)['sha256'])
+
+
+def _quantiles(connection, name, quoted, qs, n=None):
+    """Квантили по уже занятому соединению; quoted - проверенное имя колонки"""
+    if n is None:
+        n = connection.execute(f"SELECT COUNT({quoted}) FROM {_quote(name)}").fetchone()[0]
+    if not n:
+        return [np.nan] * len(qs)
+    sql = (f"SELECT {quoted} FROM {_quote(name)} WHERE {quoted} IS NOT NULL "
+           f"ORDER BY {quoted} LIMIT 2 OFFSET ?")
+    result = []
+    for q in qs:
+        position = q * (n - 1)
+        lower = int(np.floor(position))
+        values = [row[0] for row in connection.execute(sql, (lower,))]
+        upper = values[1] if len(values) > 1 else values[0]
+        result.append(values[0] + (upper - values[0]) * (position - lower))
+    return result
+
+
+class SurveyStore:
+    """Чтение хранилища через пул соединений только для чтения.
+
+    Один объект на файл базы можно разделять между потоками (сессиями
+    Streamlit): соединение выдается потоку на время запроса и возвращается
+    в пул, одновременно открыто не больше pool_size соединений.
+    """
+
+    def __init__(self, path=STORE_FILE, pool_size=POOL_SIZE):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(
+                f"Хранилище {self.path} не найдено: импортируйте данные командой python survey_store.py import"
+            )
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _connect(self):
+        connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True,
+                                     check_same_thread=False)
+        connection.execute('PRAGMA query_only = ON')
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Соединение из пула на время блока with"""
+        with self._slots:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+            try:
+                yield connection
+            finally:
+                self._idle.put(connection)
+
+    def _query(self, sql, params=()):
+        with self.connection() as connection:
+            return connection.execute(sql, params).fetchall()
+
+    def fingerprints(self):
+        """Отпечатки таблиц: имя набора -> 16 hex символов"""
+        return dict(self._query(f"SELECT name, fingerprint FROM {META_TABLE} ORDER BY name"))
+
+    def data_fingerprint(self, names=tuple(DATASETS)):
+        """Общий отпечаток набора таблиц для ключей кэшей"""
+        fingerprints = self.fingerprints()
+        digest = hashlib.sha256(f"sqlite-v{STORE_VERSION}".encode())
+        for name in names:
+            digest.update(fingerprints[name].encode())
+        return digest.hexdigest()[:16]
+
+    def columns(self, name):
+        """Колонки таблицы; KeyError для неизвестной таблицы"""
+        columns = [row[1] for row in self._query(f"PRAGMA table_info({_quote(name)})")]
+        if not columns:
+            raise KeyError(f"В хранилище нет таблицы {name}")
+        return columns
+
+    def _column(self, name, column):
+        # Имена проверяются по схеме таблицы, а не подставляются как есть
+        if column not in self.columns(name):
+            raise KeyError(f"В таблице {name} нет колонки {column}")
+        return _quote(column)
+
+    def read_table(self, name):
+        """Таблица целиком (для построчных функций: сегменты, просмотр данных)"""
+        self.columns(name)
+        with self.connection() as connection:
+            df = pd.read_sql_query(f"SELECT * FROM {_quote(name)} ORDER BY rowid", connection)
+        return optimize_dtypes(df)
+
+    def count(self, name, column=None):
+        """Число строк таблицы или непустых значений колонки"""
+        target = '*' if column is None else self._column(name, column)
+        return self._query(f"SELECT COUNT({target}) FROM {_quote(name)}")[0][0]
+
+    def value_counts(self, name, column):
+        """Частоты ответов по убыванию, как Series.value_counts()"""
+        quoted = self._column(name, column)
+        rows = self._query(
+            f"SELECT {quoted}, COUNT(*) AS n FROM {_quote(name)} WHERE {quoted} IS NOT NULL "
+            f"GROUP BY {quoted} ORDER BY n DESC, {quoted}"
+        )
+        labels = [label for label, _ in rows]
+        counts = np.array([n for _, n in rows], dtype=np.int64)
+        return pd.Series(counts, index=pd.Index(labels, name=column), name='count')
+
+    def quantiles(self, name, column, qs):
+        """Квантили колонки с линейной интерполяцией, как в pandas.
+
+        Значения берутся по позиции из индекса колонки (ORDER BY ... LIMIT 2
+        OFFSET k), без выгрузки колонки.
+        """
+        quoted = self._column(name, column)
+        with self.connection() as connection:
+            return _quantiles(connection, name, quoted, qs)
+
+    def describe(self, name, columns):
+        """Таблица как DataFrame.describe() для числовых колонок"""
+        # Имена проверяются до того, как занять соединение: вложенные
+        # обращения к пулу при pool_size=1 ждали бы сами себя
+        quoted_columns = [self._column(name, column) for column in columns]
+        stats = {}
+        with self.connection() as connection:
+            for column, quoted in zip(columns, quoted_columns):
+                n, mean, low, high = connection.execute(
+                    f"SELECT COUNT({quoted}), AVG({quoted}), MIN({quoted}), MAX({quoted}) FROM {_quote(name)}"
+                ).fetchone()
+                std = np.nan
+                if n > 1:
+                    # Второй проход по отклонениям от среднего устойчивее суммы квадратов
+                    squares = connection.execute(
+                        f"SELECT SUM(({quoted} - ?) * ({quoted} - ?)) FROM {_quote(name)} "
+                        f"WHERE {quoted} IS NOT NULL", (mean, mean)
+                    ).fetchone()[0]
+                    std = float(np.sqrt(squares / (n - 1)))
+                q1, median, q3 = _quantiles(connection, name, quoted, (0.25, 0.5, 0.75), n)
+                stats[column] = [float(n), mean, std, low, q1, median, q3, high]
+        index = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+        return pd.DataFrame(stats, index=index, columns=list(columns), dtype=float)
+
+    def close(self):
+        """Закрывает свободные соединения пула"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Хранилище анкет опроса в SQLite")
+    parser.add_argument('--store', type=Path, default=STORE_FILE, help="файл базы")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="импорт исходных xlsx в базу")
+    for name, source in DATASETS.items():
+        import_parser.add_argument(f'--{name}', default=source, help=f"xlsx файл таблицы {name}")
+    append_parser = commands.add_parser('append', help="дописать анкеты из xlsx в таблицу")
+    append_parser.add_argument('table', choices=sorted(DATASETS))
+    append_parser.add_argument('source', help="xlsx файл с новыми анкетами")
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        datasets = {name: getattr(args, name) for name in DATASETS}
+        import_sources(datasets, path=args.store)
+        for name, source in datasets.items():
+            print(f"{name}: {source} -> {args.store}")
+    else:
+        df = read_source(args.source)
+        append_rows(args.table, df, path=args.store, source=args.source)
+        print(f"{args.table}: +{len(df)} анкет из {args.source}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""Синтетические данные опроса в формате исходных таблиц.
+
+Повторяет раскладку колонок файлов "данные по рынку суши.xlsx" и
+"профиль_потребителя.xlsx": пары "вопрос - кол-во" с дублирующимися
+заголовками (кол-во, кол-во.1 ... кол-во.4), колонки балл и % у оценок
+и цен, ошибки Excel (#REF!, #N/A ...) в случайных ячейках и свободные
+ответы о любимых суши через запятую. Размер задается числом строк,
+результат при одном и том же seed всегда одинаковый.
+
+Запуск:
+
+    python synthetic_data.py --rows 100000 --output synthetic --format xlsx parquet
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from data_loader import EXCEL_ERRORS, MARKET_FILE, PROFILE_FILE
+from streaming_ingest import header_names
+
+# Доля ячеек с ошибками Excel
+ERROR_RATE = 0.002
+
+RESTAURANTS = (
+    'Японский домик', 'Суши маркет', 'Суши мастер', 'Зебры', 'Япончик', 'Бамбуши',
+    'Экспресс Суши', 'Киото', 'Суши Кайфуши', 'Суши дом', 'Кушай суши',
+)
+
+CHARACTERISTICS = ('Качество обслуживания', 'Атмосфера', 'Уровень цен', 'Качество суши/роллов', 'Размер порции')
+
+PRICES = (349.0, 249.0, 199.0, 189.0, 139.0)
+
+# Таблица рынка: (вопрос, колонка значения, варианты ответа или None для
+# ресторанов, вид значения). Заголовки совпадают с исходным файлом вместе
+# с лишними пробелами; повторяющиеся "кол-во" pandas нумерует при чтении
+MARKET_LAYOUT = (
+    ('цель посещения', 'кол-во ',
+     ('Провести время с друзьями', 'Не хочется готовить', 'Попробовать что-то новое'), 'count'),
+    ('Как часто посещают суши-рестораны', 'кол-во',
+     ('1-2 раза в месяц', 'Каждый день', 'Чаще 3 раз в месяц'), 'count'),
+    ('Какие суши-рестораны в г. Омск  знают', 'кол-во', None, 'count'),
+    ('В какие суши-рестораны в г. Омск бычно ходят', 'кол-во', None, 'count'),
+    ('Какой суши-ресторан  посещают чаще всего', 'кол-во', None, 'count'),
+    ('На сколько удовлетворены суши-рестораном, который посещают чаще всего', 'кол-во',
+     ('Полностью удовлетворен', 'Скорее удовлетворен', 'Скорее не удовлетворен',
+      'Поностью не удовлетворен', 'Затрудняюсь ответить'), 'count'),
+    ('На сколько удовлетворены характеристиками суши-ресторана, который посещают чаще всего', 'балл',
+     CHARACTERISTICS, 'score'),
+    ('Важность характеристик при выборе суши-ресторана', '%', CHARACTERISTICS, 'percent'),
+    ('Выше какой цены никогда не приобретут порцию суши/роллов, потому что это дорого (8 шт., «Калифорния»)',
+     '%', PRICES, 'percent'),
+    ('Ниже какой цены никогда не приобретут порцию суши/роллов, потому что усомнятся в качестве (8 шт., «Калифорния»)',
+     '%', PRICES, 'percent'),
+    (' Справедливая цена за порцию суши/роллов (8 шт., «Калифорния»)', '%', PRICES, 'percent'),
+)
+
+# Профиль: колонка -> (варианты, веса по исходной выборке)
+PROFILE_LAYOUT = {
+    'пол': (('Женский', 'Мужской'), (258, 91)),
+    'возраст': (('18-24', '25-34', '35-44', '45-54', '55-64', 'Больше 65'), (301, 17, 16, 3, 7, 6)),
+    'доход': (('12 000-19 000', '20 000-29 000', '30 000-39 000', '40 000-49 000', '50 000-59 000',
+              'Более 60 000'), (132, 89, 63, 16, 16, 34)),
+}
+SUSHI_COLUMN = 'Какие суши\\роллы  любят больше всего'
+
+# Написания любимых суши с частотами, включая опечатки и падежи из ответов
+SUSHI_ANSWERS = (
+    ('Филадельфия', 120), ('филадельфия', 12), ('Филадельфию', 3), ('Филка', 2), ('Горячая Филадельфия', 2),
+    ('Калифорния', 65), ('Калифорнию', 3), ('колифорнию', 4), ('Горячие', 13), ('Горячие суши', 4),
+    ('Запечённые', 11), ('Запечёные роллы', 4), ('любые запечённые', 5), ('Дракон', 9), ('Жаренные', 8),
+    ('Жареные', 3), ('Темпура', 2), ('Темпурные', 2), ('Эби темпура', 3), ('С угрем', 3), ('с угрём', 2),
+    ('ролл с креветкой', 2), ('Фруктовые', 5), ('Лава', 5), ('Бонито', 2), ('якудза', 2), ('Флорида', 2),
+    ('чикен чипс', 2), ('с беконом', 4), ('в кляре', 4), ('С рыбой и другими морепродуктами', 3),
+    ('Любые', 2), ('все', 3), ('Не помню название', 2),
+)
+
+# Сколько названий в одном ответе (по исходной выборке)
+ANSWER_LENGTHS = ((1, 314), (2, 27), (3, 5), (5, 4))
+
+COLUMNAR_FORMATS = ('parquet', 'feather')
+
+
+def _weights(counts):
+    counts = np.asarray(counts, dtype=float)
+    return counts / counts.sum()
+
+
+def _restaurant_names(rows):
+    """Названия ресторанов: исходные, затем пронумерованные"""
+    extra = [f'Суши-бар №{i}' for i in range(1, max(0, rows - len(RESTAURANTS)) + 1)]
+    return list(RESTAURANTS[:rows]) + extra
+
+
+def _values(kind, size, rng):
+    if kind == 'count':
+        return np.sort(rng.integers(1, 300, size))[::-1]
+    if kind == 'score':
+        return np.round(rng.uniform(2.5, 4.5, size), 1)
+    shares = rng.dirichlet(np.ones(size)) * 100
+    return np.round(np.sort(shares)[::-1], 1)
+
+
+def make_market(rows=11, seed=42):
+    """Таблица рынка: rows строк ответов на вопросы о ресторанах.
+
+    Вопросы с фиксированными вариантами занимают столько строк, сколько у
+    них вариантов, остальное - пустые ячейки, как в исходном файле.
+    """
+    rng = np.random.default_rng(seed)
+    names = _restaurant_names(rows)
+    columns = []
+    for question, value_column, answers, kind in MARKET_LAYOUT:
+        if answers is None:
+            labels = np.array(names, dtype=object)
+            rng.shuffle(labels[len(RESTAURANTS):])
+        else:
+            labels = np.array(answers[:rows], dtype=object)
+            if kind == 'percent' and isinstance(answers[0], float):
+                labels = rng.permutation(labels).astype(float)
+        values = _values(kind, len(labels), rng)
+
+        label_column = pd.Series(labels).reindex(range(rows))
+        value_column_data = pd.Series(values).reindex(range(rows))
+        columns.append((question, label_column))
+        columns.append((value_column, value_column_data))
+
+    market = pd.concat([column for _, column in columns], axis=1)
+    # Дублирующиеся заголовки сохраняются как в Excel
+    market.columns = [name for name, _ in columns]
+    return market
+
+
+def make_profile(rows=350, seed=42):
+    """Анкеты потребителей: пол, возраст, доход и любимые суши"""
+    rng = np.random.default_rng(seed)
+    profile = {}
+    for column, (answers, counts) in PROFILE_LAYOUT.items():
+        profile[column] = np.array(answers, dtype=object)[rng.choice(len(answers), rows, p=_weights(counts))]
+
+    spellings = np.array([spelling for spelling, _ in SUSHI_ANSWERS], dtype=object)
+    sushi_weights = _weights([n for _, n in SUSHI_ANSWERS])
+    lengths = np.array([length for length, _ in ANSWER_LENGTHS])
+    answer_lengths = lengths[rng.choice(len(lengths), rows, p=_weights([n for _, n in ANSWER_LENGTHS]))]
+
+    # Ответы одной длины собираются вместе: названия склеиваются через запятую
+    answers = np.empty(rows, dtype=object)
+    for length in lengths:
+        positions = np.flatnonzero(answer_lengths == length)
+        picks = spellings[rng.choice(len(spellings), (len(positions), length), p=sushi_weights)]
+        joined = picks[:, 0]
+        for j in range(1, length):
+            separators = np.where(rng.random(len(positions)) < 0.8, ', ', ',')
+            joined = joined + separators + picks[:, j]
+        answers[positions] = joined
+    profile[SUSHI_COLUMN] = answers
+    return pd.DataFrame(profile)
+
+
+def add_excel_errors(df, rate=ERROR_RATE, seed=42):
+    """Копия таблицы с ошибками Excel в случайных непустых ячейках"""
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        hits = np.flatnonzero(column.notna().to_numpy() & (rng.random(len(column)) < rate))
+        if len(hits):
+            column = column.astype(object)
+            column.iloc[hits] = rng.choice(EXCEL_ERRORS, len(hits))
+            df.isetitem(i, column)
+    return df
+
+
+def generate_survey(rows=350, seed=42, error_rate=ERROR_RATE, market_rows=None):
+    """Пара таблиц (рынок, профиль); rows - число анкет профиля.
+
+    Таблица рынка по умолчанию того же размера: список ресторанов
+    дополняется пронумерованными названиями.
+    """
+    market_rows = rows if market_rows is None else market_rows
+    market = make_market(market_rows, seed=seed)
+    profile = make_profile(rows, seed=seed + 1)
+    if error_rate:
+        market = add_excel_errors(market, error_rate, seed=seed + 2)
+        profile = add_excel_errors(profile, error_rate, seed=seed + 3)
+    return market, profile
+
+
+def with_loaded_names(df):
+    """Таблица с именами колонок, которые дает pd.read_excel (кол-во.1 ...)"""
+    return df.set_axis(header_names(df.columns), axis=1)
+
+
+def write_xlsx(df, path):
+    """Запись таблицы в xlsx потоково (без построения всей книги в памяти)"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Лист1')
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([None if value is None or value != value else value for value in row])
+    workbook.save(path)
+
+
+def write_columnar(df, path, fmt='parquet'):
+    """Запись в колоночный формат (parquet или feather).
+
+    Дублирующиеся заголовки колонок заменяются на имена, которые pandas
+    дает им при чтении xlsx (кол-во.1 ...).
+    """
+    df = with_loaded_names(df)
+    # Ячейки с ошибками Excel делают колонку смешанной: храним ее как текст
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        if column.dtype == object and column.map(type).nunique() > 1:
+            df.isetitem(i, column.where(column.isna(), column.astype(str)))
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        df.to_feather(path)
+    else:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+
+
+def write_survey(output_dir, rows=350, seed=42, formats=('xlsx',), error_rate=ERROR_RATE, market_rows=None):
+    """Генерирует данные и сохраняет их в output_dir под исходными именами файлов"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    market, profile = generate_survey(rows, seed=seed, error_rate=error_rate, market_rows=market_rows)
+
+    paths = []
+    for name, df in ((MARKET_FILE, market), (PROFILE_FILE, profile)):
+        for fmt in formats:
+            path = output_dir / Path(name).with_suffix(f'.{fmt}')
+            if fmt == 'xlsx':
+                write_xlsx(df, path)
+            else:
+                write_columnar(df, path, fmt)
+            paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетические данные опроса в формате исходных таблиц")
+    parser.add_argument('--rows', type=int, default=350, help="число анкет профиля")
+    parser.add_argument('--market-rows', type=int, default=None, help="строк в таблице рынка (по умолчанию = --rows)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--error-rate', type=float, default=ERROR_RATE)
+    parser.add_argument('--output', type=Path, default=Path('synthetic'))
+    parser.add_argument('--format', nargs='+', default=['xlsx'], choices=('xlsx',) + COLUMNAR_FORMATS)
+    args = parser.parse_args()
+
+    paths = write_survey(args.output, args.rows, seed=args.seed, formats=args.format,
+                         error_rate=args.error_rate, market_rows=args.market_rows)
+    for path in paths:
+        print(f"{path}: {path.stat().st_size / 1024:.1f} КБ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Цветовые схемы дашборда.
+
+Тема - неизменяемый объект, который выбирается в каждой сессии отдельно.
+Общий словарь цветов больше не изменяется, поэтому выбор схемы одним
+пользователем не влияет на графики других, а настройки оформления можно
+безопасно кэшировать по теме.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+
+# Базовая палитра Streamlit
+BASE_COLORS = MappingProxyType({
+    'primary': '#1E3A8A',      # темно-синий
+    'secondary': '#3B82F6',    # синий
+    'success': '#10B981',      # зеленый
+    'warning': '#F59E0B',      # оранжевый
+    'info': '#6366F1',         # индиго
+    'purple': '#8B5CF6',       # фиолетовый
+    'dark': '#FF7F50',         # темно-серый
+    'light': '#F3F4F6',        # светло-серый
+    'accent': '#DC2626'        # красный
+})
+
+DEFAULT_SCHEME = "Яркая (по умолчанию)"
+
+# Цветовые схемы: название -> цвета, которые отличаются от базовой палитры
+COLOR_SCHEMES = {
+    DEFAULT_SCHEME: {},
+    "Пастельная": {'primary': '#FFB5B5', 'secondary': '#B5E7E1', 'success': '#B5D3F0'},
+    "Монохром": {'primary': '#555555', 'secondary': '#777777', 'success': '#999999'},
+    "Морская": {'primary': '#006A6B', 'secondary': '#00A8CC', 'success': '#40E0D0'},
+}
+
+
+@dataclass(frozen=True)
+class Theme:
+    """Неизменяемая тема оформления: схема, шрифт и цвета"""
+
+    scheme: str
+    font_family: str
+    colors: tuple
+    _lookup: dict = field(init=False, repr=False, compare=False, hash=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, '_lookup', MappingProxyType(dict(self.colors)))
+
+    def __getitem__(self, name):
+        return self._lookup[name]
+
+    def values(self):
+        """Цвета в порядке базовой палитры"""
+        return [color for _, color in self.colors]
+
+
+@lru_cache(maxsize=None)
+def get_theme(scheme=DEFAULT_SCHEME, font_family="Inter"):
+    """Тема по названию схемы (один объект на схему и шрифт)"""
+    if scheme not in COLOR_SCHEMES:
+        scheme = DEFAULT_SCHEME
+    colors = dict(BASE_COLORS, **COLOR_SCHEMES[scheme])
+    return Theme(scheme, font_family, tuple(colors.items()))